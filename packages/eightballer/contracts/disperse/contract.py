@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the class to connect to a disperse contract."""
+
+from typing import Any, List, Optional
+
+from aea.common import JSONLike
+from aea.configurations.base import PublicId
+from aea.contracts.base import Contract
+from aea.crypto.base import LedgerApi
+
+PUBLIC_ID = PublicId.from_str("eightballer/disperse:0.1.0")
+
+MAX_RECIPIENTS = 256
+
+
+class DisperseContract(Contract):
+    """The disperse contract pays many recipients in a single transaction."""
+
+    contract_id = PUBLIC_ID
+
+    @classmethod
+    def get_disperse_ether_transaction(  # pylint: disable=too-many-arguments
+        cls,
+        ledger_api: LedgerApi,
+        contract_address: str,
+        sender_address: str,
+        recipients: List[str],
+        values: List[int],
+        gas: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Optional[JSONLike]:
+        """
+        Get the transaction paying each recipient its value in the native currency.
+
+        :param ledger_api: the ledger apis
+        :param contract_address: the address of the deployed contract
+        :param sender_address: the address paying for the transaction
+        :param recipients: the addresses to pay
+        :param values: the value to pay each recipient, in the smallest unit of the currency
+        :param gas: the gas limit of the transaction, estimated if None
+        :param kwargs: the gas pricing parameters of the transaction
+        :return: the raw transaction
+        """
+        if len(recipients) != len(values):
+            raise ValueError("Recipients and values differ in length.")
+        if not 0 < len(recipients) <= MAX_RECIPIENTS:
+            raise ValueError(f"Between 1 and {MAX_RECIPIENTS} recipients can be paid at once.")
+        contract_instance = cls.get_instance(ledger_api, contract_address)
+        return ledger_api.build_transaction(
+            contract_instance=contract_instance,
+            method_name="disperseEther",
+            method_args={
+                "recipients": [ledger_api.api.toChecksumAddress(address) for address in recipients],
+                "values": values,
+            },
+            tx_args={
+                "sender_address": sender_address,
+                "value": sum(values),
+                "gas": gas,
+                **kwargs,
+            },
+            raise_on_try=True,
+        )
@@ -0,0 +1,28 @@
+# @version 0.3.10
+"""
+@title Disperse
+@notice Pays the native currency of the chain to many recipients in one transaction.
+@dev Recipients get the 2300 gas stipend of `send`, so a recipient with an expensive
+     fallback reverts the whole batch. Any value sent on top of the total is refunded.
+"""
+
+MAX_RECIPIENTS: constant(uint256) = 256
+
+
+@external
+@payable
+def disperseEther(
+    recipients: DynArray[address, MAX_RECIPIENTS],
+    values: DynArray[uint256, MAX_RECIPIENTS],
+):
+    assert len(recipients) == len(values), "recipients and values differ in length"
+    total: uint256 = 0
+    for value in values:
+        total += value
+    assert msg.value >= total, "not enough value sent"
+    for i in range(MAX_RECIPIENTS):
+        if i >= len(recipients):
+            break
+        send(recipients[i], values[i])
+    if msg.value > total:
+        send(msg.sender, msg.value - total)
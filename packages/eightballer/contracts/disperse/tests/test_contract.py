@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for the disperse contract, against an in-process dev chain."""
+# pylint: skip-file
+
+import json
+from pathlib import Path
+
+import pytest
+from eth_tester.exceptions import TransactionFailed
+from web3 import EthereumTesterProvider, Web3
+
+BUILD_PATH = Path(__file__).parent.parent / "build" / "Disperse.json"
+RECIPIENTS = 100
+# the low addresses are precompiles, which cannot be paid within the gas stipend
+FIRST_RECIPIENT = 0x1000
+
+
+@pytest.fixture()
+def chain() -> Web3:
+    """Get a dev chain with prefunded accounts."""
+    return Web3(EthereumTesterProvider())
+
+
+@pytest.fixture()
+def disperse(chain: Web3):
+    """Deploy the disperse contract."""
+    build = json.loads(BUILD_PATH.read_text(encoding="utf-8"))
+    factory = chain.eth.contract(abi=build["abi"], bytecode=build["bytecode"])
+    tx_hash = factory.constructor().transact({"from": chain.eth.accounts[0]})
+    address = chain.eth.get_transaction_receipt(tx_hash).contractAddress
+    return chain.eth.contract(address=address, abi=build["abi"])
+
+
+def test_disperse_ether(chain: Web3, disperse) -> None:
+    """Test that every recipient is paid and the excess value is refunded."""
+    faucet = chain.eth.accounts[0]
+    recipients = [Web3.toChecksumAddress(f"0x{FIRST_RECIPIENT + i:040x}") for i in range(RECIPIENTS)]
+    values = [10**15 + i for i in range(RECIPIENTS)]
+    tx_hash = disperse.functions.disperseEther(recipients, values).transact(
+        {"from": faucet, "value": sum(values) + 1}
+    )
+    assert chain.eth.get_transaction_receipt(tx_hash).status == 1
+    assert [chain.eth.get_balance(address) for address in recipients] == values
+    assert chain.eth.get_balance(disperse.address) == 0
+
+
+def test_disperse_ether_rejects_mismatched_lengths(chain: Web3, disperse) -> None:
+    """Test that recipients and values must pair up."""
+    with pytest.raises(TransactionFailed):
+        disperse.functions.disperseEther([chain.eth.accounts[1]], [1, 2]).transact(
+            {"from": chain.eth.accounts[0], "value": 3}
+        )
@@ -20,6 +20,7 @@
 """This package contains a scaffold of a behaviour."""
 
 from typing import Any, Dict, cast
+from urllib.parse import urlparse
 
 from packages.eightballer.contracts.erc_20 import PUBLIC_ID as ERC_20_PUBLIC_ID
 from packages.eightballer.skills.balance_metrics.dialogues import (
@@ -33,12 +34,26 @@ from packages.eightballer.skills.balance_metrics.strategy import (
 from packages.eightballer.skills.prometheus.behaviours import PrometheusBehaviour
 from packages.valory.connections.ledger.connection import (
     PUBLIC_ID as LEDGER_CONNECTION_PUBLIC_ID,
+    connected_ledger_connections,
 )
+from packages.valory.connections.ledger.dialogue_gc import CollectedDialogues
 from packages.valory.protocols.contract_api.custom_types import Kwargs
 from packages.valory.protocols.contract_api.message import ContractApiMessage
 from packages.valory.protocols.ledger_api.message import LedgerApiMessage
 
 LEDGER_API_ADDRESS = str(LEDGER_CONNECTION_PUBLIC_ID)
+# published in the shared state by the faucet skill, when it runs alongside
+ADMISSION_KEY = "admission"
+ADMISSION_METRIC_NAME = "faucet_claim_admissions"
+# also published in the shared state by the faucet skill, when it runs alongside
+DIALOGUES_KEY = "dialogues"
+DIALOGUES_METRIC_NAME = "agent_dialogue_store_size"
+# read from the ledger connections of the agent
+RPC_BATCH_METRIC_NAME = "ledger_rpc_batch_size"
+STATE_CACHE_METRIC_NAME = "ledger_state_cache_requests"
+BLOCK_READS_METRIC_NAME = "ledger_block_height_reads"
+COLLAPSED_METRIC_NAME = "ledger_collapsed_requests"
+EXECUTOR_METRIC_NAME = "ledger_executor_pool"
 
 
 class BalancePollingBehaviour(PrometheusBehaviour):
@@ -128,6 +143,12 @@ class BalancePollingBehaviour(PrometheusBehaviour):
                                     "ledger": ledger.chain_name,
                                     },
                         )
+        self.export_admission_metrics()
+        self.export_dialogue_metrics()
+        self.export_rpc_batch_metrics()
+        self.export_state_cache_metrics()
+        self.export_collapsed_metrics()
+        self.export_executor_metrics()
         super().act()
         self.context.shared_state["balances"] = {
             k.ledger_id: v for k, v in self.strategy.native_balances.items()
@@ -136,6 +157,190 @@ class BalancePollingBehaviour(PrometheusBehaviour):
     def teardown(self) -> None:
         """Implement the task teardown."""
 
+    def export_admission_metrics(self) -> None:
+        """Export the number of claims admitted and rejected by the faucet, per ledger and decision."""
+        decisions = self.context.shared_state.get(ADMISSION_KEY)
+        if not decisions or not self.strategy.prometheus_enabled:
+            return
+        if ADMISSION_METRIC_NAME not in self.tokens_added_to_prometheus:
+            self.add_prometheus_metric(
+                ADMISSION_METRIC_NAME,
+                "Gauge",
+                "Claims admitted or rejected by the faucet",
+                {
+                    "agent_address": self.context.agent_address,
+                },
+            )
+            self.tokens_added_to_prometheus[ADMISSION_METRIC_NAME] = ADMISSION_METRIC_NAME
+            return
+        for ledger_id, counts in decisions.items():
+            for decision, count in counts.items():
+                self.update_prometheus_metric(
+                    metric_name=ADMISSION_METRIC_NAME,
+                    update_func="set",
+                    value=float(count),
+                    labels={"agent_address": self.context.agent_address,
+                            "ledger": ledger_id,
+                            "decision": decision,
+                            },
+                )
+
+    def export_dialogue_metrics(self) -> None:
+        """Export the number of dialogues held by the skills and the ledger connection, per dialogue store."""
+        if not self.strategy.prometheus_enabled:
+            return
+        if DIALOGUES_METRIC_NAME not in self.tokens_added_to_prometheus:
+            self.add_prometheus_metric(
+                DIALOGUES_METRIC_NAME,
+                "Gauge",
+                "Dialogues held in memory by the skills and the ledger connection",
+                {
+                    "agent_address": self.context.agent_address,
+                },
+            )
+            self.tokens_added_to_prometheus[DIALOGUES_METRIC_NAME] = DIALOGUES_METRIC_NAME
+            return
+        stores = dict(self.context.shared_state.get(DIALOGUES_KEY) or {})
+        for name, dialogues in (
+            ("ledger_api_dialogues", self.context.ledger_api_dialogues),
+            ("contract_api_dialogues", self.context.contract_api_dialogues),
+        ):
+            collector = cast(CollectedDialogues, dialogues).collector
+            collector.collect()
+            stores[f"balance_metrics.{name}"] = collector.stats()
+        for connection in connected_ledger_connections():
+            for name, stats in connection.dialogue_stats().items():
+                stores[f"ledger.{name}"] = stats
+        for store, stats in stores.items():
+            self.update_prometheus_metric(
+                metric_name=DIALOGUES_METRIC_NAME,
+                update_func="set",
+                value=float(stats.size),
+                labels={"agent_address": self.context.agent_address,
+                        "store": store,
+                        },
+            )
+
+    def export_rpc_batch_metrics(self) -> None:
+        """Export the mean and largest size of the JSON-RPC batches sent by the ledger connection, per endpoint."""
+        if not self.strategy.prometheus_enabled or self.add_metric_once(
+            RPC_BATCH_METRIC_NAME, "Size of the JSON-RPC batches sent by the ledger connection"
+        ):
+            return
+        for connection in connected_ledger_connections():
+            for endpoint, stats in connection.rpc_batch_stats().items():
+                for stat, value in (("mean", stats.mean_batch_size), ("max", stats.max_batch_size)):
+                    self.update_prometheus_metric(
+                        metric_name=RPC_BATCH_METRIC_NAME,
+                        update_func="set",
+                        value=float(value),
+                        labels={"agent_address": self.context.agent_address,
+                                "endpoint": to_endpoint_label(endpoint),
+                                "stat": stat,
+                                },
+                    )
+
+    def export_state_cache_metrics(self) -> None:
+        """Export the hits and misses of the state cache per callable, and the block height reads per ledger."""
+        if not self.strategy.prometheus_enabled:
+            return
+        added = self.add_metric_once(
+            STATE_CACHE_METRIC_NAME, "Contract state requests served by the cache of the ledger connection or not"
+        )
+        added = self.add_metric_once(
+            BLOCK_READS_METRIC_NAME, "Block height reads of the ledger connection, shared by its per block requests"
+        ) or added
+        if added:
+            return
+        for connection in connected_ledger_connections():
+            for callable_, counts in connection.state_cache_stats().items():
+                for result, count in counts.items():
+                    self.update_prometheus_metric(
+                        metric_name=STATE_CACHE_METRIC_NAME,
+                        update_func="set",
+                        value=float(count),
+                        labels={"agent_address": self.context.agent_address,
+                                "callable": callable_,
+                                "result": result,
+                                },
+                    )
+            for ledger_id, reads in connection.block_stats().items():
+                self.update_prometheus_metric(
+                    metric_name=BLOCK_READS_METRIC_NAME,
+                    update_func="set",
+                    value=float(reads),
+                    labels={"agent_address": self.context.agent_address,
+                            "ledger": ledger_id,
+                            },
+                )
+
+    def export_collapsed_metrics(self) -> None:
+        """Export the requests served by the upstream call of an identical one, per protocol and performative."""
+        if not self.strategy.prometheus_enabled or self.add_metric_once(
+            COLLAPSED_METRIC_NAME, "Requests the ledger connection served by an identical request in flight"
+        ):
+            return
+        for connection in connected_ledger_connections():
+            for protocol, counts in connection.collapsed_stats().items():
+                for performative, count in counts.items():
+                    self.update_prometheus_metric(
+                        metric_name=COLLAPSED_METRIC_NAME,
+                        update_func="set",
+                        value=float(count),
+                        labels={"agent_address": self.context.agent_address,
+                                "protocol": protocol,
+                                "performative": performative,
+                                },
+                    )
+
+    def export_executor_metrics(self) -> None:
+        """Export the load and the queue wait, in seconds, of the executor pool of every ledger."""
+        if not self.strategy.prometheus_enabled or self.add_metric_once(
+            EXECUTOR_METRIC_NAME, "Load of the executor pools of the ledger connection"
+        ):
+            return
+        for connection in connected_ledger_connections():
+            for ledger_id, stats in connection.executor_stats().items():
+                for stat, value in (
+                    ("workers", stats.workers),
+                    ("in_flight", stats.in_flight),
+                    ("queued", stats.queued),
+                    ("requests", stats.requests),
+                    ("shed", stats.shed),
+                    ("queue_wait_mean", stats.queue_wait_mean),
+                    ("queue_wait_max", stats.queue_wait_max),
+                ):
+                    self.update_prometheus_metric(
+                        metric_name=EXECUTOR_METRIC_NAME,
+                        update_func="set",
+                        value=float(value),
+                        labels={"agent_address": self.context.agent_address,
+                                "ledger": ledger_id,
+                                "stat": stat,
+                                },
+                    )
+
+    def add_metric_once(self, metric_name: str, description: str) -> bool:
+        """
+        Add a gauge to prometheus the first time it is exported.
+
+        :param metric_name: the name of the gauge
+        :param description: the description of the gauge
+        :return: whether the gauge was just added, in which case it is only set from the next tick
+        """
+        if metric_name in self.tokens_added_to_prometheus:
+            return False
+        self.add_prometheus_metric(
+            metric_name,
+            "Gauge",
+            description,
+            {
+                "agent_address": self.context.agent_address,
+            },
+        )
+        self.tokens_added_to_prometheus[metric_name] = metric_name
+        return True
+
     def request_all_token_info(self):
         """
         For each of the ledgers, request the token info.
@@ -226,3 +431,13 @@ def to_metric_name(ledger,
          
     
 
+
+
+def to_endpoint_label(endpoint: str) -> str:
+    """
+    Convert an RPC endpoint to a metric label, without the path and credentials of its url.
+
+    The ledger connection names the batches of an endpoint pool after their ledger, which is kept as is.
+    """
+    host = urlparse(endpoint).hostname
+    return host if host else endpoint
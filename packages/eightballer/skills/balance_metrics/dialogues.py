@@ -6,6 +6,10 @@ from aea.protocols.dialogue.base import Dialogue as BaseDialogue
 from aea.protocols.dialogue.base import DialogueLabel as BaseDialogueLabel
 from aea.skills.base import Model
 
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    pop_collection_args,
+)
 from packages.valory.protocols.contract_api.dialogues import (
     ContractApiDialogue as BaseContractApiDialogue,
 )
@@ -59,7 +63,7 @@ class ContractApiDialogue(BaseContractApiDialogue):
 LedgerApiDialogue = BaseLedgerApiDialogue
 
 
-class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
+class LedgerApiDialogues(CollectedDialogues, Model, BaseLedgerApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -68,6 +72,7 @@ class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
 
         :return: None
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -87,9 +92,10 @@ class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
             self_address=str(self.skill_id),
             role_from_first_message=role_from_first_message,
         )
+        self.init_collection(**collection)
 
 
-class ContractApiDialogues(Model, BaseContractApiDialogues):
+class ContractApiDialogues(CollectedDialogues, Model, BaseContractApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -98,6 +104,7 @@ class ContractApiDialogues(Model, BaseContractApiDialogues):
 
         :return: None
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -118,3 +125,4 @@ class ContractApiDialogues(Model, BaseContractApiDialogues):
             role_from_first_message=role_from_first_message,
             dialogue_class=ContractApiDialogue,
         )
+        self.init_collection(**collection)
@@ -19,6 +19,7 @@
 
 """This package contains a scaffold of a handler."""
 
+import time
 from typing import Optional, cast
 
 from aea.protocols.base import Message
@@ -170,6 +171,7 @@ class LedgerApiHandler(Handler):
             ledger = strategy.ledgers.get(ledger_api_msg.ledger_id)
             current_balance = strategy.native_balances.get(ledger)
             current_balance.amount = ledger_api_msg.balance
+            current_balance.updated_at = time.time()
             strategy.native_balances[ledger] = current_balance
             self.context.shared_state["native_balances"] = {i.ledger_id: i for i in strategy.native_balances}
             self.context.logger.debug(
@@ -21,7 +21,7 @@
 
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Optional
 
 from aea.skills.base import Model
 
@@ -133,6 +133,8 @@ class Balance:
 
     amount: int = -1
     decimals: int = 1e18
+    # the time the amount was last polled, in seconds since the epoch
+    updated_at: Optional[float] = None
 
 
 @dataclass
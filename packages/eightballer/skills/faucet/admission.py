@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the claim admission control of the 'faucet' skill."""
+
+import json
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+ADMISSION_KEY = "admission"
+DEFAULT_RETRY_AFTER = 60
+DEFAULT_COLD_START_ALLOWANCE = 10
+MAX_RETRY_AFTER = 3600
+# the code of the ledger connection's error replies while the circuit of a ledger is open
+LEDGER_UNAVAILABLE_CODE = 503
+
+
+class AdmissionDecision:  # pylint: disable=too-few-public-methods
+    """The outcomes of admission control for a claim."""
+
+    ACCEPTED = "accepted"
+    QUEUE_FULL = "queue_full"
+    DRAIN_TIME = "drain_time"
+    OUTFLOW = "outflow"
+    LEDGER_UNAVAILABLE = "ledger_unavailable"
+
+
+@dataclass(frozen=True)
+class LaneLoad:
+    """The work already committed on a ledger."""
+
+    queued: int
+    in_flight: int
+    # drips settled over the last minute
+    throughput: int
+
+    @property
+    def committed(self) -> int:
+        """Get the number of drips accepted but not yet paid."""
+        return self.queued + self.in_flight
+
+    @property
+    def drain_rate(self) -> float:
+        """Get the observed number of drips paid per second."""
+        return self.throughput / 60.0
+
+
+@dataclass(frozen=True)
+class Admission:
+    """The admission decision for a claim."""
+
+    decision: str
+    # seconds the client should wait before claiming again, if rejected
+    retry_after: Optional[int] = None
+
+    @property
+    def accepted(self) -> bool:
+        """Check whether the claim was accepted."""
+        return self.decision == AdmissionDecision.ACCEPTED
+
+
+def parse_outage(data: bytes) -> Optional[Tuple[str, float]]:
+    """
+    Read the error reply of the ledger connection to a request it refused.
+
+    :param data: the data of the error reply, naming the ledger and when to retry it
+    :return: the unavailable ledger and the seconds until it can be retried, or None if the data cannot be read
+    """
+    try:
+        outage = json.loads(data)
+        return str(outage["ledger_id"]), float(outage["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class AdmissionController:
+    """
+    Decide whether a ledger can take one more drip without letting its latency run away.
+
+    A claim is rejected when the queue of its ledger already holds `max_queue_depth`
+    drips, when the queue would take longer than `max_drain_time` seconds to drain at
+    the observed rate, or when the funds not yet committed to other drips cannot cover
+    it. A ledger that settled no drip over the last minute has an unbounded drain time,
+    so it only takes `cold_start_allowance` drips until its rate is known. Rejected
+    clients are told to retry once the excess work has drained. Claims are also
+    rejected while the ledger connection reports the ledger as unavailable. Every
+    decision is counted per ledger.
+    """
+
+    def __init__(
+        self,
+        max_queue_depth: Optional[int] = None,
+        max_drain_time: Optional[float] = None,
+        default_retry_after: int = DEFAULT_RETRY_AFTER,
+        cold_start_allowance: int = DEFAULT_COLD_START_ALLOWANCE,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Initialize the admission controller.
+
+        :param max_queue_depth: the maximum number of drips accepted but not yet paid per ledger, unbounded if None
+        :param max_drain_time: the maximum estimated time to pay the queue of a ledger, in seconds, unbounded if None
+        :param default_retry_after: the retry delay when no drain rate has been observed yet, in seconds
+        :param cold_start_allowance: the drips accepted but not yet paid on a ledger with no observed drain rate
+        :param clock: the clock of the ledger outages, in seconds
+        """
+        self.max_queue_depth = max_queue_depth
+        self.max_drain_time = max_drain_time
+        self.default_retry_after = default_retry_after
+        self.cold_start_allowance = cold_start_allowance
+        self.decisions: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._clock = clock
+        # ledger id -> the time until which the ledger connection refuses its requests
+        self._unavailable_until: Dict[str, float] = {}
+
+    def ledger_unavailable(self, data: bytes) -> Optional[str]:
+        """
+        Record that the ledger connection refuses the requests of a ledger.
+
+        :param data: the data of the error reply of the connection, naming the ledger and when to retry it
+        :return: the unavailable ledger, or None if the data cannot be read
+        """
+        outage = parse_outage(data)
+        if outage is None:
+            return None
+        ledger_id, retry_after = outage
+        self._unavailable_until[ledger_id] = self._clock() + retry_after
+        return ledger_id
+
+    def decide(
+        self, ledger_id: str, load: LaneLoad, available: int, amount: int
+    ) -> Admission:
+        """
+        Decide whether to accept a claim, and count the decision.
+
+        :param ledger_id: the ledger of the claim
+        :param load: the work already committed on the ledger
+        :param available: the funds of the faucet on the ledger not yet committed to drips
+        :param amount: the amount and fee of the drip
+        :return: the admission decision
+        """
+        admission = self._unavailable(ledger_id) or self._decide(load, available, amount)
+        self.decisions[ledger_id][admission.decision] += 1
+        return admission
+
+    def _unavailable(self, ledger_id: str) -> Optional[Admission]:
+        """Reject a claim if its ledger is unavailable."""
+        remaining = self._unavailable_until.get(ledger_id, 0.0) - self._clock()
+        if remaining <= 0:
+            return None
+        return Admission(
+            AdmissionDecision.LEDGER_UNAVAILABLE,
+            max(1, min(MAX_RETRY_AFTER, math.ceil(remaining))),
+        )
+
+    def _decide(self, load: LaneLoad, available: int, amount: int) -> Admission:
+        """Decide whether to accept a claim."""
+        committed = load.committed + 1
+        if self.max_queue_depth is not None and committed > self.max_queue_depth:
+            return Admission(
+                AdmissionDecision.QUEUE_FULL,
+                self._retry_after(committed - self.max_queue_depth, load),
+            )
+        rate = load.drain_rate
+        if self.max_drain_time is not None:
+            if rate <= 0:
+                # nothing settled lately: the ledger may be stalled, the drain time is unbounded
+                if committed > self.cold_start_allowance:
+                    return Admission(AdmissionDecision.DRAIN_TIME, self.default_retry_after)
+            else:
+                excess = committed - self.max_drain_time * rate
+                if excess > 0:
+                    return Admission(
+                        AdmissionDecision.DRAIN_TIME, self._retry_after(excess, load)
+                    )
+        if amount > available:
+            # the funds are committed to other drips, new ones must wait for them or a top up
+            return Admission(AdmissionDecision.OUTFLOW, self.default_retry_after)
+        return Admission(AdmissionDecision.ACCEPTED)
+
+    def _retry_after(self, excess: float, load: LaneLoad) -> int:
+        """Get the time for the excess drips to drain, in whole seconds."""
+        if load.drain_rate <= 0:
+            return self.default_retry_after
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(excess / load.drain_rate)))
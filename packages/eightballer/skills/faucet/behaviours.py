@@ -19,28 +19,132 @@
 
 """This package contains the behaviour for the erc-1155 client skill."""
 
-from typing import Any, List, Optional, Set, cast
+import heapq
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
 
+from aea.common import JSONLike
+from aea.helpers.transaction.base import SignedTransaction, Terms, TransactionDigest
+from aea.protocols.dialogue.base import Dialogue, DialogueLabel
 from aea.skills.behaviours import TickerBehaviour
 
-from packages.eightballer.protocols.fipa.dialogues import FipaDialogue
+from packages.eightballer.contracts.disperse.contract import (
+    PUBLIC_ID as DISPERSE_CONTRACT_ID,
+)
+from packages.eightballer.skills.faucet.admission import LaneLoad
 from packages.eightballer.skills.faucet.dialogues import (
+    ContractApiDialogue,
+    ContractApiDialogues,
     LedgerApiDialogue,
     LedgerApiDialogues,
 )
+from packages.eightballer.skills.faucet.drip_queue import DripQueue, DripState
+from packages.eightballer.skills.faucet.lanes import (
+    DEFAULT_BACKOFF,
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_MAX_BACKOFF,
+    DripLane,
+)
+from packages.eightballer.skills.faucet.nonce_manager import (
+    NonceManager,
+    is_already_known,
+    is_nonce_too_low,
+)
+from packages.eightballer.skills.faucet.outflow import OutflowLedger
 from packages.eightballer.skills.faucet.strategy import Strategy
 from packages.valory.connections.ledger.connection import (
     PUBLIC_ID as LEDGER_CONNECTION_PUBLIC_ID,
 )
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    DialogueStoreStats,
+)
+from packages.valory.protocols.contract_api.message import ContractApiMessage
+from packages.valory.protocols.ledger_api.custom_types import Kwargs
 from packages.valory.protocols.ledger_api.message import LedgerApiMessage
 
 LEDGER_API_ADDRESS = str(LEDGER_CONNECTION_PUBLIC_ID)
 DEFAULT_MAX_PROCESSING = 120
 DEFAULT_TX_INTERVAL = 2.0
+DEFAULT_MAX_IN_FLIGHT = 1
+DEFAULT_BATCH_MAX_RECIPIENTS = 1
+DEFAULT_BATCH_WINDOW = 5.0
+DEFAULT_MAX_TRACKED_STATUSES = 10_000
+DEFAULT_LANE_PREFETCH = 1_000
+DRIP_LANES_KEY = "drip_lanes"
+DIALOGUES_KEY = "dialogues"
+DIALOGUE_MODELS = (
+    "contract_api_dialogues",
+    "default_dialogues",
+    "http_dialogues",
+    "ledger_api_dialogues",
+    "signing_dialogues",
+)
+GET_TRANSACTION_COUNT = "get_transaction_count"
+GET_DISPERSE_TRANSACTION = "get_disperse_ether_transaction"
+
+
+class DripStatus:  # pylint: disable=too-few-public-methods
+    """The statuses of a drip to a recipient."""
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    SETTLED = "settled"
+    FAILED = "failed"
+
+
+@dataclass
+class InFlightDrip:
+    """A drip transaction, paying one or more recipients, between its request and its receipt."""
+
+    recipients: List[Terms]
+    nonce: int
+    started_at: float = field(default_factory=time.monotonic)
+    tx_hash: Optional[str] = None
+    # set once the nonce turned out to be used, while the transaction is looked up
+    superseded: bool = False
+
+    @property
+    def ledger_id(self) -> str:
+        """Get the ledger of the transaction."""
+        return self.recipients[0].ledger_id
+
+    @property
+    def sender_address(self) -> str:
+        """Get the sender of the transaction."""
+        return self.recipients[0].sender_address
+
+    @property
+    def drip_ids(self) -> List[int]:
+        """Get the ids of the drips in the durable queue."""
+        return [terms.kwargs["drip_id"] for terms in self.recipients]
 
 
 class TransactionBehaviour(TickerBehaviour):
-    """A behaviour to sequentially submit transactions to the blockchain."""
+    """
+    A behaviour to submit transactions to the blockchain.
+
+    Drips are queued in one lane per ledger, so that a slow or failing ledger does not
+    hold back the others. Up to `max_in_flight` drips per lane go through the raw
+    transaction, signing and broadcast stages at the same time. Their nonces are
+    allocated locally, from the pending transaction count of the sender on each ledger.
+    A lane is scheduled as soon as a drip is queued or a slot frees up, rather than on
+    the next tick; drips in flight time out from a heap of monotonic deadlines.
+
+    On ledgers with a deployed disperse contract, drips are batched: once
+    `batch_max_recipients` drips are queued, or the oldest has waited `batch_window`
+    seconds, they are paid together by a single contract call.
+
+    Every drip is written to the durable queue before it is accepted, and its state is
+    recorded there at each stage. Lanes only hold up to `lane_prefetch` queued drips in
+    memory and are refilled from the database as they drain. On setup, drips left
+    in flight by a previous run are resumed: unsigned ones are queued again, signed
+    ones are broadcast again and looked up by transaction hash, so none is paid twice.
+    """
 
     def __init__(self, **kwargs: Any):
         """Initialize the transaction behaviour."""
@@ -50,65 +154,477 @@ class TransactionBehaviour(TickerBehaviour):
         self.max_processing = cast(
             float, kwargs.pop("max_processing", DEFAULT_MAX_PROCESSING)
         )
-        self.processing_time = 0.0
-        self.waiting: List[FipaDialogue] = []
-        self.processing: Optional[LedgerApiDialogue] = None
+        self.max_in_flight = cast(int, kwargs.pop("max_in_flight", DEFAULT_MAX_IN_FLIGHT))
+        self.lane_max_in_flight = cast(
+            Dict[str, int], kwargs.pop("lane_max_in_flight", None) or {}
+        )
+        self.lane_failure_threshold = cast(
+            int, kwargs.pop("lane_failure_threshold", DEFAULT_FAILURE_THRESHOLD)
+        )
+        self.lane_backoff = cast(float, kwargs.pop("lane_backoff", DEFAULT_BACKOFF))
+        self.lane_max_backoff = cast(
+            float, kwargs.pop("lane_max_backoff", DEFAULT_MAX_BACKOFF)
+        )
+        self.disperse_contracts = cast(
+            Dict[str, str], kwargs.pop("disperse_contracts", None) or {}
+        )
+        self.batch_max_recipients = cast(
+            int, kwargs.pop("batch_max_recipients", DEFAULT_BATCH_MAX_RECIPIENTS)
+        )
+        self.batch_window = cast(float, kwargs.pop("batch_window", DEFAULT_BATCH_WINDOW))
+        self.lane_prefetch = cast(int, kwargs.pop("lane_prefetch", DEFAULT_LANE_PREFETCH))
+        self.lanes: Dict[str, DripLane] = {}
+        self.drip_statuses: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.in_flight: Dict[DialogueLabel, InFlightDrip] = {}
+        # (deadline, sequence, dialogue label) of the drips in flight, earliest first
+        self._deadlines: List[Tuple[float, int, DialogueLabel]] = []
+        self._sequence = itertools.count()
+        self._waking = False
+        # the lanes woken while another wake was scheduling, run once it is done
+        self._woken: Set[str] = set()
         self.timedout: Set[Any] = set()
+        # the drips whose receipt could not be read, looked up again on the next tick
+        self._unconfirmed: Set[DialogueLabel] = set()
+        self.nonces = NonceManager()
+        self._seeding: Dict[DialogueLabel, Tuple[str, str]] = {}
+        # the id of the last drip loaded from the durable queue into each lane
+        self._cursors: Dict[str, int] = {}
+        # the lanes with queued drips left in the database, and how many are left there
+        self._spilled: Set[str] = set()
+        self._backlog: Dict[str, int] = {}
         super().__init__(tick_interval=tx_interval, **kwargs)
 
     def setup(self) -> None:
         """Setup behaviour."""
+        strategy = cast(Strategy, self.context.strategy)
+        self.drip_queue = DripQueue(strategy.engine)
+        self._recover()
 
     def act(self) -> None:
         """Implement the act."""
-        if self.processing is not None:
-            if self.processing_time <= self.max_processing:
-                # already processing
-                self.processing_time += self.tick_interval
+        self._timeout_processing()
+        self._recheck_receipts()
+        for lane in self.lanes.values():
+            self._refill(lane)
+            self._schedule(lane)
+        self.context.shared_state[DRIP_LANES_KEY] = self.lane_stats()
+        self.context.shared_state[DIALOGUES_KEY] = self.dialogue_stats()
+
+    def wake(self, ledger_id: str) -> None:
+        """
+        Schedule the drips of a lane right away, instead of on the next tick.
+
+        The handlers run on the same loop as the behaviour, so the lane is scheduled
+        inline. A wake made while a lane is being scheduled is run once that is done,
+        rather than nested. The tick is left to time out drips and to close batch windows.
+
+        :param ledger_id: the ledger of the lane
+        """
+        if ledger_id not in self.lanes:
+            return
+        self._woken.add(ledger_id)
+        if self._waking:
+            return
+        self._waking = True
+        try:
+            while self._woken:
+                lane = self.lanes[self._woken.pop()]
+                self._refill(lane)
+                self._schedule(lane)
+        finally:
+            self._waking = False
+
+    def _schedule(self, lane: DripLane) -> None:
+        """Start as many drips of a lane as it allows."""
+        available = lane.available()
+        if available == 0:
+            return
+        sender = lane.queue[0].sender_address
+        if not self.nonces.is_seeded(lane.ledger_id, sender):
+            self._request_nonce_seed(lane.ledger_id, sender)
+            return
+        for _ in range(available):
+            batch_size = self._batch_size(lane)
+            if batch_size == 0:
+                # waiting for the batch to fill up
                 return
-            self._timeout_processing()
-        if len(self.waiting) == 0:
-            # nothing to process
+            recipients = lane.start(batch_size)
+            if len(recipients) == 1:
+                self._start_processing(recipients[0])
+            else:
+                self._start_batch(recipients)
+
+    def _batch_size(self, lane: DripLane) -> int:
+        """Get the number of drips the next transaction of a lane should pay."""
+        if lane.ledger_id not in self.disperse_contracts or self.batch_max_recipients <= 1:
+            return min(1, len(lane))
+        if len(lane) >= self.batch_max_recipients or lane.oldest_wait() >= self.batch_window:
+            return min(len(lane), self.batch_max_recipients)
+        return 0
+
+    def get_lane(self, ledger_id: str) -> DripLane:
+        """
+        Get the lane of a ledger, creating it on first use.
+
+        :param ledger_id: the ledger id
+        :return: the lane
+        """
+        lane = self.lanes.get(ledger_id)
+        if lane is None:
+            lane = self.lanes[ledger_id] = DripLane(
+                ledger_id,
+                max_in_flight=self.lane_max_in_flight.get(ledger_id, self.max_in_flight),
+                failure_threshold=self.lane_failure_threshold,
+                backoff=self.lane_backoff,
+                max_backoff=self.lane_max_backoff,
+            )
+        return lane
+
+    def enqueue(self, address: str, ledger_id: str) -> None:
+        """
+        Queue a drip in the lane of its ledger, once it is safely in the durable queue.
+
+        :param address: the address receiving the drip
+        :param ledger_id: the ledger of the drip
+        """
+        strategy = cast(Strategy, self.context.strategy)
+        drip_id = self.drip_queue.push(
+            ledger_id, self.context.agent_address, address, strategy.gwei_per_request
+        )
+        lane = self.get_lane(ledger_id)
+        if ledger_id in self._spilled or len(lane) >= self.lane_prefetch:
+            # the drip waits in the database until the lane has room for it
+            self._spilled.add(ledger_id)
+            self._backlog[ledger_id] = self._backlog.get(ledger_id, 0) + 1
+        else:
+            lane.enqueue(strategy.get_drip_terms(address, ledger_id, drip_id=drip_id))
+            self._cursors[ledger_id] = drip_id
+        self._record_status(ledger_id, address, DripStatus.QUEUED)
+        self.wake(ledger_id)
+
+    def _refill(self, lane: DripLane) -> None:
+        """Load the next queued drips of a lane from the durable queue."""
+        room = self.lane_prefetch - len(lane)
+        if lane.ledger_id not in self._spilled or room <= 0:
+            return
+        rows = self.drip_queue.fetch(
+            lane.ledger_id, after_id=self._cursors.get(lane.ledger_id, 0), limit=room
+        )
+        for row in rows:
+            lane.enqueue(self._get_terms(row))
+        if rows:
+            self._cursors[lane.ledger_id] = rows[-1].id
+        backlog = self._backlog.get(lane.ledger_id, 0) - len(rows)
+        if len(rows) < room:
+            self._spilled.discard(lane.ledger_id)
+            backlog = 0
+        self._backlog[lane.ledger_id] = max(0, backlog)
+
+    def _get_terms(self, row: Any) -> Terms:
+        """Get the terms of a drip stored in the durable queue."""
+        strategy = cast(Strategy, self.context.strategy)
+        return strategy.get_drip_terms(
+            row.recipient, row.ledger_id, drip_id=row.id, amount=int(row.amount)
+        )
+
+    def _recover(self) -> None:
+        """Resume the drips left queued or in flight by a previous run."""
+        requeued = self.drip_queue.requeue_unsigned()
+        strategy = cast(Strategy, self.context.strategy)
+        for ledger_id, amount, count in self.drip_queue.queued_amounts():
+            self.get_lane(ledger_id)
+            self._spilled.add(ledger_id)
+            self._backlog[ledger_id] = count
+            self._outflow.reserve(ledger_id, amount + count * strategy.drip_fee_reserve)
+        resumed = 0
+        for _, rows in itertools.groupby(
+            self.drip_queue.with_transaction(),
+            key=lambda row: (row.ledger_id, row.nonce, row.tx_hash),
+        ):
+            self._resume(list(rows))
+            resumed += 1
+        if requeued or resumed or self._spilled:
+            self.context.logger.info(
+                f"recovered the drip queue: {requeued} unsigned drips queued again, "
+                f"{resumed} transactions resumed, queued drips on {sorted(self._spilled)}."
+            )
+
+    def _resume(self, rows: List[Any]) -> None:
+        """Resume a drip transaction that may have reached the ledger before a restart."""
+        first = rows[0]
+        recipients = [self._get_terms(row) for row in rows]
+        drip = InFlightDrip(recipients, first.nonce, tx_hash=first.tx_hash)
+        self.get_lane(drip.ledger_id).resume()
+        self._outflow.reserve(drip.ledger_id, self._reservation(recipients))
+        self._set_status(recipients, DripStatus.PROCESSING)
+        if first.state == DripState.SIGNED and first.signed_tx:
+            self._send_signed(drip, json.loads(first.signed_tx))
+        else:
+            self._request_receipt(drip)
+
+    def _send_signed(self, drip: InFlightDrip, signed_transaction: JSONLike) -> None:
+        """Broadcast the stored signed transaction of a drip again."""
+        ledger_api_dialogues = cast(
+            LedgerApiDialogues, self.context.ledger_api_dialogues
+        )
+        ledger_api_msg, ledger_api_dialogue = ledger_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=LedgerApiMessage.Performative.SEND_SIGNED_TRANSACTION,
+            signed_transaction=SignedTransaction(drip.ledger_id, signed_transaction),
+        )
+        self.context.logger.info(f"broadcasting transaction {drip.tx_hash} again...")
+        self._track(cast(LedgerApiDialogue, ledger_api_dialogue), drip)
+        self.context.outbox.put_message(message=ledger_api_msg)
+
+    def _request_receipt(self, drip: InFlightDrip) -> None:
+        """Look up the receipt of the transaction of a drip by its hash."""
+        ledger_api_dialogues = cast(
+            LedgerApiDialogues, self.context.ledger_api_dialogues
+        )
+        ledger_api_msg, ledger_api_dialogue = ledger_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
+            transaction_digest=TransactionDigest(drip.ledger_id, drip.tx_hash),
+        )
+        self.context.logger.info(f"checking whether transaction {drip.tx_hash} is settled...")
+        self._track(cast(LedgerApiDialogue, ledger_api_dialogue), drip)
+        self.context.outbox.put_message(message=ledger_api_msg)
+
+    def _track(self, ledger_api_dialogue: LedgerApiDialogue, drip: InFlightDrip) -> None:
+        """Track a drip in flight under a dialogue that starts halfway through its stages."""
+        ledger_api_dialogue.terms = drip.recipients[0]
+        ledger_api_dialogue.initial_ledger_api_dialogue = ledger_api_dialogue
+        self._add_in_flight(ledger_api_dialogue, drip)
+
+    def _add_in_flight(self, dialogue: Dialogue, drip: InFlightDrip) -> None:
+        """Track a drip in flight until its deadline."""
+        self.in_flight[dialogue.dialogue_label] = drip
+        heapq.heappush(
+            self._deadlines,
+            (drip.started_at + self.max_processing, next(self._sequence), dialogue.dialogue_label),
+        )
+
+    def record_signed(self, drip: InFlightDrip, signed_transaction: JSONLike) -> None:
+        """
+        Persist the signed transaction of a drip, before it is broadcast.
+
+        :param drip: the drip in flight
+        :param signed_transaction: the body of the signed transaction
+        """
+        drip.tx_hash = cast(Optional[str], signed_transaction.get("hash"))
+        self.drip_queue.update(
+            drip.drip_ids,
+            DripState.SIGNED,
+            tx_hash=drip.tx_hash,
+            signed_tx=json.dumps(signed_transaction),
+        )
+
+    def record_broadcast(self, dialogue: Dialogue, tx_digest: str) -> None:
+        """
+        Persist the hash of a drip transaction accepted by the ledger.
+
+        :param dialogue: the initial ledger or contract api dialogue of the drip
+        :param tx_digest: the hash of the transaction
+        """
+        drip = self.get_in_flight(dialogue)
+        if drip is None:
             return
-        self._start_processing()
+        drip.tx_hash = tx_digest
+        self.drip_queue.update(drip.drip_ids, DripState.BROADCAST, tx_hash=tx_digest)
+
+    @property
+    def _outflow(self) -> OutflowLedger:
+        """Get the pending outflow accounting of the strategy."""
+        return cast(Strategy, self.context.strategy).outflow
+
+    def _reservation(self, recipients: List[Terms]) -> int:
+        """Get the funds reserved for the drips to some recipients."""
+        strategy = cast(Strategy, self.context.strategy)
+        return sum(strategy.drip_reservation(t.sender_payable_amount) for t in recipients)
+
+    def _set_status(self, recipients: List[Terms], status: str) -> None:
+        """Record the status of the drips to some recipients."""
+        for terms in recipients:
+            self._record_status(terms.ledger_id, terms.counterparty_address, status)
+
+    def _record_status(self, ledger_id: str, address: str, status: str) -> None:
+        """Record the status of the drip to an address, forgetting the oldest ones."""
+        key = (ledger_id, address.lower())
+        self.drip_statuses[key] = status
+        self.drip_statuses.move_to_end(key)
+        while len(self.drip_statuses) > DEFAULT_MAX_TRACKED_STATUSES:
+            self.drip_statuses.popitem(last=False)
+
+    def get_drip_status(self, address: str, ledger_id: str) -> Optional[str]:
+        """
+        Get the status of the last drip to a recipient.
+
+        :param address: the address of the recipient
+        :param ledger_id: the ledger of the drip
+        :return: the status, None if no recent drip is known
+        """
+        return self.drip_statuses.get((ledger_id, address.lower()))
+
+    @property
+    def waiting(self) -> int:
+        """Get the number of queued drips across all lanes."""
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def lane_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the queue depth, throughput and health of every lane."""
+        stats = {ledger_id: lane.stats() for ledger_id, lane in self.lanes.items()}
+        for ledger_id, backlog in self._backlog.items():
+            stats[ledger_id]["queued"] += backlog
+        return stats
+
+    def dialogue_stats(self) -> Dict[str, DialogueStoreStats]:
+        """Collect the dialogues of the skill, and get the size of every dialogue store."""
+        stats = {}
+        for name in DIALOGUE_MODELS:
+            collector = cast(CollectedDialogues, getattr(self.context, name)).collector
+            collector.collect()
+            stats[f"faucet.{name}"] = collector.stats()
+        return stats
+
+    def lane_load(self, ledger_id: str) -> LaneLoad:
+        """
+        Get the work already committed on a ledger.
+
+        :param ledger_id: the ledger id
+        :return: the queued and in flight drips, and the recent throughput
+        """
+        lane = self.lanes.get(ledger_id)
+        if lane is None:
+            return LaneLoad(queued=0, in_flight=0, throughput=0)
+        return LaneLoad(
+            queued=len(lane) + self._backlog.get(ledger_id, 0),
+            in_flight=sum(
+                len(drip.recipients)
+                for drip in self.in_flight.values()
+                if drip.ledger_id == ledger_id
+            ),
+            throughput=lane.throughput(),
+        )
 
     def teardown(self) -> None:
         """Teardown behaviour."""
 
     def _timeout_processing(self) -> None:
-        """Timeout processing."""
-        if self.processing is None:
+        """Timeout the drips that have been processing for too long."""
+        now = time.monotonic()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, dialogue_label = heapq.heappop(self._deadlines)
+            # drips that finished before their deadline are dropped from the heap here
+            drip = self.in_flight.pop(dialogue_label, None)
+            if drip is None:
+                continue
+            self.timedout.add(dialogue_label)
+            self.get_lane(drip.ledger_id).record_failure(len(drip.recipients))
+            self._set_status(drip.recipients, DripStatus.FAILED)
+            self.drip_queue.update(drip.drip_ids, DripState.FAILED)
+            self._outflow.release(drip.ledger_id, self._reservation(drip.recipients))
+            # the transaction may have been broadcast, so its nonce cannot be reused
+            self.nonces.resync(drip.ledger_id, drip.sender_address)
+
+    def _recheck_receipts(self) -> None:
+        """Look up again the receipts that could not be read, for the drips that have not timed out."""
+        unconfirmed, self._unconfirmed = self._unconfirmed, set()
+        for dialogue_label in unconfirmed:
+            drip = self.in_flight.pop(dialogue_label, None)
+            if drip is not None:
+                self._request_receipt(drip)
+
+    def _request_nonce_seed(self, ledger_id: str, sender: str) -> None:
+        """Request the pending transaction count of a sender, unless already requested."""
+        key = NonceManager.key(ledger_id, sender)
+        if key in self._seeding.values():
             return
-        self.timedout.add(self.processing.dialogue_label)
-        self.processing_time = 0.0
-        self.processing = None
+        ledger_api_dialogues = cast(
+            LedgerApiDialogues, self.context.ledger_api_dialogues
+        )
+        ledger_api_msg, ledger_api_dialogue = ledger_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=LedgerApiMessage.Performative.GET_STATE,
+            ledger_id=ledger_id,
+            callable=GET_TRANSACTION_COUNT,
+            args=(sender, "pending"),
+            kwargs=Kwargs({}),
+        )
+        self._seeding[ledger_api_dialogue.dialogue_label] = key
+        self.context.logger.info(f"requesting the nonce of {sender} on {ledger_id}...")
+        self.context.outbox.put_message(message=ledger_api_msg)
 
-    def finish_processing(self, ledger_api_dialogue: LedgerApiDialogue) -> None:
+    def seed_nonce(self, ledger_api_dialogue: LedgerApiDialogue, state: Dict[str, Any]) -> None:
         """
-        Finish processing.
+        Seed the nonces of a sender from the result of a transaction count request.
 
-        :param ledger_api_dialogue: the ledger api dialogue
+        :param ledger_api_dialogue: the ledger api dialogue of the request
+        :param state: the state returned by the ledger
         """
-        if self.processing == ledger_api_dialogue:
-            self.processing_time = 0.0
-            self.processing = None
+        key = self._seeding.pop(ledger_api_dialogue.dialogue_label, None)
+        if key is None:
             return
-        if ledger_api_dialogue.dialogue_label not in self.timedout:
+        pending_count = int(state[f"{GET_TRANSACTION_COUNT}_result"])
+        self.nonces.seed(*key, pending_count)
+        self.context.logger.info(f"next nonce of {key[1]} on {key[0]} is {pending_count}")
+        self.wake(key[0])
+
+    def failed_nonce_seed(self, ledger_api_dialogue: LedgerApiDialogue) -> None:
+        """
+        Forget a failed transaction count request, so that it is retried on the next tick.
+
+        :param ledger_api_dialogue: the ledger api dialogue of the request
+        """
+        key = self._seeding.pop(ledger_api_dialogue.dialogue_label, None)
+        if key is not None:
+            self.get_lane(key[0]).record_error()
+
+    def get_in_flight(self, dialogue: Dialogue) -> Optional[InFlightDrip]:
+        """
+        Get a drip in flight.
+
+        :param dialogue: the initial ledger or contract api dialogue of the drip
+        :return: the drip, or None if it is no longer in flight
+        """
+        return self.in_flight.get(dialogue.dialogue_label)
+
+    def finish_processing(self, dialogue: Dialogue, fee: Optional[int] = None) -> None:
+        """
+        Finish processing a settled drip.
+
+        :param dialogue: the initial ledger or contract api dialogue of the drip
+        :param fee: the fee paid by the transaction, if known
+        """
+        drip = self._pop_in_flight(dialogue)
+        if drip is not None:
+            spent = None if fee is None else fee + sum(t.sender_payable_amount for t in drip.recipients)
+            self._outflow.settle(drip.ledger_id, self._reservation(drip.recipients), spent)
+            self.get_lane(drip.ledger_id).record_success(len(drip.recipients))
+            self._set_status(drip.recipients, DripStatus.SETTLED)
+            self.drip_queue.update(drip.drip_ids, DripState.CONFIRMED)
+            self.wake(drip.ledger_id)
+
+    def _pop_in_flight(self, dialogue: Dialogue) -> Optional[InFlightDrip]:
+        """Stop tracking a drip, returning None if it had timed out."""
+        drip = self.in_flight.pop(dialogue.dialogue_label, None)
+        if drip is not None:
+            return drip
+        if dialogue.dialogue_label not in self.timedout:
             raise ValueError(
-                f"Non-matching dialogues in transaction behaviour: {self.processing} and {ledger_api_dialogue}"
+                f"Non-matching dialogue in transaction behaviour: {dialogue}"
             )
-        self.timedout.remove(ledger_api_dialogue.dialogue_label)
+        self.timedout.remove(dialogue.dialogue_label)
         self.context.logger.debug(
-            f"Timeout dialogue in transaction processing: {ledger_api_dialogue}"
+            f"Timeout dialogue in transaction processing: {dialogue}"
         )
-        # don't reset, as another might be processing
+        return None
 
-    def _start_processing(self) -> None:
-        """Process the next transaction."""
-        terms = self.waiting.pop(0)
+    def _start_processing(self, terms: Terms) -> None:
+        """Process a transaction."""
         self.context.logger.info(
-            f"Processing transaction, {len(self.waiting)} transactions remaining"
+            f"Processing transaction on {terms.ledger_id}, {self.waiting} transactions remaining"
         )
+        nonce = cast(int, self.nonces.allocate(terms.ledger_id, terms.sender_address))
         ledger_api_dialogues = cast(
             LedgerApiDialogues, self.context.ledger_api_dialogues
         )
@@ -119,20 +635,145 @@ class TransactionBehaviour(TickerBehaviour):
         )
         ledger_api_dialogue.terms = terms
         ledger_api_dialogue = cast(LedgerApiDialogue, ledger_api_dialogue)
-        self.processing_time = 0.0
-        self.processing = ledger_api_dialogue
+        self._add_in_flight(ledger_api_dialogue, InFlightDrip([terms], nonce))
+        self._set_status([terms], DripStatus.PROCESSING)
+        self.drip_queue.update([terms.kwargs["drip_id"]], DripState.RAW_TX, nonce=nonce)
         self.context.logger.info(
-            f"requesting transfer transaction for address: {terms.counterparty_address}..."
+            f"requesting transfer transaction for address: {terms.counterparty_address} with nonce {nonce}..."
         )
         self.context.outbox.put_message(message=ledger_api_msg)
 
-    def failed_processing(self, ledger_api_dialogue: LedgerApiDialogue) -> None:
+    def _start_batch(self, recipients: List[Terms]) -> None:
+        """Pay several drips of a ledger with a single disperse contract call."""
+        ledger_id, sender = recipients[0].ledger_id, recipients[0].sender_address
+        contract_address = self.disperse_contracts[ledger_id]
+        self.context.logger.info(
+            f"Processing a batch of {len(recipients)} drips on {ledger_id}, {self.waiting} transactions remaining"
+        )
+        nonce = cast(int, self.nonces.allocate(ledger_id, sender))
+        strategy = cast(Strategy, self.context.strategy)
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues
+        )
+        contract_api_msg, contract_api_dialogue = contract_api_dialogues.create(
+            counterparty=LEDGER_API_ADDRESS,
+            performative=ContractApiMessage.Performative.GET_RAW_TRANSACTION,
+            ledger_id=ledger_id,
+            contract_id=str(DISPERSE_CONTRACT_ID),
+            contract_address=contract_address,
+            callable=GET_DISPERSE_TRANSACTION,
+            kwargs=ContractApiMessage.Kwargs(
+                {
+                    "sender_address": sender,
+                    "recipients": [terms.counterparty_address for terms in recipients],
+                    "values": [terms.sender_payable_amount for terms in recipients],
+                }
+            ),
+        )
+        contract_api_dialogue = cast(ContractApiDialogue, contract_api_dialogue)
+        contract_api_dialogue.terms = strategy.get_batch_terms(recipients, contract_address)
+        drip = InFlightDrip(recipients, nonce)
+        self._add_in_flight(contract_api_dialogue, drip)
+        self._set_status(recipients, DripStatus.PROCESSING)
+        self.drip_queue.update(drip.drip_ids, DripState.RAW_TX, nonce=nonce)
+        self.context.outbox.put_message(message=contract_api_msg)
+
+    def failed_processing(
+        self,
+        dialogue: Dialogue,
+        error: Optional[str] = None,
+        broadcast: bool = False,
+        retry_after: Optional[float] = None,
+        receipt: bool = False,
+    ) -> None:
         """
-        Failed processing. Currently, we retry processing indefinitely.
+        Failed processing. We retry drips that failed on a used nonce, or that were refused
+        while their ledger was unavailable.
 
-        :param ledger_api_dialogue: the ledger api dialogue
+        :param dialogue: the ledger or contract api dialogue of any stage of the drip
+        :param error: the error message returned by the ledger, if any
+        :param broadcast: whether the transaction may have reached the ledger
+        :param retry_after: the seconds until the ledger can be retried, if the ledger connection refused the request
+        :param receipt: whether the receipt of the broadcast transaction could not be read
         """
-        self.finish_processing(ledger_api_dialogue)
+        dialogue = getattr(dialogue, "initial_ledger_api_dialogue", dialogue)
+        if receipt and dialogue.dialogue_label in self.in_flight:
+            # the transaction may still settle: keep its nonce and funds until its deadline
+            self._unconfirmed.add(dialogue.dialogue_label)
+            return
+        drip = self._pop_in_flight(dialogue)
+        if drip is None:
+            return
+        if retry_after is not None:
+            self._requeue_refused(drip, retry_after, broadcast)
+            return
+        if drip.tx_hash is not None and (is_nonce_too_low(error) or is_already_known(error)):
+            # the transaction may be our own, already on the ledger: look it up before paying again
+            drip.superseded = is_nonce_too_low(error)
+            self.nonces.resync(drip.ledger_id, drip.sender_address)
+            self._request_receipt(drip)
+            return
+        ledger_id, sender = drip.ledger_id, drip.sender_address
+        lane = self.get_lane(ledger_id)
+        nonce_too_low = is_nonce_too_low(error) or drip.superseded
+        pause = lane.record_failure(len(drip.recipients), ledger_error=not nonce_too_low)
+        if pause is not None:
+            self.context.logger.warning(f"pausing the {ledger_id} lane for {pause}s after repeated failures.")
+        if nonce_too_low:
+            self.context.logger.warning(
+                f"nonce {drip.nonce} of {sender} on {ledger_id} was already used, resyncing."
+            )
+            self.nonces.resync(ledger_id, sender)
+            for terms in reversed(drip.recipients):
+                lane.enqueue(terms, first=True)
+            self._set_status(drip.recipients, DripStatus.QUEUED)
+            self.drip_queue.update(
+                drip.drip_ids, DripState.QUEUED, nonce=None, tx_hash=None, signed_tx=None
+            )
+        else:
+            self._set_status(drip.recipients, DripStatus.FAILED)
+            self.drip_queue.update(drip.drip_ids, DripState.FAILED)
+            self._outflow.release(ledger_id, self._reservation(drip.recipients))
+            if broadcast:
+                self.nonces.resync(ledger_id, sender)
+            else:
+                self.nonces.release(ledger_id, sender, drip.nonce)
+        self.wake(ledger_id)
+
+    def _requeue_refused(self, drip: InFlightDrip, retry_after: float, broadcast: bool) -> None:
+        """Queue again the drips of a transaction the ledger connection refused, once their ledger is available."""
+        ledger_id, sender = drip.ledger_id, drip.sender_address
+        lane = self.get_lane(ledger_id)
+        lane.record_refusal(retry_after)
+        self.context.logger.warning(
+            f"{len(drip.recipients)} drips on {ledger_id} refused while the ledger is unavailable, "
+            f"queued again for {retry_after}s."
+        )
+        if broadcast:
+            self.nonces.resync(ledger_id, sender)
+        else:
+            self.nonces.release(ledger_id, sender, drip.nonce)
+        for terms in reversed(drip.recipients):
+            lane.enqueue(terms, first=True)
+        self._set_status(drip.recipients, DripStatus.QUEUED)
+        self.drip_queue.update(
+            drip.drip_ids, DripState.QUEUED, nonce=None, tx_hash=None, signed_tx=None
+        )
+
+
+class AddressListRefreshBehaviour(TickerBehaviour):
+    """Periodically reload the allow and ban lists to pick up changes made outside the agent."""
+
+    def setup(self) -> None:
+        """Implement the setup for the behaviour."""
+
+    def act(self) -> None:
+        """Implement the act."""
+        strategy = cast(Strategy, self.context.strategy)
+        strategy.refresh_address_lists()
+
+    def teardown(self) -> None:
+        """Implement the task teardown."""
 
 
 class BalanceCheckBehaviour(TickerBehaviour):
@@ -52,6 +52,10 @@ from packages.open_aea.protocols.signing.dialogues import (
     SigningDialogues as BaseSigningDialogues,
 )
 from packages.open_aea.protocols.signing.message import SigningMessage
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    pop_collection_args,
+)
 from packages.valory.protocols.contract_api.dialogues import (
     ContractApiDialogue as BaseContractApiDialogue,
 )
@@ -69,7 +73,7 @@ from packages.valory.protocols.ledger_api.dialogues import (
 HttpDialogue = BaseHttpDialogue
 
 
-class HttpDialogues(Model, BaseHttpDialogues):
+class HttpDialogues(CollectedDialogues, Model, BaseHttpDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -78,6 +82,7 @@ class HttpDialogues(Model, BaseHttpDialogues):
 
         :param kwargs: keyword arguments
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -96,6 +101,7 @@ class HttpDialogues(Model, BaseHttpDialogues):
             self_address=str(self.skill_id),
             role_from_first_message=role_from_first_message,
         )
+        self.init_collection(**collection)
 
 
 class ContractApiDialogue(BaseContractApiDialogue):
@@ -142,7 +148,7 @@ class ContractApiDialogue(BaseContractApiDialogue):
         self._terms = terms
 
 
-class ContractApiDialogues(Model, BaseContractApiDialogues):
+class ContractApiDialogues(CollectedDialogues, Model, BaseContractApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -151,6 +157,7 @@ class ContractApiDialogues(Model, BaseContractApiDialogues):
 
         :param kwargs: keyword arguments
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -171,12 +178,13 @@ class ContractApiDialogues(Model, BaseContractApiDialogues):
             role_from_first_message=role_from_first_message,
             dialogue_class=ContractApiDialogue,
         )
+        self.init_collection(**collection)
 
 
 DefaultDialogue = BaseDefaultDialogue
 
 
-class DefaultDialogues(Model, BaseDefaultDialogues):
+class DefaultDialogues(CollectedDialogues, Model, BaseDefaultDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -185,6 +193,7 @@ class DefaultDialogues(Model, BaseDefaultDialogues):
 
         :param kwargs: keyword arguments
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -204,12 +213,13 @@ class DefaultDialogues(Model, BaseDefaultDialogues):
             self_address=self.context.agent_address,
             role_from_first_message=role_from_first_message,
         )
+        self.init_collection(**collection)
 
 
 LedgerApiDialogue = BaseLedgerApiDialogue
 
 
-class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
+class LedgerApiDialogues(CollectedDialogues, Model, BaseLedgerApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -218,6 +228,7 @@ class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
 
         :param kwargs: keyword arguments
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -237,6 +248,7 @@ class LedgerApiDialogues(Model, BaseLedgerApiDialogues):
             self_address=str(self.skill_id),
             role_from_first_message=role_from_first_message,
         )
+        self.init_collection(**collection)
 
 
 class SigningDialogue(BaseSigningDialogue):
@@ -289,7 +301,7 @@ class SigningDialogue(BaseSigningDialogue):
         self._associated_contract_api_dialogue = associated_contract_api_dialogue
 
 
-class SigningDialogues(Model, BaseSigningDialogues):
+class SigningDialogues(CollectedDialogues, Model, BaseSigningDialogues):
     """This class keeps track of all oef_search dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -298,6 +310,7 @@ class SigningDialogues(Model, BaseSigningDialogues):
 
         :param kwargs: keyword arguments
         """
+        collection = pop_collection_args(kwargs)
         Model.__init__(self, **kwargs)
 
         def role_from_first_message(  # pylint: disable=unused-argument
@@ -318,3 +331,4 @@ class SigningDialogues(Model, BaseSigningDialogues):
             role_from_first_message=role_from_first_message,
             dialogue_class=SigningDialogue,
         )
+        self.init_collection(**collection)
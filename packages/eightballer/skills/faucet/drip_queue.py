@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the durable drip queue of the 'faucet' skill."""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from packages.eightballer.skills.faucet.models import QueuedDrip
+
+
+class DripState:  # pylint: disable=too-few-public-methods
+    """The states of a drip in the durable queue."""
+
+    QUEUED = "queued"
+    RAW_TX = "raw_tx"
+    SIGNED = "signed"
+    BROADCAST = "broadcast"
+    CONFIRMED = "confirmed"
+    FAILED = "failed"
+
+    # a transaction paying the drip may exist from these states on
+    TRANSACTION_STATES = (SIGNED, BROADCAST)
+
+
+class DripQueue:
+    """
+    Persist every accepted drip, so that no claim is lost when the agent stops.
+
+    A drip moves from `queued` to `raw_tx` once a nonce is allocated for it, to `signed`
+    once its transaction is signed, and to `broadcast` once the ledger has accepted it.
+    It ends as `confirmed` or `failed`. Queued drips are read back in id order, one page
+    at a time, so that a large backlog never has to be held in memory.
+    """
+
+    table = QueuedDrip.__table__
+
+    def __init__(self, engine: Engine) -> None:
+        """
+        Initialize the queue.
+
+        :param engine: the database engine
+        """
+        self.engine = engine
+
+    def push(self, ledger_id: str, sender_address: str, recipient: str, amount: int) -> int:
+        """
+        Queue a drip.
+
+        :param ledger_id: the ledger of the drip
+        :param sender_address: the address paying the drip
+        :param recipient: the address receiving the drip
+        :param amount: the amount of the drip, in the smallest unit of the currency
+        :return: the id of the drip
+        """
+        now = datetime.now()
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                self.table.insert().values(
+                    created_at=now,
+                    updated_at=now,
+                    ledger_id=ledger_id,
+                    sender_address=sender_address,
+                    recipient=recipient,
+                    amount=str(amount),
+                    state=DripState.QUEUED,
+                )
+            )
+        return int(result.inserted_primary_key[0])
+
+    def fetch(self, ledger_id: str, after_id: int, limit: int) -> List[Any]:
+        """
+        Get the next page of queued drips of a ledger, in id order.
+
+        :param ledger_id: the ledger of the drips
+        :param after_id: only return drips with a greater id
+        :param limit: the maximum number of drips returned
+        :return: the rows of the drips
+        """
+        table = self.table
+        with self.engine.connect() as connection:
+            return list(
+                connection.execute(
+                    select(table)
+                    .where(table.c.state == DripState.QUEUED)
+                    .where(table.c.ledger_id == ledger_id)
+                    .where(table.c.id > after_id)
+                    .order_by(table.c.id)
+                    .limit(limit)
+                )
+            )
+
+    def update(self, ids: Iterable[int], state: str, **values: Any) -> None:
+        """
+        Move drips to a new state.
+
+        :param ids: the ids of the drips
+        :param state: the new state
+        :param values: other columns to set, e.g. `nonce` or `tx_hash`
+        """
+        ids = list(ids)
+        if not ids:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(
+                self.table.update()
+                .where(self.table.c.id.in_(ids))
+                .values(state=state, updated_at=datetime.now(), **values)
+            )
+
+    def requeue_unsigned(self) -> int:
+        """
+        Queue again the drips whose transaction was never signed.
+
+        No transaction can exist for them, so they are safe to pay again after a restart.
+
+        :return: the number of drips queued again
+        """
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                self.table.update()
+                .where(self.table.c.state == DripState.RAW_TX)
+                .values(state=DripState.QUEUED, nonce=None, updated_at=datetime.now())
+            )
+        return int(result.rowcount)
+
+    def with_transaction(self) -> List[Any]:
+        """
+        Get the drips whose transaction may have reached the ledger.
+
+        :return: the rows of the drips, grouped by transaction
+        """
+        table = self.table
+        with self.engine.connect() as connection:
+            return list(
+                connection.execute(
+                    select(table)
+                    .where(table.c.state.in_(DripState.TRANSACTION_STATES))
+                    .order_by(table.c.ledger_id, table.c.nonce, table.c.tx_hash, table.c.id)
+                )
+            )
+
+    def queued_amounts(self) -> List[Tuple[str, int, int]]:
+        """
+        Get the total amount and number of queued drips of every ledger.
+
+        The amounts are summed here rather than in SQL, where they would lose precision.
+
+        :return: (ledger_id, amount, count) tuples
+        """
+        table = self.table
+        totals: Dict[str, List[int]] = {}
+        with self.engine.connect() as connection:
+            rows = connection.execution_options(stream_results=True).execute(
+                select(table.c.ledger_id, table.c.amount).where(
+                    table.c.state == DripState.QUEUED
+                )
+            )
+            for ledger_id, amount in rows:
+                total = totals.setdefault(ledger_id, [0, 0])
+                total[0] += int(amount)
+                total[1] += 1
+        return [(ledger_id, amount, count) for ledger_id, (amount, count) in totals.items()]
+
+    def count(self, state: str = DripState.QUEUED, ledger_id: Optional[str] = None) -> int:
+        """
+        Count the drips in a state.
+
+        :param state: the state of the drips
+        :param ledger_id: only count the drips of this ledger
+        :return: the number of drips
+        """
+        table = self.table
+        query = select(func.count()).select_from(table).where(table.c.state == state)
+        if ledger_id is not None:
+            query = query.where(table.c.ledger_id == ledger_id)
+        with self.engine.connect() as connection:
+            return int(connection.execute(query).scalar())
@@ -22,18 +22,28 @@
 # pylint: disable=W0212,C0209
 
 from dataclasses import asdict
+from datetime import datetime
 import json
-from typing import Dict, Optional, Union, cast
+from typing import Any, Callable, Dict, Optional, Union, cast
+from urllib.parse import parse_qs, urlparse
 
 from aea.crypto.ledger_apis import LedgerApis
 from aea.protocols.base import Message
 from aea.skills.base import Handler
+from jsonschema.exceptions import best_match
 
 from packages.eightballer.protocols.default import DefaultMessage
 from packages.eightballer.protocols.http.message import HttpMessage
 from packages.eightballer.skills.balance_metrics.strategy import Balance
+from packages.eightballer.skills.faucet.admission import (
+    LEDGER_UNAVAILABLE_CODE,
+    AdmissionDecision,
+    parse_outage,
+)
 from packages.eightballer.skills.faucet.behaviours import TransactionBehaviour
 from packages.eightballer.skills.faucet.dialogues import (
+    ContractApiDialogue,
+    ContractApiDialogues,
     DefaultDialogues,
     HttpDialogue,
     HttpDialogues,
@@ -42,12 +52,87 @@ from packages.eightballer.skills.faucet.dialogues import (
     SigningDialogue,
     SigningDialogues,
 )
+from packages.eightballer.skills.faucet.models import iter_drip_requests_json
+from packages.eightballer.skills.faucet.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    etag_matches,
+    parse_headers,
+)
+from packages.eightballer.skills.faucet.routes import (
+    MethodNotAllowed,
+    RouteNotFound,
+    RouteTable,
+)
 from packages.eightballer.skills.faucet.strategy import Strategy
 from packages.open_aea.protocols.signing.message import SigningMessage
+from packages.valory.protocols.contract_api.message import ContractApiMessage
 from packages.valory.connections.ledger.base import EVM_LEDGERS
 from packages.valory.connections.ledger.tests.conftest import make_ledger_api_connection
 from packages.valory.protocols.ledger_api.message import LedgerApiMessage
 
+DEFAULT_TXS_LIMIT = 100
+MAX_TXS_LIMIT = 1000
+
+
+def parse_txs_query(url: str) -> Dict[str, Any]:
+    """
+    Parse the pagination and filter parameters of a /txs request.
+
+    :param url: the url of the request
+    :return: the keyword arguments of `Strategy.get_txs`
+    """
+    params = {key: values[-1] for key, values in parse_qs(urlparse(url).query).items()}
+    limit = int(params.get("limit", DEFAULT_TXS_LIMIT))
+    if not 0 < limit <= MAX_TXS_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_TXS_LIMIT}")
+    query: Dict[str, Any] = {"limit": limit}
+    if "after_id" in params:
+        query["after_id"] = int(params["after_id"])
+    for key in ["ledger_id", "address"]:
+        if key in params:
+            query[key] = params[key]
+    for key in ["start", "end"]:
+        if key in params:
+            query[key] = datetime.fromisoformat(params[key])
+    return query
+
+
+def get_transaction_fee(receipt: Dict[str, Any]) -> Optional[int]:
+    """
+    Get the fee paid by a transaction from its receipt.
+
+    :param receipt: the transaction receipt
+    :return: the fee in the smallest unit of the native currency, or None if the receipt does not tell
+    """
+    gas_used, gas_price = receipt.get("gasUsed"), receipt.get("effectiveGasPrice")
+    if gas_used is None or gas_price is None:
+        return None
+    return int(str(gas_used), 0) * int(str(gas_price), 0)
+
+
+def record_unavailable_ledger(handler: Handler, code: int, data: bytes) -> Optional[float]:
+    """
+    Reject the claims of a ledger at once while the ledger connection refuses its requests.
+
+    :param handler: the handler of the error reply
+    :param code: the code of the error reply
+    :param data: the data of the error reply
+    :return: the seconds until the ledger can be retried, or None if the request was not refused as unavailable
+    """
+    if code != LEDGER_UNAVAILABLE_CODE:
+        return None
+    outage = parse_outage(data)
+    if outage is None:
+        return None
+    strategy = cast(Strategy, handler.context.strategy)
+    strategy.admission.ledger_unavailable(data)
+    ledger_id, retry_after = outage
+    handler.context.logger.warning(
+        f"ledger {ledger_id} is temporarily unavailable, rejecting its claims."
+    )
+    return retry_after
+
 
 class EvmLedgerApis(LedgerApis):
     """Store all the ledger apis we initialise."""
@@ -68,6 +153,14 @@ class HttpHandler(Handler):
         """Implement the setup."""
         self.context.logger.info(f"HttpHandler: setup method called. to procol_id={HttpMessage.protocol_id}")
         super().setup()
+        self.routes = RouteTable.from_spec_file()
+        self.response_cache = ResponseCache()
+        self._operations: Dict[str, Callable[..., None]] = {}
+        for route in self.routes:
+            operation = getattr(self, f"_{route.operation_id}", None)
+            if operation is None:
+                raise ValueError(f"No handler for operation {route.operation_id}")
+            self._operations[route.operation_id] = operation
 
     def handle(self, message: Message) -> None:
         """
@@ -125,20 +218,63 @@ class HttpHandler(Handler):
                 http_msg.body,
             )
         )
-        if http_msg.method == "post":
-            self._handle_claim(http_msg, http_dialogue)
-        elif http_msg.method == "options":
-            self._handle_pre_flight(http_msg, http_dialogue)
-        elif http_msg.url.find("whitelist") >= 0 and http_msg.method == "get":
-            self._return_whitelist(http_msg, http_dialogue)
-        elif http_msg.url.find("ledgers") >= 0 and http_msg.method == "get":
-            self._return_ledgers(http_msg, http_dialogue)
-        elif http_msg.url.find("txs") >= 0 and http_msg.method == "get":
-            self._return_txs(http_msg, http_dialogue)
-        elif http_msg.url.find("config") >= 0 and http_msg.method == "get":
-            self._return_config(http_msg, http_dialogue)
-        else:
-            self._handle_invalid(http_msg, http_dialogue)
+        try:
+            match = self.routes.match(http_msg.method, http_msg.url)
+        except RouteNotFound:
+            self._send_error(http_msg, http_dialogue, 404, "Not Found", "Unknown path.")
+            return
+        except MethodNotAllowed as e:
+            self._send_error(
+                http_msg,
+                http_dialogue,
+                405,
+                "Method Not Allowed",
+                str(e),
+                headers="Allow: {}\n".format(", ".join(m.upper() for m in e.allowed)),
+            )
+            return
+        kwargs: Dict[str, Any] = dict(match.path_params)
+        validator = match.route.body_validator
+        if validator is not None:
+            try:
+                payload = json.loads(http_msg.body)
+            except ValueError:
+                self._send_error(http_msg, http_dialogue, 400, "Bad Request", "Body is not valid json.")
+                return
+            error = best_match(validator.iter_errors(payload))
+            if error is not None:
+                self._send_error(http_msg, http_dialogue, 400, "Bad Request", error.message)
+                return
+            kwargs["payload"] = payload
+        self._operations[match.route.operation_id](http_msg, http_dialogue, **kwargs)
+
+    def _send_error(  # pylint: disable=too-many-arguments
+        self,
+        http_msg: HttpMessage,
+        http_dialogue: HttpDialogue,
+        status_code: int,
+        status_text: str,
+        error: str,
+        headers: str = "",
+    ) -> None:
+        """
+        Reply to a Http request with an error.
+
+        :param http_msg: the http message
+        :param http_dialogue: the http dialogue
+        :param status_code: the status code of the response
+        :param status_text: the status text of the response
+        :param error: the description of the error
+        :param headers: headers to send on top of those of the request
+        """
+        self._send_response(
+            http_msg,
+            http_dialogue,
+            status_code=status_code,
+            status_text=status_text,
+            body=json.dumps({"error": error}).encode("utf-8"),
+            headers=headers,
+        )
 
     def _return_ledgers(
         self, http_msg: HttpMessage, http_dialogue: HttpDialogue
@@ -149,19 +285,15 @@ class HttpHandler(Handler):
         :param http_msg: the http message
         :param http_dialogue: the http dialogue
         """
-        shared_state = cast(Strategy, self.context.shared_state)
-        ledgers = shared_state.get("ledgers")
-        http_response = http_dialogue.reply(
-            performative=HttpMessage.Performative.RESPONSE,
-            target_message=http_msg,
-            version=http_msg.version,
-            status_code=200,
-            status_text="",
-            headers=http_msg.headers,
-            body=json.dumps({"ledgers": {i: asdict(k) for i, k in ledgers.items()}}).encode("utf-8"),
+        ledgers = self.context.shared_state.get("ledgers") or {}
+        # the ledgers are replaced rather than mutated when the configuration changes
+        cached = self.response_cache.get(
+            "ledgers",
+            (id(ledgers), tuple(ledgers)),
+            lambda: {"ledgers": {i: asdict(k) for i, k in ledgers.items()}},
         )
-        self.context.outbox.put_message(message=http_response)
-    
+        self._send_cached(http_msg, http_dialogue, cached)
+
     def _return_txs(
         self, http_msg: HttpMessage, http_dialogue: HttpDialogue
     ) -> None:
@@ -171,37 +303,81 @@ class HttpHandler(Handler):
         :param http_msg: the http message
         :param http_dialogue: the http dialogue
         """
-        txs = self.context.strategy.get_txs()
-        http_response = http_dialogue.reply(
-            performative=HttpMessage.Performative.RESPONSE,
-            target_message=http_msg,
-            version=http_msg.version,
+        try:
+            query = parse_txs_query(http_msg.url)
+        except ValueError as e:
+            self._send_error(http_msg, http_dialogue, 400, "Bad Request", str(e))
+            return
+        txs = self.context.strategy.get_txs(**query)
+        self._send_response(
+            http_msg,
+            http_dialogue,
             status_code=200,
-            status_text="",
-            headers=http_msg.headers,
-            body=json.dumps([f.as_dict() for f in txs]).encode("utf-8"),
+            body=b"".join(iter_drip_requests_json(txs, query["limit"])),
         )
-        self.context.outbox.put_message(message=http_response)
-    def _return_config( 
-        self, http_msg: HttpMessage, http_dialogue: HttpDialogue
+
+    def _send_response(  # pylint: disable=too-many-arguments
+        self,
+        http_msg: HttpMessage,
+        http_dialogue: HttpDialogue,
+        status_code: int,
+        body: bytes,
+        status_text: str = "",
+        headers: str = "",
     ) -> None:
         """
-        Handle a Http request of verb GET.
+        Reply to a Http request.
 
         :param http_msg: the http message
         :param http_dialogue: the http dialogue
+        :param status_code: the status code of the response
+        :param body: the body of the response
+        :param status_text: the status text of the response
+        :param headers: headers to send on top of those of the request
         """
         http_response = http_dialogue.reply(
             performative=HttpMessage.Performative.RESPONSE,
             target_message=http_msg,
             version=http_msg.version,
-            status_code=200,
-            status_text="",
-            headers=http_msg.headers,
-            body=json.dumps({"agent_address": f"{self.context.agent_address}"}).encode("utf-8"),
+            status_code=status_code,
+            status_text=status_text,
+            headers=f"{headers}{http_msg.headers}",
+            body=body,
         )
         self.context.outbox.put_message(message=http_response)
 
+    def _send_cached(
+        self, http_msg: HttpMessage, http_dialogue: HttpDialogue, cached: CachedResponse
+    ) -> None:
+        """
+        Reply to a Http request with a cached response, or with 304 if the client has it.
+
+        :param http_msg: the http message
+        :param http_dialogue: the http dialogue
+        :param cached: the cached response
+        """
+        headers = f"ETag: {cached.etag}\n"
+        if etag_matches(parse_headers(http_msg.headers).get("if-none-match"), cached.etag):
+            self._send_response(
+                http_msg, http_dialogue, status_code=304, status_text="Not Modified", body=b"", headers=headers
+            )
+            return
+        self._send_response(http_msg, http_dialogue, status_code=200, body=cached.body, headers=headers)
+
+    def _return_config(
+        self, http_msg: HttpMessage, http_dialogue: HttpDialogue
+    ) -> None:
+        """
+        Handle a Http request of verb GET.
+
+        :param http_msg: the http message
+        :param http_dialogue: the http dialogue
+        """
+        agent_address = f"{self.context.agent_address}"
+        cached = self.response_cache.get(
+            "config", agent_address, lambda: {"agent_address": agent_address}
+        )
+        self._send_cached(http_msg, http_dialogue, cached)
 
     def _return_whitelist(
         self, http_msg: HttpMessage, http_dialogue: HttpDialogue
@@ -249,16 +425,18 @@ class HttpHandler(Handler):
         )
         self.context.outbox.put_message(message=http_response)
 
-    def _handle_claim(self, http_msg: HttpMessage, http_dialogue: HttpDialogue) -> None:
+    def _handle_claim(
+        self, http_msg: HttpMessage, http_dialogue: HttpDialogue, payload: Dict[str, Any]
+    ) -> None:
         """
-        Handle a Http request of verb GET.
+        Handle a Http request of verb POST.
 
         :param http_msg: the http message
         :param http_dialogue: the http dialogue
+        :param payload: the validated body of the request
         """
         strategy = cast(Strategy, self.context.strategy)
 
-        payload = json.loads(http_msg.body)
         address = payload.get("public_address")
 
         status_text = "Unsuccessful"
@@ -295,7 +473,43 @@ class HttpHandler(Handler):
             elif native_balance.amount < strategy.gwei_per_request:
                 status_text = "Insufficient funds in faucet"
             else:
+                tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+                reservation = strategy.drip_reservation(strategy.gwei_per_request)
+                admission = strategy.admission.decide(
+                    request_ledger,
+                    tx_behaviour.lane_load(request_ledger),
+                    available=strategy.outflow.available(
+                        request_ledger, native_balance.amount, native_balance.updated_at
+                    ),
+                    amount=reservation,
+                )
+                if not admission.accepted:
+                    self.context.logger.info(
+                        f"rejecting claim of {address} on {request_ledger}: {admission.decision}."
+                    )
+                    if admission.decision == AdmissionDecision.LEDGER_UNAVAILABLE:
+                        status_code, status_text, error = (
+                            503,
+                            "Service Unavailable",
+                            f"The ledger {request_ledger} is temporarily unavailable, please retry later.",
+                        )
+                    else:
+                        status_code, status_text, error = (
+                            429,
+                            "Too Many Requests",
+                            f"The faucet is at capacity on {request_ledger}, please retry later.",
+                        )
+                    self._send_error(
+                        http_msg,
+                        http_dialogue,
+                        status_code=status_code,
+                        status_text=status_text,
+                        error=error,
+                        headers=f"Retry-After: {admission.retry_after}\n",
+                    )
+                    return
                 status_text = "Success! Please await transaction confirmation."
+                strategy.outflow.reserve(request_ledger, reservation)
                 self._make_transfer(address, request_ledger)
         else:
             status_text = "Address has already claimed today."
@@ -332,10 +546,8 @@ class HttpHandler(Handler):
 
     def _make_transfer(self, address, ledger_id):
         self.context.logger.info(f"Preparing a drip tx to {address} on {ledger_id}")
-        strategy = cast(Strategy, self.context.strategy)
-        terms = strategy.get_drip_terms(address, ledger_id=ledger_id)
         tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
-        tx_behaviour.waiting.append(terms)
+        tx_behaviour.enqueue(address, ledger_id)
 
 
 class LedgerApiHandler(Handler):
@@ -368,6 +580,8 @@ class LedgerApiHandler(Handler):
         # handle message
         if ledger_api_msg.performative is LedgerApiMessage.Performative.BALANCE:
             self._handle_balance(ledger_api_msg)
+        elif ledger_api_msg.performative is LedgerApiMessage.Performative.STATE:
+            self._handle_state(ledger_api_msg, ledger_api_dialogue)
         elif (
             ledger_api_msg.performative is LedgerApiMessage.Performative.RAW_TRANSACTION
         ):
@@ -423,6 +637,18 @@ class LedgerApiHandler(Handler):
             )
             # self.context.is_active = False
 
+    def _handle_state(
+        self, ledger_api_msg: LedgerApiMessage, ledger_api_dialogue: LedgerApiDialogue
+    ) -> None:
+        """
+        Handle a message of state performative.
+
+        :param ledger_api_msg: the ledger api message
+        :param ledger_api_dialogue: the ledger api dialogue
+        """
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        tx_behaviour.seed_nonce(ledger_api_dialogue, ledger_api_msg.state.body)
+
     def _handle_transaction_digest(
         self, ledger_api_msg: LedgerApiMessage, ledger_api_dialogue: LedgerApiDialogue
     ) -> None:
@@ -449,6 +675,11 @@ class LedgerApiHandler(Handler):
         receipt_dialogue.initial_ledger_api_dialogue = (
             ledger_api_dialogue.initial_ledger_api_dialogue
         )
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        tx_behaviour.record_broadcast(
+            receipt_dialogue.initial_ledger_api_dialogue,
+            ledger_api_msg.transaction_digest.body,
+        )
         self.context.logger.info("checking transaction is settled.")
         self.context.outbox.put_message(message=ledger_api_msg)
 
@@ -466,18 +697,25 @@ class LedgerApiHandler(Handler):
                 ledger_api_msg, ledger_api_dialogue
             )
         )
+        retry_after = record_unavailable_ledger(self, ledger_api_msg.code, ledger_api_msg.data)
         ledger_api_msg_ = cast(
             Optional[LedgerApiMessage], ledger_api_dialogue.last_outgoing_message
         )
-        if (
-            ledger_api_msg_ is not None
-            and ledger_api_msg_.performative
-            != LedgerApiMessage.Performative.GET_BALANCE
-        ):
-            tx_behaviour = cast(
-                TransactionBehaviour, self.context.behaviours.transaction
+        if ledger_api_msg_ is None:
+            return
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        if ledger_api_msg_.performative == LedgerApiMessage.Performative.GET_STATE:
+            tx_behaviour.failed_nonce_seed(ledger_api_dialogue)
+        elif ledger_api_msg_.performative != LedgerApiMessage.Performative.GET_BALANCE:
+            tx_behaviour.failed_processing(
+                ledger_api_dialogue,
+                error=ledger_api_msg.message,
+                broadcast=ledger_api_msg_.performative
+                != LedgerApiMessage.Performative.GET_RAW_TRANSACTION,
+                retry_after=retry_after,
+                receipt=ledger_api_msg_.performative
+                == LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
             )
-            tx_behaviour.failed_processing(ledger_api_dialogue)
 
     def _handle_invalid(
         self, ledger_api_msg: LedgerApiMessage, ledger_api_dialogue: LedgerApiDialogue
@@ -501,12 +739,21 @@ class LedgerApiHandler(Handler):
         """Handle a message of raw_transaction performative."""
 
         self.context.logger.debug("received raw transaction={}".format(ledger_api_msg))
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        drip = tx_behaviour.get_in_flight(ledger_api_dialogue)
+        if drip is None:
+            self.context.logger.warning(
+                f"dropping raw transaction of timed out dialogue={ledger_api_dialogue}."
+            )
+            tx_behaviour.finish_processing(ledger_api_dialogue)
+            return
         signing_dialogues = cast(SigningDialogues, self.context.signing_dialogues)
 
         # we have to do a hack here because api.get_transfer_transaction()
         # adds in data when transfering to SAFE contract.
         # this is a hack to remove that data.
         ledger_api_msg.raw_transaction._body["data"] = "0x"
+        ledger_api_msg.raw_transaction._body["nonce"] = drip.nonce
         ledger_api_dialogue.initial_ledger_id = ledger_api_msg.raw_transaction.ledger_id
         ledger_api_msg.raw_transaction._ledger_id = "ethereum"
         signing_msg, signing_dialogue = signing_dialogues.create(
@@ -549,7 +796,11 @@ class LedgerApiHandler(Handler):
             LedgerApiDialogue, ledger_api_dialogue.initial_ledger_api_dialogue
         )
         if is_settled:
-            tx_behaviour.finish_processing(initial_ledger_api_dialogue)
+            receipt = ledger_api_msg.transaction_receipt.receipt
+            tx_behaviour.finish_processing(
+                initial_ledger_api_dialogue,
+                fee=get_transaction_fee(receipt),
+            )
             self.context.logger.info(
                 "Transaction {} is settled!".format(
                     ledger_api_msg.transaction_receipt.receipt.get("transactionHash")
@@ -564,6 +815,121 @@ class LedgerApiHandler(Handler):
             )
 
 
+class ContractApiHandler(Handler):
+    """Implement the contract api handler."""
+
+    SUPPORTED_PROTOCOL = ContractApiMessage.protocol_id  # type: Optional[PublicId]
+
+    def setup(self) -> None:
+        """Implement the setup for the handler."""
+
+    def handle(self, message: Message) -> None:
+        """
+        Implement the reaction to a message.
+
+        :param message: the message
+        """
+        contract_api_msg = cast(ContractApiMessage, message)
+
+        # recover dialogue
+        contract_api_dialogues = cast(
+            ContractApiDialogues, self.context.contract_api_dialogues
+        )
+        contract_api_dialogue = cast(
+            Optional[ContractApiDialogue], contract_api_dialogues.update(contract_api_msg)
+        )
+        if contract_api_dialogue is None:
+            self._handle_unidentified_dialogue(contract_api_msg)
+            return
+
+        # handle message
+        if contract_api_msg.performative is ContractApiMessage.Performative.RAW_TRANSACTION:
+            self._handle_raw_transaction(contract_api_msg, contract_api_dialogue)
+        elif contract_api_msg.performative == ContractApiMessage.Performative.ERROR:
+            self._handle_error(contract_api_msg, contract_api_dialogue)
+        else:
+            self._handle_invalid(contract_api_msg, contract_api_dialogue)
+
+    def teardown(self) -> None:
+        """Implement the handler teardown."""
+
+    def _handle_unidentified_dialogue(self, contract_api_msg: ContractApiMessage) -> None:
+        """
+        Handle an unidentified dialogue.
+
+        :param contract_api_msg: the message
+        """
+        self.context.logger.info(
+            f"received invalid contract_api message={contract_api_msg}, unidentified dialogue."
+        )
+
+    def _handle_raw_transaction(
+        self, contract_api_msg: ContractApiMessage, contract_api_dialogue: ContractApiDialogue
+    ) -> None:
+        """
+        Handle a message of raw_transaction performative.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        self.context.logger.debug(f"received raw transaction={contract_api_msg}")
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        drip = tx_behaviour.get_in_flight(contract_api_dialogue)
+        if drip is None:
+            self.context.logger.warning(
+                f"dropping raw transaction of timed out dialogue={contract_api_dialogue}."
+            )
+            tx_behaviour.finish_processing(contract_api_dialogue)
+            return
+        contract_api_msg.raw_transaction._body["nonce"] = drip.nonce
+        contract_api_msg.raw_transaction._ledger_id = "ethereum"
+        signing_dialogues = cast(SigningDialogues, self.context.signing_dialogues)
+        signing_msg, signing_dialogue = signing_dialogues.create(
+            counterparty=self.context.decision_maker_address,
+            performative=SigningMessage.Performative.SIGN_TRANSACTION,
+            raw_transaction=contract_api_msg.raw_transaction,
+            terms=contract_api_dialogue.terms,
+        )
+        signing_dialogue = cast(SigningDialogue, signing_dialogue)
+        signing_dialogue.associated_contract_api_dialogue = contract_api_dialogue
+        self.context.decision_maker_message_queue.put_nowait(signing_msg)
+        self.context.logger.info(
+            f"proposing a batch of {len(drip.recipients)} drips to the decision maker. Waiting for confirmation ..."
+        )
+
+    def _handle_error(
+        self, contract_api_msg: ContractApiMessage, contract_api_dialogue: ContractApiDialogue
+    ) -> None:
+        """
+        Handle a message of error performative.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        self.context.logger.info(
+            f"received contract_api error message={contract_api_msg} in dialogue={contract_api_dialogue}."
+        )
+        retry_after = record_unavailable_ledger(self, contract_api_msg.code, contract_api_msg.data)
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        tx_behaviour.failed_processing(
+            contract_api_dialogue, error=contract_api_msg.message, retry_after=retry_after
+        )
+
+    def _handle_invalid(
+        self, contract_api_msg: ContractApiMessage, contract_api_dialogue: ContractApiDialogue
+    ) -> None:
+        """
+        Handle a message of invalid performative.
+
+        :param contract_api_msg: the contract api message
+        :param contract_api_dialogue: the contract api dialogue
+        """
+        self.context.logger.warning(
+            f"cannot handle contract_api message of performative={contract_api_msg.performative}"
+            f" in dialogue={contract_api_dialogue}."
+        )
+
+
 class SigningHandler(Handler):
     """Implement the signing handler."""
 
@@ -620,22 +986,31 @@ class SigningHandler(Handler):
         :param signing_dialogue: the dialogue
         """
         self.context.logger.info("transaction signing was successful.")
-        ledger_api_dialogue = signing_dialogue.associated_ledger_api_dialogue
-        last_ledger_api_msg = ledger_api_dialogue.last_incoming_message
+        initial_dialogue = self._get_initial_dialogue(signing_dialogue)
+        last_api_msg = initial_dialogue.last_incoming_message
         ledger_api_dialogues = cast(
             LedgerApiDialogues, self.context.ledger_api_dialogues
         )
-        if last_ledger_api_msg is None:
-            raise ValueError("Could not retrieve last message in ledger api dialogue")
+        if last_api_msg is None:
+            raise ValueError("Could not retrieve last message in the api dialogue")
+        tx_behaviour = cast(TransactionBehaviour, self.context.behaviours.transaction)
+        drip = tx_behaviour.get_in_flight(initial_dialogue)
+        if drip is None:
+            self.context.logger.warning(
+                f"dropping signed transaction of timed out dialogue={initial_dialogue}."
+            )
+            tx_behaviour.finish_processing(initial_dialogue)
+            return
+        tx_behaviour.record_signed(drip, signing_msg.signed_transaction.body)
 
         ledger_api_msg, submission_dialogue = ledger_api_dialogues.create(
-            counterparty=last_ledger_api_msg.sender,
+            counterparty=last_api_msg.sender,
             performative=LedgerApiMessage.Performative.SEND_SIGNED_TRANSACTION,
             signed_transaction=signing_msg.signed_transaction,
         )
-        ledger_api_msg.signed_transaction._ledger_id = ledger_api_dialogue.initial_ledger_id
-        submission_dialogue.terms = ledger_api_dialogue.terms
-        submission_dialogue.initial_ledger_api_dialogue = ledger_api_dialogue
+        ledger_api_msg.signed_transaction._ledger_id = drip.ledger_id
+        submission_dialogue.terms = initial_dialogue.terms
+        submission_dialogue.initial_ledger_api_dialogue = initial_dialogue
         self.context.outbox.put_message(message=ledger_api_msg)
         self.context.logger.info("sending transaction to ledger.")
 
@@ -663,8 +1038,16 @@ class SigningHandler(Handler):
             tx_behaviour = cast(
                 TransactionBehaviour, self.context.behaviours.transaction
             )
-            ledger_api_dialogue = signing_dialogue.associated_ledger_api_dialogue
-            tx_behaviour.failed_processing(ledger_api_dialogue)
+            tx_behaviour.failed_processing(self._get_initial_dialogue(signing_dialogue))
+
+    @staticmethod
+    def _get_initial_dialogue(
+        signing_dialogue: SigningDialogue,
+    ) -> Union[LedgerApiDialogue, ContractApiDialogue]:
+        """Get the dialogue that requested the raw transaction being signed."""
+        if signing_dialogue._associated_contract_api_dialogue is not None:
+            return signing_dialogue.associated_contract_api_dialogue
+        return signing_dialogue.associated_ledger_api_dialogue
 
     def _handle_invalid(
         self, signing_msg: SigningMessage, signing_dialogue: SigningDialogue
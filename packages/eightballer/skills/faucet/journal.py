@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the write-behind drip request journal of the 'faucet' skill."""
+
+import queue
+import threading
+import time
+from logging import Logger
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from packages.eightballer.skills.faucet.models import DripRequest
+
+DEFAULT_MAX_BATCH = 200
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_MAX_QUEUED = 10_000
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BACKOFF = 0.1
+
+_WAKE_UP: Dict[str, Any] = {}
+
+
+class DripRequestJournal:
+    """
+    Buffer drip requests and write them to the database in groups.
+
+    A background thread takes rows off a bounded queue and writes them with a single
+    multi-row INSERT per group, once `max_batch` rows are waiting or `flush_interval`
+    seconds have passed. When the queue is full, rows are written by the caller instead.
+    A group that cannot be written is tried again up to `max_attempts` times, waiting
+    twice as long each time, and then row by row so that one bad row loses no other.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        logger: Logger,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+    ) -> None:
+        """
+        Initialize the journal.
+
+        :param engine: the database engine
+        :param logger: the logger
+        :param max_batch: the maximum number of rows written per statement
+        :param flush_interval: the maximum time a row waits before being written, in seconds
+        :param max_queued: the maximum number of rows waiting to be written
+        :param max_attempts: the number of times a group is tried before writing it row by row
+        :param retry_backoff: the wait before the first retry of a group, in seconds
+        """
+        self.engine = engine
+        self.logger = logger
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queued)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background writer."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="drip-request-journal", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background writer, once every queued row has been written."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._queue.put(_WAKE_UP)
+        self._thread.join()
+        self._thread = None
+
+    def record(self, row: Dict[str, Any]) -> None:
+        """
+        Queue a drip request row for writing.
+
+        :param row: the column values of the drip request
+        """
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.logger.warning("Drip request journal is full, writing synchronously.")
+            self._write([row])
+
+    def _run(self) -> None:
+        """Write groups of rows until stopped, then drain the queue."""
+        while not self._stopped.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+        batch = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is _WAKE_UP:
+                continue
+            batch.append(row)
+            if len(batch) == self.max_batch:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        """Wait for a full batch or for the flush interval to pass."""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if row is _WAKE_UP:
+                break
+            batch.append(row)
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a group of rows, retrying with backoff, then row by row if it keeps failing."""
+        delay = self.retry_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._insert(batch)
+                return
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.warning(
+                    f"Failed to write {len(batch)} drip requests (attempt {attempt}/{self.max_attempts}): {e}"
+                )
+            if attempt < self.max_attempts:
+                time.sleep(delay)
+                delay *= 2
+        if len(batch) == 1:
+            self.logger.error(f"Dropping drip request that cannot be written: {batch[0]}")
+            return
+        for row in batch:
+            try:
+                self._insert([row])
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.error(f"Dropping drip request that cannot be written: {row}: {e}")
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a group of rows in a single transaction."""
+        with self.engine.begin() as connection:
+            connection.execute(DripRequest.__table__.insert().values(batch))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the per-ledger drip lanes of the 'faucet' skill."""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from aea.helpers.transaction.base import Terms
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BACKOFF = 5.0
+DEFAULT_MAX_BACKOFF = 300.0
+THROUGHPUT_WINDOW = 60.0
+
+
+class DripLane:
+    """
+    Queue and schedule the drips of a single ledger.
+
+    A lane has its own limit of drips in flight. Once `failure_threshold` drips in a row
+    have failed, the lane is paused; every further failure doubles the pause, up to
+    `max_backoff` seconds. The first success resumes the lane at full speed.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        ledger_id: str,
+        max_in_flight: int,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the lane.
+
+        :param ledger_id: the ledger of the lane
+        :param max_in_flight: the maximum number of drips processed at the same time
+        :param failure_threshold: the number of failures in a row that pauses the lane
+        :param backoff: the first pause of the lane, in seconds
+        :param max_backoff: the longest pause of the lane, in seconds
+        :param clock: the monotonic clock of the lane, in seconds
+        """
+        self.ledger_id = ledger_id
+        self.max_in_flight = max_in_flight
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self.queue: Deque[Terms] = deque()
+        self._enqueued_at: Deque[float] = deque()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.paused_until = 0.0
+        self._completions: Deque[float] = deque()
+
+    def __len__(self) -> int:
+        """Get the number of queued drips."""
+        return len(self.queue)
+
+    def enqueue(self, terms: Terms, first: bool = False) -> None:
+        """
+        Queue a drip.
+
+        :param terms: the terms of the drip
+        :param first: whether to process the drip before the already queued ones
+        """
+        if first:
+            self.queue.appendleft(terms)
+            # keep the wait times ordered, so the front is always the oldest
+            self._enqueued_at.appendleft(
+                self._enqueued_at[0] if self._enqueued_at else self._clock()
+            )
+        else:
+            self.queue.append(terms)
+            self._enqueued_at.append(self._clock())
+
+    def is_paused(self) -> bool:
+        """Check whether the lane is paused after failures."""
+        return self._clock() < self.paused_until
+
+    def available(self) -> int:
+        """Get the number of transactions the lane can start now."""
+        if self.is_paused():
+            return 0
+        return max(0, min(self.max_in_flight - self.in_flight, len(self.queue)))
+
+    def oldest_wait(self) -> float:
+        """Get how long the oldest queued drip has been waiting, in seconds."""
+        if not self._enqueued_at:
+            return 0.0
+        return self._clock() - self._enqueued_at[0]
+
+    def start(self, count: int = 1) -> List[Terms]:
+        """
+        Take the next drips off the queue and count them as a single transaction in flight.
+
+        :param count: the maximum number of drips paid by the transaction
+        :return: the terms of the drips
+        """
+        drips = []
+        while self.queue and len(drips) < count:
+            drips.append(self.queue.popleft())
+            self._enqueued_at.popleft()
+        self.in_flight += 1
+        return drips
+
+    def resume(self) -> None:
+        """Count a transaction recovered after a restart as in flight."""
+        self.in_flight += 1
+
+    def record_success(self, drips: int = 1) -> None:
+        """
+        Record a transaction that was settled.
+
+        :param drips: the number of drips paid by the transaction
+        """
+        now = self._clock()
+        self.in_flight = max(0, self.in_flight - 1)
+        self.completed += drips
+        self.consecutive_failures = 0
+        self.paused_until = 0.0
+        self._completions.extend([now] * drips)
+        self._expire(now)
+
+    def record_failure(self, drips: int = 1, ledger_error: bool = True) -> Optional[float]:
+        """
+        Record a transaction that failed.
+
+        :param drips: the number of drips the transaction should have paid
+        :param ledger_error: whether the failure says anything about the health of the ledger
+        :return: the pause of the lane in seconds, if the failure paused it
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        self.failed += drips
+        return self.record_error() if ledger_error else None
+
+    def record_refusal(self, pause: float) -> None:
+        """
+        Record a transaction the ledger connection refused to send, pausing the lane until it takes requests again.
+
+        :param pause: the time until the ledger connection takes the requests of the ledger again, in seconds
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        self.paused_until = max(self.paused_until, self._clock() + pause)
+
+    def record_error(self) -> Optional[float]:
+        """
+        Record an error of the ledger, pausing the lane after too many in a row.
+
+        :return: the pause of the lane in seconds, if the error paused it
+        """
+        self.consecutive_failures += 1
+        excess = self.consecutive_failures - self.failure_threshold
+        if excess < 0:
+            return None
+        pause = min(self.backoff * 2 ** excess, self.max_backoff)
+        self.paused_until = self._clock() + pause
+        return pause
+
+    def throughput(self) -> int:
+        """Get the number of drips settled over the last minute."""
+        self._expire(self._clock())
+        return len(self._completions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the queue depth, throughput and health of the lane."""
+        return {
+            "queued": len(self.queue),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "throughput_per_minute": self.throughput(),
+            "paused_for": max(0.0, self.paused_until - self._clock()),
+        }
+
+    def _expire(self, now: float) -> None:
+        """Drop the completions that fell out of the throughput window."""
+        while self._completions and self._completions[0] <= now - THROUGHPUT_WINDOW:
+            self._completions.popleft()
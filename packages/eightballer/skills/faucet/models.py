@@ -20,8 +20,25 @@
 
 """This module contains the db models for the 'faucet' skill."""
 
-from sqlalchemy import TIMESTAMP, Boolean, Column, Integer, Numeric, String
+import json
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    TIMESTAMP,
+    Boolean,
+    Column,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    func,
+    select,
+)
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
 
 Base = declarative_base()
 metadata = Base.metadata
@@ -32,8 +49,8 @@ class BanList(Base):  # type: ignore
 
     __tablename__ = "BanList"
 
-    id = Column(Numeric, primary_key=True)
-    public_address = Column(Numeric)
+    id = Column(Integer, primary_key=True)
+    public_address = Column(String)
 
 
 class DripRequest(Base):  # type: ignore
@@ -42,11 +59,21 @@ class DripRequest(Base):  # type: ignore
     __tablename__ = "DripRequests"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    created_at = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, index=True)
     public_address = Column(String)
     valid_request = Column(Boolean)
     ledger_id = Column(String)
 
+    __table_args__ = (
+        Index(
+            "ix_DripRequests_address_ledger_created",
+            "public_address",
+            "ledger_id",
+            "created_at",
+        ),
+        Index("ix_DripRequests_ledger_id", "ledger_id", "id"),
+    )
+
     def as_dict(self):
         datetime_str = self.created_at.strftime("%Y-%m-%d %H:%M:%S")
         return {
@@ -63,5 +90,264 @@ class AllowList(Base):  # type: ignore
 
     __tablename__ = "WhiteList"
 
-    id = Column(Numeric, primary_key=True)
-    public_address = Column(Numeric)
+    id = Column(Integer, primary_key=True)
+    public_address = Column(String)
+
+
+class QueuedDrip(Base):  # type: ignore
+    """Represents an accepted drip, from its claim until it is paid or has failed."""
+
+    __tablename__ = "DripQueue"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP)
+    ledger_id = Column(String, nullable=False)
+    sender_address = Column(String, nullable=False)
+    recipient = Column(String, nullable=False)
+    # amounts in the smallest unit of a currency overflow 64 bit integers
+    amount = Column(String, nullable=False)
+    state = Column(String, nullable=False)
+    nonce = Column(Integer)
+    tx_hash = Column(String)
+    signed_tx = Column(Text)
+
+    __table_args__ = (
+        Index("ix_DripQueue_state_ledger_id", "state", "ledger_id", "id"),
+        Index("ix_DripQueue_tx_hash", "tx_hash"),
+    )
+
+
+class SchemaMigration(Base):  # type: ignore
+    """Represents a data migration that has been applied to the database."""
+
+    __tablename__ = "SchemaMigrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(TIMESTAMP)
+
+
+NORMALISED_ADDRESSES_MIGRATION = "normalised_addresses"
+
+
+SQLITE_PROFILES = {
+    "default": (),
+    "wal": ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"),
+}
+
+
+def apply_sqlite_profile(engine: Engine, profile: str) -> None:
+    """
+    Apply a set of pragmas to every new SQLite connection of an engine.
+
+    The `wal` profile trades durability of the last transactions on power loss
+    for commits that no longer wait for an fsync.
+
+    :param engine: the database engine
+    :param profile: the name of the profile, one of `SQLITE_PROFILES`
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown sqlite profile {profile}, expected one of {list(SQLITE_PROFILES)}.")
+    pragmas = SQLITE_PROFILES[profile]
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    def set_pragmas(dbapi_connection: Any, _: Any) -> None:
+        """Set the pragmas of the profile on a new connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+
+
+def migrate(engine: Engine) -> None:
+    """
+    Bring the database up to the current schema.
+
+    `create_all` only creates missing tables, so indexes added to an existing
+    table are created here as well. Drip requests stored before addresses were
+    normalised are normalised once, so that they match lookups by exact address;
+    the migration is recorded so later starts do not scan the table again.
+
+    :param engine: the database engine
+    """
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    migrations = SchemaMigration.__table__
+    with engine.begin() as connection:
+        applied = connection.execute(
+            select(migrations.c.name).where(migrations.c.name == NORMALISED_ADDRESSES_MIGRATION)
+        ).first()
+        if applied is not None:
+            return
+        lowered = func.lower(DripRequest.public_address)
+        connection.execute(
+            DripRequest.__table__.update()
+            .where(DripRequest.public_address != lowered)
+            .values(public_address=lowered)
+        )
+        connection.execute(
+            migrations.insert().values(name=NORMALISED_ADDRESSES_MIGRATION, applied_at=datetime.now())
+        )
+
+
+def count_claims(  # pylint: disable=too-many-arguments
+    session: Session,
+    address: str,
+    ledger_id: str,
+    start: datetime,
+    end: datetime,
+    limit: int,
+) -> int:
+    """
+    Count the valid claims of an address on a ledger within a timeframe.
+
+    The count stops at `limit`, so the lookup only ever touches `limit` index entries.
+
+    :param session: the database session
+    :param address: the claiming address, in any casing
+    :param ledger_id: the ledger of the claims
+    :param start: the start of the timeframe
+    :param end: the end of the timeframe
+    :param limit: the maximum count of interest
+    :return: the number of claims, capped at `limit`
+    """
+    return (
+        session.query(DripRequest.id)
+        .filter(DripRequest.public_address == normalise_address(address))
+        .filter(DripRequest.ledger_id == ledger_id)
+        .filter(DripRequest.created_at.between(start, end))
+        .filter(DripRequest.valid_request.is_(True))
+        .limit(limit)
+        .count()
+    )
+
+
+def iter_claims_since(session: Session, start: datetime) -> Iterator[Tuple[str, str, datetime]]:
+    """
+    Iterate over the valid claims made since a point in time, oldest first.
+
+    :param session: the database session
+    :param start: the earliest claim time of interest
+    :return: an iterator of (address, ledger_id, created_at) tuples
+    """
+    return iter(
+        session.query(
+            DripRequest.public_address,
+            DripRequest.ledger_id,
+            DripRequest.created_at,
+        )
+        .filter(DripRequest.created_at >= start)
+        .filter(DripRequest.valid_request.is_(True))
+        .order_by(DripRequest.created_at)
+        .yield_per(10_000)
+    )
+
+
+def normalise_address(address: str) -> str:
+    """Normalise an address so that lookups do not depend on its checksum casing."""
+    return address.strip().lower()
+
+
+def bulk_add_addresses(
+    session: Session, model: type, addresses: Iterable[str], chunk_size: int = 10_000
+) -> int:
+    """
+    Add addresses to an address list table, skipping those already present.
+
+    :param session: the database session
+    :param model: the address list model, `AllowList` or `BanList`
+    :param addresses: the addresses to add
+    :param chunk_size: the number of rows inserted per statement
+    :return: the number of addresses added
+    """
+    existing = {normalise_address(address) for address in get_addresses(session, model)}
+    new = [
+        address
+        for address in dict.fromkeys(normalise_address(a) for a in addresses)
+        if address and address not in existing
+    ]
+    next_id = int(session.query(func.max(model.id)).scalar() or 0) + 1
+    table = model.__table__
+    for offset in range(0, len(new), chunk_size):
+        session.execute(
+            table.insert(),
+            [
+                {"id": next_id + offset + i, "public_address": address}
+                for i, address in enumerate(new[offset : offset + chunk_size])
+            ],
+        )
+    session.commit()
+    return len(new)
+
+
+def get_addresses(session: Session, model: type) -> List[str]:
+    """
+    Get the addresses stored in an address list table.
+
+    :param session: the database session
+    :param model: the address list model, `AllowList` or `BanList`
+    :return: the stored addresses
+    """
+    return [address for (address,) in session.query(model.public_address) if address]
+
+
+def query_drip_requests(  # pylint: disable=too-many-arguments
+    session: Session,
+    limit: int,
+    after_id: Optional[int] = None,
+    ledger_id: Optional[str] = None,
+    address: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[DripRequest]:
+    """
+    Iterate over a page of drip requests, in id order.
+
+    :param session: the database session
+    :param limit: the maximum number of drip requests in the page
+    :param after_id: only return drip requests with a greater id
+    :param ledger_id: only return drip requests on this ledger
+    :param address: only return drip requests of this address, in any casing
+    :param start: only return drip requests made at or after this time
+    :param end: only return drip requests made at or before this time
+    :return: an iterator over the drip requests of the page
+    """
+    query = session.query(DripRequest)
+    if after_id is not None:
+        query = query.filter(DripRequest.id > after_id)
+    if ledger_id is not None:
+        query = query.filter(DripRequest.ledger_id == ledger_id)
+    if address is not None:
+        query = query.filter(DripRequest.public_address == normalise_address(address))
+    if start is not None:
+        query = query.filter(DripRequest.created_at >= start)
+    if end is not None:
+        query = query.filter(DripRequest.created_at <= end)
+    return iter(query.order_by(DripRequest.id).limit(limit).yield_per(1_000))
+
+
+def iter_drip_requests_json(drip_requests: Iterable[DripRequest], limit: int) -> Iterator[bytes]:
+    """
+    Encode a page of drip requests as JSON, one drip request at a time.
+
+    The page is encoded as `{"transactions": [...], "next_cursor": id}`, where the cursor
+    is the id to pass as `after_id` for the next page, or null on the last page.
+
+    :param drip_requests: the drip requests of the page
+    :param limit: the size of a full page
+    :return: an iterator over the chunks of the encoded page
+    """
+    yield b'{"transactions": ['
+    count, last_id = 0, None
+    for drip_request in drip_requests:
+        if count:
+            yield b", "
+        yield json.dumps(drip_request.as_dict()).encode("utf-8")
+        count, last_id = count + 1, drip_request.id
+    next_cursor = last_id if count == limit else None
+    yield f'], "next_cursor": {json.dumps(next_cursor)}}}'.encode("utf-8")
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the local nonce allocator of the 'faucet' skill."""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+NonceKey = Tuple[str, str]
+
+# geth and erigon report "nonce too low", nethermind reports "OldNonce"
+NONCE_TOO_LOW_ERRORS = ("nonce too low", "oldnonce")
+
+
+def is_nonce_too_low(error: Optional[str]) -> bool:
+    """
+    Check whether a ledger error means the nonce of a transaction was already used.
+
+    :param error: the error message returned by the ledger
+    :return: whether the nonces of the sender need to be resynced
+    """
+    if not error:
+        return False
+    error = error.lower()
+    return any(message in error for message in NONCE_TOO_LOW_ERRORS)
+
+
+# geth reports "already known", older nodes "known transaction"
+ALREADY_KNOWN_ERRORS = ("already known", "known transaction")
+
+
+def is_already_known(error: Optional[str]) -> bool:
+    """
+    Check whether a ledger error means the same transaction was already received.
+
+    :param error: the error message returned by the ledger
+    :return: whether the transaction is already known to the ledger
+    """
+    if not error:
+        return False
+    error = error.lower()
+    return any(message in error for message in ALREADY_KNOWN_ERRORS)
+
+
+@dataclass
+class _SenderNonces:
+    """The nonces of a sender on a ledger."""
+
+    next_nonce: int
+    released: List[int] = field(default_factory=list)
+
+
+class NonceManager:
+    """
+    Allocate transaction nonces locally for every (ledger, sender) pair.
+
+    A pair has to be seeded with the pending transaction count of the sender before
+    nonces can be allocated for it. Nonces of transactions that were never broadcast
+    are released and handed out again before new ones, so that no gap is left behind.
+    After a "nonce too low" error the pair is resynced: it has to be seeded again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the nonce manager."""
+        self._senders: Dict[NonceKey, _SenderNonces] = {}
+
+    @staticmethod
+    def key(ledger_id: str, sender: str) -> NonceKey:
+        """Get the key of a sender on a ledger, independent of the address checksum."""
+        return ledger_id, sender.lower()
+
+    def is_seeded(self, ledger_id: str, sender: str) -> bool:
+        """
+        Check whether nonces can be allocated for a sender on a ledger.
+
+        :param ledger_id: the ledger id
+        :param sender: the sender address
+        :return: whether the pair is seeded
+        """
+        return self.key(ledger_id, sender) in self._senders
+
+    def seed(self, ledger_id: str, sender: str, pending_count: int) -> None:
+        """
+        Seed the nonces of a sender from its pending transaction count on the ledger.
+
+        :param ledger_id: the ledger id
+        :param sender: the sender address
+        :param pending_count: the result of `eth_getTransactionCount(sender, "pending")`
+        """
+        self._senders[self.key(ledger_id, sender)] = _SenderNonces(next_nonce=pending_count)
+
+    def allocate(self, ledger_id: str, sender: str) -> Optional[int]:
+        """
+        Allocate the next nonce of a sender on a ledger.
+
+        :param ledger_id: the ledger id
+        :param sender: the sender address
+        :return: the nonce, or None if the pair is not seeded
+        """
+        nonces = self._senders.get(self.key(ledger_id, sender))
+        if nonces is None:
+            return None
+        if nonces.released:
+            return heapq.heappop(nonces.released)
+        nonce = nonces.next_nonce
+        nonces.next_nonce += 1
+        return nonce
+
+    def release(self, ledger_id: str, sender: str, nonce: int) -> None:
+        """
+        Give back the nonce of a transaction that was never broadcast.
+
+        :param ledger_id: the ledger id
+        :param sender: the sender address
+        :param nonce: the nonce
+        """
+        nonces = self._senders.get(self.key(ledger_id, sender))
+        if nonces is None or nonce >= nonces.next_nonce:
+            return
+        if nonce == nonces.next_nonce - 1 and not nonces.released:
+            nonces.next_nonce -= 1
+            return
+        heapq.heappush(nonces.released, nonce)
+
+    def resync(self, ledger_id: str, sender: str) -> None:
+        """
+        Forget the nonces of a sender on a ledger, so that it is seeded again.
+
+        :param ledger_id: the ledger id
+        :param sender: the sender address
+        """
+        self._senders.pop(self.key(ledger_id, sender), None)
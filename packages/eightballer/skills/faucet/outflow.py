@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the pending outflow accounting of the 'faucet' skill."""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+
+@dataclass
+class _LedgerOutflow:
+    """The outflow of the faucet on a ledger."""
+
+    reserved: int = 0
+    # (time, amount) of the drips settled since before the last polled balance
+    settled: Deque[Tuple[float, int]] = field(default_factory=deque)
+    settled_total: int = 0
+    polled_at: Optional[float] = None
+
+
+class OutflowLedger:
+    """
+    Keep track of the funds committed to drips between two balance polls.
+
+    Every accepted drip reserves its amount and fee. A failed drip releases its
+    reservation; a settled drip turns it into a settlement of what it actually cost,
+    which is deducted from the polled balance until a later poll reflects it. A poll
+    is only assumed to reflect the settlements made before the previous poll, since
+    its balance request may have been sent before the latest ones.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        """
+        Initialize the outflow ledger.
+
+        :param clock: the clock of the balance updates, in seconds since the epoch
+        """
+        self._clock = clock
+        self._ledgers: Dict[str, _LedgerOutflow] = {}
+
+    def _get(self, ledger_id: str) -> _LedgerOutflow:
+        """Get the outflow of a ledger, creating it on first use."""
+        outflow = self._ledgers.get(ledger_id)
+        if outflow is None:
+            outflow = self._ledgers[ledger_id] = _LedgerOutflow()
+        return outflow
+
+    def reserved(self, ledger_id: str) -> int:
+        """
+        Get the funds reserved by drips not yet settled.
+
+        :param ledger_id: the ledger id
+        :return: the reserved amount
+        """
+        return self._get(ledger_id).reserved
+
+    def reserve(self, ledger_id: str, amount: int) -> None:
+        """
+        Reserve the funds of an accepted drip.
+
+        :param ledger_id: the ledger id
+        :param amount: the amount and fee of the drip
+        """
+        self._get(ledger_id).reserved += amount
+
+    def release(self, ledger_id: str, amount: int) -> None:
+        """
+        Release the funds of a drip that failed.
+
+        :param ledger_id: the ledger id
+        :param amount: the reserved amount and fee of the drip
+        """
+        outflow = self._get(ledger_id)
+        outflow.reserved = max(0, outflow.reserved - amount)
+
+    def settle(self, ledger_id: str, amount: int, spent: Optional[int] = None) -> None:
+        """
+        Settle the funds of a paid drip.
+
+        :param ledger_id: the ledger id
+        :param amount: the reserved amount and fee of the drip
+        :param spent: what the drip actually cost, the reserved amount if unknown
+        """
+        self.release(ledger_id, amount)
+        spent = amount if spent is None else spent
+        outflow = self._get(ledger_id)
+        outflow.settled.append((self._clock(), spent))
+        outflow.settled_total += spent
+
+    def reconcile(self, ledger_id: str, polled_at: Optional[float]) -> None:
+        """
+        Forget the settlements that a newly polled balance reflects.
+
+        :param ledger_id: the ledger id
+        :param polled_at: the time the balance of the ledger was last updated
+        """
+        outflow = self._get(ledger_id)
+        if polled_at == outflow.polled_at:
+            return
+        cutoff = outflow.polled_at
+        outflow.polled_at = polled_at
+        if cutoff is None:
+            return
+        while outflow.settled and outflow.settled[0][0] <= cutoff:
+            _, spent = outflow.settled.popleft()
+            outflow.settled_total -= spent
+
+    def available(self, ledger_id: str, balance: int, polled_at: Optional[float]) -> int:
+        """
+        Get the funds left for new drips.
+
+        :param ledger_id: the ledger id
+        :param balance: the last polled balance of the faucet on the ledger
+        :param polled_at: the time the balance was polled
+        :return: the balance, less the reserved and recently settled funds
+        """
+        self.reconcile(ledger_id, polled_at)
+        outflow = self._get(ledger_id)
+        return balance - outflow.reserved - outflow.settled_total
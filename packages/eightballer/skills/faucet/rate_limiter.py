@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the in-memory claim rate limiter of the 'faucet' skill."""
+
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, Optional, Tuple
+
+from packages.eightballer.skills.faucet.models import normalise_address
+
+DEFAULT_WINDOW = 24 * 60 * 60.0
+DEFAULT_MAX_ENTRIES = 100_000
+
+ClaimKey = Tuple[str, str]
+
+
+class ClaimRateLimiter:
+    """
+    Keep the recent claims of every (address, ledger) pair in memory.
+
+    Claims are kept in a sliding window and expire once they are older than the window.
+    At most `max_entries` pairs are tracked; the least recently claiming pairs are evicted
+    first. Once a pair with live claims has been evicted the limiter can no longer answer
+    for unknown pairs until those claims would have expired, and `is_limited` returns None.
+    """
+
+    def __init__(
+        self,
+        max_claims: int,
+        window: float = DEFAULT_WINDOW,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Initialize the rate limiter.
+
+        :param max_claims: the number of claims allowed within the window
+        :param window: the length of the sliding window, in seconds
+        :param max_entries: the maximum number of (address, ledger) pairs to track
+        :param clock: the clock giving the current time, in seconds since the epoch
+        """
+        self.max_claims = max_claims
+        self.window = window
+        self.max_entries = max_entries
+        self._clock = clock
+        self._claims: "OrderedDict[ClaimKey, Deque[float]]" = OrderedDict()
+        self._incomplete_until = 0.0
+
+    @staticmethod
+    def _key(address: str, ledger_id: str) -> ClaimKey:
+        """Get the key of an address on a ledger, independent of the address checksum."""
+        return normalise_address(address), ledger_id
+
+    def __len__(self) -> int:
+        """Get the number of tracked (address, ledger) pairs."""
+        return len(self._claims)
+
+    def warm_start(self, claims: Iterable[Tuple[str, str, float]]) -> None:
+        """
+        Rebuild the state of the limiter from past claims.
+
+        :param claims: (address, ledger_id, timestamp) tuples, oldest first
+        """
+        self._claims.clear()
+        self._incomplete_until = 0.0
+        for address, ledger_id, timestamp in claims:
+            self.record(address, ledger_id, timestamp)
+
+    def is_limited(self, address: str, ledger_id: str) -> Optional[bool]:
+        """
+        Check whether an address has used up its claims on a ledger.
+
+        :param address: the claiming address
+        :param ledger_id: the ledger of the claim
+        :return: whether the address is limited, or None if the limiter cannot tell
+        """
+        now = self._clock()
+        claims = self._claims.get(self._key(address, ledger_id))
+        if claims is None:
+            return None if now < self._incomplete_until else False
+        self._expire(claims, now)
+        return len(claims) >= self.max_claims
+
+    def record(self, address: str, ledger_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record a claim.
+
+        :param address: the claiming address
+        :param ledger_id: the ledger of the claim
+        :param timestamp: the time of the claim, defaults to now
+        """
+        now = self._clock() if timestamp is None else timestamp
+        key = self._key(address, ledger_id)
+        claims = self._claims.get(key)
+        if claims is None:
+            claims = self._claims[key] = deque()
+        else:
+            self._claims.move_to_end(key)
+        claims.append(now)
+        self._expire(claims, now)
+        self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> None:
+        """
+        Evict expired pairs, then the least recently claiming pairs above the memory cap.
+
+        :param now: the current time, defaults to the clock
+        """
+        now = self._clock() if now is None else now
+        # pairs are ordered by their last claim, so expired pairs are at the front
+        while self._claims:
+            key, claims = next(iter(self._claims.items()))
+            if claims and claims[-1] > now - self.window:
+                break
+            del self._claims[key]
+        while len(self._claims) > self.max_entries:
+            _, claims = self._claims.popitem(last=False)
+            if claims:
+                self._incomplete_until = max(self._incomplete_until, claims[-1] + self.window)
+
+    def _expire(self, claims: Deque[float], now: float) -> None:
+        """Drop the claims that fell out of the window."""
+        while claims and claims[0] <= now - self.window:
+            claims.popleft()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the cache of pre-encoded http responses of the 'faucet' skill."""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+class CachedResponse(NamedTuple):
+    """A pre-encoded json response and its strong entity tag."""
+
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """
+    Keep the encoded body of responses that only change with configuration.
+
+    Every entry is stored along with the version of the data it was built from; the
+    entry is rebuilt the first time it is requested with a different version.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the cache."""
+        self._entries: Dict[str, Tuple[Hashable, CachedResponse]] = {}
+
+    def get(self, key: str, version: Hashable, build: Callable[[], Any]) -> CachedResponse:
+        """
+        Get a cached response, building it if missing or outdated.
+
+        :param key: the key of the response, usually its endpoint
+        :param version: the version of the data the response is built from
+        :param build: builds the json serialisable content of the response
+        :return: the cached response
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        body = json.dumps(build()).encode("utf-8")
+        response = CachedResponse(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        self._entries[key] = (version, response)
+        return response
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Drop a cached response, or every cached response.
+
+        :param key: the key of the response, all responses if None
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+def parse_headers(headers: str) -> Dict[str, str]:
+    """
+    Parse the headers of a http message.
+
+    :param headers: the headers, one `name: value` per line
+    :return: the values by lower case header name
+    """
+    parsed = {}
+    for line in headers.splitlines():
+        name, sep, value = line.partition(":")
+        if sep:
+            parsed[name.strip().lower()] = value.strip()
+    return parsed
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check whether an `If-None-Match` header matches an entity tag.
+
+    :param if_none_match: the value of the header, if any
+    :param etag: the current entity tag
+    :return: whether the client already has the current representation
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the http route table of the 'faucet' skill."""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Tuple
+from urllib.parse import urlparse
+
+import yaml
+from jsonschema import Draft4Validator
+
+DEFAULT_API_SPEC_PATH = Path(__file__).parent / "open_api_spec.yaml"
+HTTP_METHODS = ["get", "put", "post", "delete", "options", "head", "patch"]
+
+_PATH_PARAM = re.compile(r"{([^{}/]+)}")
+
+
+class RouteNotFound(Exception):
+    """No route is defined for the requested path."""
+
+
+class MethodNotAllowed(Exception):
+    """The requested path does not support the requested method."""
+
+    def __init__(self, allowed: List[str]) -> None:
+        """Initialize the exception with the methods the path supports."""
+        super().__init__(f"Method not allowed, expected one of {allowed}")
+        self.allowed = allowed
+
+
+@dataclass(frozen=True)
+class Route:
+    """A route from a method and path template to an operation."""
+
+    method: str
+    template: str
+    operation_id: str
+    body_validator: Optional[Draft4Validator] = None
+
+
+@dataclass
+class RouteMatch:
+    """A route matched by a request, along with the parameters parsed from its path."""
+
+    route: Route
+    path_params: Dict[str, str] = field(default_factory=dict)
+
+
+class RouteTable:
+    """
+    Map the method and path of a request to a route.
+
+    Paths without parameters are resolved with a single dict lookup; templated paths
+    are only tried when no exact path matches.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the route table."""
+        self._exact: Dict[str, Dict[str, Route]] = {}
+        self._templated: List[Tuple[Pattern, Dict[str, Route]]] = []
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "RouteTable":
+        """
+        Build a route table from an OpenAPI specification.
+
+        Every operation must define an `operationId`; the json schema of its request
+        body, if any, is compiled into a validator once.
+
+        :param spec: the OpenAPI specification
+        :return: the route table
+        """
+        table = cls()
+        for template, operations in spec.get("paths", {}).items():
+            for method, operation in operations.items():
+                if method not in HTTP_METHODS:
+                    continue
+                if "operationId" not in operation:
+                    raise ValueError(f"Missing operationId for {method} {template}")
+                schema = (
+                    operation.get("requestBody", {})
+                    .get("content", {})
+                    .get("application/json", {})
+                    .get("schema")
+                )
+                table.add(
+                    Route(
+                        method=method,
+                        template=template,
+                        operation_id=operation["operationId"],
+                        body_validator=Draft4Validator(schema) if schema else None,
+                    )
+                )
+        return table
+
+    @classmethod
+    def from_spec_file(cls, path: Path = DEFAULT_API_SPEC_PATH) -> "RouteTable":
+        """
+        Build a route table from an OpenAPI specification file.
+
+        :param path: the path of the specification
+        :return: the route table
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            return cls.from_spec(yaml.safe_load(file))
+
+    def add(self, route: Route) -> None:
+        """
+        Add a route to the table.
+
+        :param route: the route
+        """
+        if _PATH_PARAM.search(route.template) is None:
+            self._exact.setdefault(route.template, {})[route.method] = route
+            return
+        pattern = re.compile(
+            "^"
+            + _PATH_PARAM.sub(
+                lambda m: f"(?P<{m.group(1)}>[^/]+)",
+                re.escape(route.template).replace(r"\{", "{").replace(r"\}", "}"),
+            )
+            + "$"
+        )
+        for existing, routes in self._templated:
+            if existing.pattern == pattern.pattern:
+                routes[route.method] = route
+                return
+        self._templated.append((pattern, {route.method: route}))
+
+    def __iter__(self) -> Iterator[Route]:
+        """Iterate over the routes of the table."""
+        for routes in self._exact.values():
+            yield from routes.values()
+        for _, routes in self._templated:
+            yield from routes.values()
+
+    def match(self, method: str, url: str) -> RouteMatch:
+        """
+        Match a request to a route.
+
+        :param method: the method of the request
+        :param url: the url of the request
+        :return: the matched route and its path parameters
+        :raises RouteNotFound: if no route is defined for the path
+        :raises MethodNotAllowed: if the path does not support the method
+        """
+        routes, path_params = self._routes_for(url)
+        route = routes.get(method.lower())
+        if route is None:
+            raise MethodNotAllowed(sorted(routes))
+        return RouteMatch(route, path_params)
+
+    def _routes_for(self, url: str) -> Tuple[Dict[str, Route], Dict[str, str]]:
+        """Get the routes of the path of a url, along with the parsed path parameters."""
+        path = urlparse(url).path.rstrip("/") or "/"
+        routes = self._exact.get(path)
+        if routes is not None:
+            return routes, {}
+        for pattern, templated_routes in self._templated:
+            found = pattern.match(path)
+            if found is not None:
+                return templated_routes, found.groupdict()
+        raise RouteNotFound(path)
@@ -21,7 +21,7 @@
 """This module contains the strategy for the 'faucet' skill."""
 
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, FrozenSet, Iterable, Iterator, List, Optional
 
 from aea.crypto.ledger_apis import LedgerApis
 from aea.helpers.transaction.base import Terms
@@ -29,11 +29,38 @@ from aea.skills.base import Model
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from packages.eightballer.skills.faucet.admission import (
+    ADMISSION_KEY,
+    DEFAULT_COLD_START_ALLOWANCE,
+    DEFAULT_RETRY_AFTER,
+    AdmissionController,
+)
+from packages.eightballer.skills.faucet.journal import (
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_MAX_BATCH,
+    DEFAULT_MAX_QUEUED,
+    DEFAULT_RETRY_BACKOFF,
+    DripRequestJournal,
+)
 from packages.eightballer.skills.faucet.models import (
     AllowList,
     BanList,
-    Base,
     DripRequest,
+    apply_sqlite_profile,
+    bulk_add_addresses,
+    count_claims,
+    get_addresses,
+    iter_claims_since,
+    migrate,
+    normalise_address,
+    query_drip_requests,
+)
+from packages.eightballer.skills.faucet.outflow import OutflowLedger
+from packages.eightballer.skills.faucet.rate_limiter import (
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_WINDOW,
+    ClaimRateLimiter,
 )
 
 
@@ -62,25 +89,112 @@ class Strategy(Model):  # pylint: disable=too-many-instance-attributes
         self._currency_id = "ETH"
         self._allow_list = kwargs.pop("allow_list", [])
         self._ban_list = kwargs.pop("ban_list", [])
+        ban_list_file = kwargs.pop("ban_list_file", None)
         self.max_requests_per_day = kwargs.pop("max_requests_per_day", 1)
         self.gwei_per_request = kwargs.pop("gwei_per_request", 1)
+        self.drip_fee_reserve = kwargs.pop("drip_fee_reserve", 0)
+        self.rate_limit_window = kwargs.pop("rate_limit_window", DEFAULT_WINDOW)
+        rate_limiter_max_entries = kwargs.pop(
+            "rate_limiter_max_entries", DEFAULT_MAX_ENTRIES
+        )
+        admission_max_queue_depth = kwargs.pop("admission_max_queue_depth", None)
+        admission_max_drain_time = kwargs.pop("admission_max_drain_time", None)
+        admission_retry_after = kwargs.pop("admission_retry_after", DEFAULT_RETRY_AFTER)
+        admission_cold_start_allowance = kwargs.pop(
+            "admission_cold_start_allowance", DEFAULT_COLD_START_ALLOWANCE
+        )
         ledger_id = kwargs.pop("ledger_id", None)
         uri_string = kwargs.pop("database_uri_string", None)
+        sqlite_profile = kwargs.pop("sqlite_profile", "default")
+        write_behind = kwargs.pop("write_behind", True)
+        write_behind_max_batch = kwargs.pop("write_behind_max_batch", DEFAULT_MAX_BATCH)
+        write_behind_flush_interval = kwargs.pop(
+            "write_behind_flush_interval", DEFAULT_FLUSH_INTERVAL
+        )
+        write_behind_max_queued = kwargs.pop(
+            "write_behind_max_queued", DEFAULT_MAX_QUEUED
+        )
+        write_behind_max_attempts = kwargs.pop(
+            "write_behind_max_attempts", DEFAULT_MAX_ATTEMPTS
+        )
+        write_behind_retry_backoff = kwargs.pop(
+            "write_behind_retry_backoff", DEFAULT_RETRY_BACKOFF
+        )
 
         super().__init__(**kwargs)
-        self._setup_database(uri_string)
+        self._setup_database(uri_string, sqlite_profile)
+        self.journal: Optional[DripRequestJournal] = None
+        if write_behind and not self._is_in_memory_database:
+            self.journal = DripRequestJournal(
+                self.engine,
+                self.context.logger,
+                max_batch=write_behind_max_batch,
+                flush_interval=write_behind_flush_interval,
+                max_queued=write_behind_max_queued,
+                max_attempts=write_behind_max_attempts,
+                retry_backoff=write_behind_retry_backoff,
+            )
+            self.journal.start()
+        self.rate_limiter = ClaimRateLimiter(
+            max_claims=self.max_requests_per_day,
+            window=self.rate_limit_window,
+            max_entries=rate_limiter_max_entries,
+        )
+        self._warm_start_rate_limiter()
+        self.admission = AdmissionController(
+            max_queue_depth=admission_max_queue_depth,
+            max_drain_time=admission_max_drain_time,
+            default_retry_after=admission_retry_after,
+            cold_start_allowance=admission_cold_start_allowance,
+        )
+        self.context.shared_state[ADMISSION_KEY] = self.admission.decisions
+        self.outflow = OutflowLedger()
+        self._allowed_addresses: List[str] = []
+        self._banned_addresses: List[str] = []
+        self._allowed: FrozenSet[str] = frozenset()
+        self._banned: FrozenSet[str] = frozenset()
+        self._address_lists_stale = True
+        if ban_list_file is not None:
+            self.import_ban_list_from_file(ban_list_file)
         self._ledger_id = (
             ledger_id if ledger_id is not None else self.context.default_ledger_id
         )
 
-    def _setup_database(self, uri_string) -> None:
-        """Set up the database and ensure all tables are created."""
+    def _setup_database(self, uri_string, sqlite_profile: str = "default") -> None:
+        """Set up the database and ensure all tables and indexes are created."""
         self.engine = create_engine(uri_string)
-        Base.metadata.create_all(self.engine)
+        apply_sqlite_profile(self.engine, sqlite_profile)
+        migrate(self.engine)
         # create session
         session = sessionmaker(bind=self.engine)
         self.session = session()
 
+    @property
+    def _is_in_memory_database(self) -> bool:
+        """Check whether the database lives in memory, where each thread sees its own database."""
+        return self.engine.dialect.name == "sqlite" and self.engine.url.database in (
+            None,
+            "",
+            ":memory:",
+        )
+
+    def teardown(self) -> None:
+        """Write out the drip requests still waiting in the journal."""
+        if self.journal is not None:
+            self.journal.stop()
+        super().teardown()
+
+    def _warm_start_rate_limiter(self) -> None:
+        """Rebuild the rate limiter from the claims made within the rate limit window."""
+        start = datetime.now() - timedelta(seconds=self.rate_limit_window)
+        self.rate_limiter.warm_start(
+            (address, ledger_id, created_at.timestamp())
+            for address, ledger_id, created_at in iter_claims_since(self.session, start)
+        )
+        self.context.logger.info(
+            f"Rate limiter warm-started with {len(self.rate_limiter)} address/ledger pairs."
+        )
+
     def is_request_valid(self, address, ledger_id) -> bool:
         """Checks if a faucet request is valid."""
         if self.is_address_allowed(address):
@@ -88,47 +202,86 @@ class Strategy(Model):  # pylint: disable=too-many-instance-attributes
         if all(
             [
                 not self.is_address_banned(address),
-                not self.has_address_over_claimed_within_timeframe(address, ledger_id),
+                not self.is_address_rate_limited(address, ledger_id),
             ]
         ):
             return True
         return False
 
+    def is_address_rate_limited(self, address, ledger_id) -> bool:
+        """Check whether the address has used up its claims, falling back to the database if needed."""
+        limited = self.rate_limiter.is_limited(address, ledger_id)
+        if limited is None:
+            limited = self.has_address_over_claimed_within_timeframe(address, ledger_id)
+        return limited
+
     def is_address_allowed(self, address) -> bool:
         """Check whether the address is within the allowed list."""
-        return address in self.allow_list
+        self._ensure_address_lists()
+        return normalise_address(address) in self._allowed
 
     def is_address_banned(self, address) -> bool:
         """Check whether the address is within the ban list."""
-        return address in self.ban_list
+        self._ensure_address_lists()
+        return normalise_address(address) in self._banned
 
     def has_address_over_claimed_within_timeframe(self, address, ledger_id) -> bool:
-        """Cracked."""
+        """Check in the database whether the address has used up its claims within the rate limit window."""
         end = datetime.now()
-        start = end - timedelta(days=1)
-        results = (
-            self.session.query(DripRequest)
-            .filter(DripRequest.public_address == address)
-            .filter(DripRequest.created_at.between(start, end))
-            .filter(DripRequest.valid_request is True)
-            .filter(DripRequest.ledger_id == ledger_id)
+        start = end - timedelta(seconds=self.rate_limit_window)
+        claimed = count_claims(
+            self.session,
+            address,
+            ledger_id,
+            start,
+            end,
+            limit=self.max_requests_per_day,
         )
-        self.context.logger.info(f"Successfully claimed: {len(results.all())} today.")
-        return len(results.all()) >= self.max_requests_per_day
+        self.context.logger.info(f"Successfully claimed: {claimed} today.")
+        return claimed >= self.max_requests_per_day
 
     def add_drip_request(self, address: str, valid: bool, ledger_id: str) -> None:
-        """Cracked."""
-        request = DripRequest(
+        """Record a drip request, through the write-behind journal if enabled."""
+        row = dict(
             created_at=datetime.now(),
-            public_address=address,
+            public_address=normalise_address(address),
             valid_request=valid,
             ledger_id=ledger_id,
         )
-        self.session.add(request)
-        self.session.commit()
+        if self.journal is not None:
+            self.journal.record(row)
+        else:
+            self.session.add(DripRequest(**row))
+            self.session.commit()
+        if valid:
+            self.rate_limiter.record(address, ledger_id)
+
+    def drip_reservation(self, amount: int) -> int:
+        """
+        Get the funds to reserve for a drip until it is paid.
+
+        :param amount: the amount of the drip
+        :return: the amount and the fee reserved for the drip
+        """
+        return amount + self.drip_fee_reserve
+
+    def get_drip_terms(
+        self,
+        address,
+        ledger_id: str,
+        drip_id: Optional[int] = None,
+        amount: Optional[int] = None,
+    ) -> Terms:
+        """
+        Get the terms of a drop
 
-    def get_drip_terms(self, address, ledger_id: str) -> Terms:
-        """Get the terms of a drop"""
+        :param address: the address receiving the drip
+        :param ledger_id: the ledger of the drip
+        :param drip_id: the id of the drip in the durable queue
+        :param amount: the amount of the drip, `gwei_per_request` if None
+        :return: the terms of the drip
+        """
+        amount = self.gwei_per_request if amount is None else amount
         tx_nonce = LedgerApis.generate_tx_nonce(
             identifier=self.ledger_id,
             seller=self.context.agent_address,
@@ -140,28 +293,129 @@ class Strategy(Model):  # pylint: disable=too-many-instance-attributes
             ledger_id=ledger_id,
             sender_address=self.context.agent_address,
             counterparty_address=address,
-            amount_by_currency_id={currency_id: -self.gwei_per_request},
+            amount_by_currency_id={currency_id: -amount},
             fee_by_currency_id={currency_id: 210000},
-            quantities_by_good_id={currency_id: self.gwei_per_request},
+            quantities_by_good_id={currency_id: amount},
             is_sender_payable_tx_fee=True,
             nonce=tx_nonce,
+            drip_id=drip_id,
         )
         return terms
 
+    def get_batch_terms(self, recipients: List[Terms], contract_address: str) -> Terms:
+        """
+        Get the terms of a batch of drips paid through the disperse contract.
+
+        :param recipients: the terms of the drips in the batch
+        :param contract_address: the address of the disperse contract
+        :return: the terms of the batch transaction
+        """
+        ledger_id = recipients[0].ledger_id
+        tx_nonce = LedgerApis.generate_tx_nonce(
+            identifier=self.ledger_id,
+            seller=self.context.agent_address,
+            client=contract_address,
+        )
+        currency_id = self.context.shared_state['ledgers'][ledger_id].native_currency
+        amount = sum(terms.sender_payable_amount for terms in recipients)
+        return Terms(
+            ledger_id=ledger_id,
+            sender_address=self.context.agent_address,
+            counterparty_address=contract_address,
+            amount_by_currency_id={currency_id: -amount},
+            fee_by_currency_id={currency_id: 210000 * len(recipients)},
+            quantities_by_good_id={currency_id: amount},
+            is_sender_payable_tx_fee=True,
+            nonce=tx_nonce,
+        )
+
     @property
-    def allow_list(self) -> list:
+    def allow_list(self) -> List[str]:
         """Get the allow list from the strategy and the database."""
-        return self._allow_list + [
-            i.public_address for i in self.session.query(AllowList).all()
-        ]
+        self._ensure_address_lists()
+        return self._allowed_addresses
 
     @property
-    def ban_list(self) -> list:
+    def ban_list(self) -> List[str]:
         """Get the ban list from the strategy and the database."""
-        return self._ban_list + [
-            i.public_address for i in self.session.query(BanList).all()
-        ]
+        self._ensure_address_lists()
+        return self._banned_addresses
+
+    def refresh_address_lists(self) -> None:
+        """Reload the allow and ban lists from the strategy and the database."""
+        self._allowed_addresses = self._merge_addresses(self._allow_list, AllowList)
+        self._banned_addresses = self._merge_addresses(self._ban_list, BanList)
+        self._allowed = frozenset(map(normalise_address, self._allowed_addresses))
+        self._banned = frozenset(map(normalise_address, self._banned_addresses))
+        self._address_lists_stale = False
+
+    def invalidate_address_lists(self) -> None:
+        """Mark the allow and ban lists as stale, so they are reloaded on their next use."""
+        self._address_lists_stale = True
+
+    def _ensure_address_lists(self) -> None:
+        """Reload the allow and ban lists if they are stale."""
+        if self._address_lists_stale:
+            self.refresh_address_lists()
+
+    def _merge_addresses(self, configured: List[str], model: type) -> List[str]:
+        """Merge the configured addresses with those in the database, dropping duplicates."""
+        merged = {}
+        for address in configured + get_addresses(self.session, model):
+            merged.setdefault(normalise_address(address), address)
+        return list(merged.values())
 
-    def get_txs(self):
-        """Get the transactions from the database."""
-        return self.session.query(DripRequest).all()
\ No newline at end of file
+    def import_ban_list(self, addresses: Iterable[str]) -> int:
+        """
+        Add addresses to the ban list in bulk.
+
+        :param addresses: the addresses to ban
+        :return: the number of newly banned addresses
+        """
+        added = bulk_add_addresses(self.session, BanList, addresses)
+        self.invalidate_address_lists()
+        self.context.logger.info(f"Added {added} addresses to the ban list.")
+        return added
+
+    def import_ban_list_from_file(self, path: str) -> int:
+        """
+        Add the addresses of a file, one per line, to the ban list.
+
+        :param path: the path of the file
+        :return: the number of newly banned addresses
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            return self.import_ban_list(line for line in file if line.strip())
+
+    def export_ban_list(self, path: str) -> int:
+        """
+        Write the ban list to a file, one address per line.
+
+        :param path: the path of the file
+        :return: the number of exported addresses
+        """
+        self._ensure_address_lists()
+        addresses = sorted(self._banned)
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(f"{address}\n" for address in addresses)
+        return len(addresses)
+
+    def get_txs(  # pylint: disable=too-many-arguments
+        self,
+        limit: int,
+        after_id: Optional[int] = None,
+        ledger_id: Optional[str] = None,
+        address: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[DripRequest]:
+        """Get a page of transactions from the database."""
+        return query_drip_requests(
+            self.session,
+            limit,
+            after_id=after_id,
+            ledger_id=ledger_id,
+            address=address,
+            start=start,
+            end=end,
+        )
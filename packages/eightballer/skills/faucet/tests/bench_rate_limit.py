@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+Benchmark the per-claim rate-limit lookup as the claim history grows.
+
+Run with:
+
+    python -m packages.eightballer.skills.faucet.tests.bench_rate_limit --rows 1000000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from packages.eightballer.skills.faucet.models import DripRequest, count_claims, migrate
+
+LEDGER_IDS = ["ethereum", "gnosis", "matic", "scroll"]
+CHUNK_SIZE = 50_000
+LOOKUPS = 1_000
+
+
+def seed(engine, start_id: int, rows: int, addresses: int) -> None:
+    """Seed `rows` drip requests spread over the last week."""
+    now = datetime.now()
+    table = DripRequest.__table__
+    with engine.begin() as connection:
+        for offset in range(0, rows, CHUNK_SIZE):
+            connection.execute(
+                table.insert(),
+                [
+                    {
+                        "id": start_id + offset + i,
+                        "created_at": now - timedelta(seconds=random.randint(0, 7 * 86400)),
+                        "public_address": f"0x{random.randrange(addresses):040x}",
+                        "valid_request": True,
+                        "ledger_id": random.choice(LEDGER_IDS),
+                    }
+                    for i in range(min(CHUNK_SIZE, rows - offset))
+                ],
+            )
+
+
+def time_lookups(session, addresses: int) -> float:
+    """Return the mean latency of a rate-limit lookup in microseconds."""
+    end = datetime.now()
+    start = end - timedelta(days=1)
+    began = time.perf_counter()
+    for _ in range(LOOKUPS):
+        count_claims(
+            session,
+            f"0x{random.randrange(addresses):040x}",
+            random.choice(LEDGER_IDS),
+            start,
+            end,
+            limit=1,
+        )
+    return (time.perf_counter() - began) / LOOKUPS * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--addresses", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        migrate(engine)
+        session = sessionmaker(bind=engine)()
+        seeded = 0
+        print(f"{'rows':>12} {'us/claim':>10}")
+        for step in range(1, args.steps + 1):
+            target = args.rows * step // args.steps
+            seed(engine, seeded + 1, target - seeded, args.addresses)
+            seeded = target
+            print(f"{seeded:>12} {time_lookups(session, args.addresses):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023 eightballer
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+Benchmark serving pages of the /txs endpoint as the claim history grows.
+
+Run with:
+
+    python -m packages.eightballer.skills.faucet.tests.bench_txs --rows 1000000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from packages.eightballer.skills.faucet.models import (
+    iter_drip_requests_json,
+    migrate,
+    query_drip_requests,
+)
+from packages.eightballer.skills.faucet.tests.bench_rate_limit import LEDGER_IDS, seed
+
+PAGES = 200
+LIMIT = 100
+
+
+def time_pages(session, rows: int, **filters) -> float:
+    """Return the mean latency of serving a page at a random cursor, in milliseconds."""
+    began = time.perf_counter()
+    for _ in range(PAGES):
+        after_id = random.randrange(rows)
+        body = b"".join(
+            iter_drip_requests_json(
+                query_drip_requests(session, LIMIT, after_id=after_id, **filters), LIMIT
+            )
+        )
+    json.loads(body)
+    return (time.perf_counter() - began) / PAGES * 1e3
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        migrate(engine)
+        session = sessionmaker(bind=engine)()
+        seeded = 0
+        print(f"{'rows':>12} {'ms/page':>10} {'ledger':>10} {'last day':>10}")
+        for step in range(1, args.steps + 1):
+            target = args.rows * step // args.steps
+            seed(engine, seeded + 1, target - seeded, addresses=200_000)
+            seeded = target
+            print(
+                f"{seeded:>12}"
+                f" {time_pages(session, seeded):>10.2f}"
+                f" {time_pages(session, seeded, ledger_id=random.choice(LEDGER_IDS)):>10.2f}"
+                f" {time_pages(session, seeded, start=datetime.now() - timedelta(days=1)):>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Tests for the allow and ban lists of the faucet.
+"""
+
+import logging
+from unittest.mock import MagicMock
+
+from packages.eightballer.skills.faucet.models import (
+    BanList,
+    bulk_add_addresses,
+    get_addresses,
+)
+from packages.eightballer.skills.faucet.strategy import Strategy
+
+ALLOWED = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+BANNED = "0x8B6F5a8AE5dB0e4E9C6Ec8DA2C1aB7bF0E3E2d1C"
+OTHER = "0x" + "1" * 40
+STORED = "0xAbCdEf0123456789aBcDeF0123456789AbCdEf01"
+
+
+def make_strategy(tmp_path, name: str = "faucet.db", **kwargs) -> Strategy:
+    """Make a strategy on a database file, writing drip requests synchronously."""
+    context = MagicMock()
+    context.shared_state = {}
+    context.logger = logging.getLogger(__name__)
+    return Strategy(
+        name="strategy",
+        skill_context=context,
+        database_uri_string=f"sqlite:///{tmp_path / name}",
+        ledger_id="gnosis",
+        write_behind=False,
+        **kwargs,
+    )
+
+
+def test_membership_does_not_depend_on_the_address_casing(tmp_path):
+    """Test that configured and stored addresses match whatever their casing."""
+    strategy = make_strategy(tmp_path, allow_list=[ALLOWED], ban_list=[BANNED])
+    for address in (ALLOWED, ALLOWED.lower(), f" {ALLOWED.upper()} "):
+        assert strategy.is_address_allowed(address)
+        assert not strategy.is_address_banned(address)
+    # addresses stored behind the strategy's back are only seen once the lists are refreshed
+    bulk_add_addresses(strategy.session, BanList, [STORED])
+    assert not strategy.is_address_banned(STORED)
+    strategy.refresh_address_lists()
+    for address in (BANNED, BANNED.lower(), STORED.lower()):
+        assert strategy.is_address_banned(address)
+        assert not strategy.is_address_allowed(address)
+
+
+def test_imports_invalidate_the_lists(tmp_path):
+    """Test that addresses imported into the ban list are banned on the next check."""
+    strategy = make_strategy(tmp_path)
+    assert not strategy.is_address_banned(BANNED)
+    assert strategy.import_ban_list([BANNED]) == 1
+    assert strategy.is_address_banned(BANNED.lower())
+    assert not strategy.is_request_valid(BANNED, "gnosis")
+
+
+def test_bulk_imports_skip_duplicates(tmp_path):
+    """Test that an address is stored once, whatever casing it is imported with and how often."""
+    strategy = make_strategy(tmp_path, ban_list=[BANNED])
+    added = bulk_add_addresses(
+        strategy.session, BanList, [BANNED, BANNED.lower(), "", "  ", OTHER], chunk_size=1
+    )
+    assert added == 2
+    assert bulk_add_addresses(strategy.session, BanList, [BANNED.upper().replace("0X", "0x")]) == 0
+    assert sorted(get_addresses(strategy.session, BanList)) == sorted([BANNED.lower(), OTHER])
+    # a configured address also stored in the database is listed once
+    strategy.refresh_address_lists()
+    assert len(strategy._banned_addresses) == 2
+
+
+def test_ban_list_file_round_trip(tmp_path):
+    """Test that an exported ban list imports back into another faucet unchanged."""
+    source = tmp_path / "ban_list.txt"
+    source.write_text(f"{BANNED}\n\n{OTHER}\n{BANNED.lower()}\n", encoding="utf-8")
+    strategy = make_strategy(tmp_path)
+    assert strategy.import_ban_list_from_file(str(source)) == 2
+
+    exported = tmp_path / "exported.txt"
+    assert strategy.export_ban_list(str(exported)) == 2
+    assert exported.read_text(encoding="utf-8").splitlines() == sorted([BANNED.lower(), OTHER])
+
+    restored = make_strategy(tmp_path, name="restored.db", ban_list_file=str(exported))
+    assert restored.is_address_banned(BANNED)
+    assert restored.is_address_banned(OTHER)
+    assert restored.export_ban_list(str(tmp_path / "again.txt")) == 2
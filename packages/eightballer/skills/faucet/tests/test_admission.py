@@ -0,0 +1,76 @@
+"""
+Tests for the claim admission control.
+"""
+
+from packages.eightballer.skills.faucet.admission import (
+    AdmissionController,
+    AdmissionDecision,
+    LaneLoad,
+)
+
+BALANCE = 10**6
+
+
+def test_claims_are_rejected_over_capacity():
+    """Test the queue depth and drain time limits, and the retry delays they give."""
+    controller = AdmissionController(max_queue_depth=100, max_drain_time=60.0, default_retry_after=30)
+    assert controller.decide("gnosis", LaneLoad(queued=10, in_flight=2, throughput=60), BALANCE, 1).accepted
+
+    full = controller.decide("gnosis", LaneLoad(queued=99, in_flight=1, throughput=120), BALANCE, 1)
+    assert full.decision == AdmissionDecision.QUEUE_FULL
+    # one drip over the limit, draining at two drips per second
+    assert full.retry_after == 1
+
+    # 90 drips at one per second take longer than a minute to drain
+    slow = controller.decide("gnosis", LaneLoad(queued=89, in_flight=0, throughput=60), BALANCE, 1)
+    assert slow.decision == AdmissionDecision.DRAIN_TIME
+    assert slow.retry_after == 30
+
+    # nothing has been paid yet, so the drain time is unknown
+    cold = controller.decide("matic", LaneLoad(queued=100, in_flight=0, throughput=0), BALANCE, 1)
+    assert cold.decision == AdmissionDecision.QUEUE_FULL
+    assert cold.retry_after == 30
+
+    assert controller.decisions["gnosis"] == {
+        AdmissionDecision.ACCEPTED: 1,
+        AdmissionDecision.QUEUE_FULL: 1,
+        AdmissionDecision.DRAIN_TIME: 1,
+    }
+
+
+def test_claims_are_rejected_while_nothing_drains():
+    """Test that a ledger with work committed but no drip settled lately only takes the cold start allowance."""
+    controller = AdmissionController(
+        max_queue_depth=10000, max_drain_time=600.0, default_retry_after=45, cold_start_allowance=10
+    )
+    assert controller.decide("gnosis", LaneLoad(queued=7, in_flight=2, throughput=0), BALANCE, 1).accepted
+    stalled = controller.decide("gnosis", LaneLoad(queued=8, in_flight=2, throughput=0), BALANCE, 1)
+    assert stalled.decision == AdmissionDecision.DRAIN_TIME
+    assert stalled.retry_after == 45
+    # once drips settle again, the drain time is estimated from the observed rate
+    assert controller.decide("gnosis", LaneLoad(queued=8, in_flight=2, throughput=60), BALANCE, 1).accepted
+
+
+def test_claims_are_rejected_when_the_funds_are_committed():
+    """Test that a claim is rejected when the uncommitted funds cannot cover it."""
+    controller = AdmissionController()
+    load = LaneLoad(queued=9, in_flight=0, throughput=0)
+    assert controller.decide("gnosis", load, available=100, amount=100).accepted
+    rejected = controller.decide("gnosis", load, available=99, amount=100)
+    assert rejected.decision == AdmissionDecision.OUTFLOW
+
+
+def test_claims_are_rejected_while_the_ledger_is_unavailable():
+    """Test that claims are rejected until the retry delay given by the ledger connection has passed."""
+    now = [0.0]
+    controller = AdmissionController(clock=lambda: now[0])
+    load = LaneLoad(queued=0, in_flight=0, throughput=0)
+    assert controller.ledger_unavailable(b"not json") is None
+    assert controller.ledger_unavailable(b'{"ledger_id": "gnosis", "state": "open", "retry_after": 30}') == "gnosis"
+
+    rejected = controller.decide("gnosis", load, BALANCE, 1)
+    assert rejected.decision == AdmissionDecision.LEDGER_UNAVAILABLE
+    assert rejected.retry_after == 30
+    assert controller.decide("matic", load, BALANCE, 1).accepted
+    now[0] = 30.0
+    assert controller.decide("gnosis", load, BALANCE, 1).accepted
@@ -0,0 +1,56 @@
+"""
+Tests for the durable drip queue.
+"""
+
+from sqlalchemy import create_engine
+
+from packages.eightballer.skills.faucet.drip_queue import DripQueue, DripState
+from packages.eightballer.skills.faucet.models import migrate
+
+SENDER = "0x" + "f" * 40
+
+
+def make_queue(tmp_path) -> DripQueue:
+    """Make a drip queue on a fresh database file."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    migrate(engine)
+    return DripQueue(engine)
+
+
+def test_queued_drips_are_fetched_in_pages(tmp_path):
+    """Test that queued drips are read back per ledger, in id order, one page at a time."""
+    queue = make_queue(tmp_path)
+    ids = [queue.push("gnosis", SENDER, f"0x{i:040x}", 10**19) for i in range(5)]
+    queue.push("ethereum", SENDER, "0x" + "1" * 40, 1)
+    first = queue.fetch("gnosis", after_id=0, limit=3)
+    assert [row.id for row in first] == ids[:3]
+    assert int(first[0].amount) == 10**19
+    second = queue.fetch("gnosis", after_id=first[-1].id, limit=3)
+    assert [row.id for row in second] == ids[3:]
+    assert sorted(queue.queued_amounts()) == [("ethereum", 1, 1), ("gnosis", 5 * 10**19, 5)]
+    queue.update(ids[:2], DripState.RAW_TX, nonce=7)
+    assert [row.id for row in queue.fetch("gnosis", after_id=0, limit=10)] == ids[2:]
+    assert queue.count(ledger_id="gnosis") == 3
+    assert queue.count(DripState.RAW_TX) == 2
+
+
+def test_recovery_after_restart(tmp_path):
+    """Test that unsigned drips are queued again and signed ones are kept with their transaction."""
+    queue = make_queue(tmp_path)
+    unsigned, signed, broadcast, confirmed = (
+        queue.push("gnosis", SENDER, f"0x{i:040x}", 1) for i in range(4)
+    )
+    queue.update([unsigned], DripState.RAW_TX, nonce=3)
+    queue.update([signed], DripState.SIGNED, nonce=2, tx_hash="0xb", signed_tx="{}")
+    queue.update([broadcast], DripState.BROADCAST, nonce=1, tx_hash="0xa")
+    queue.update([confirmed], DripState.CONFIRMED, nonce=0, tx_hash="0x9")
+
+    restarted = DripQueue(queue.engine)
+    assert restarted.requeue_unsigned() == 1
+    [row] = restarted.fetch("gnosis", after_id=0, limit=10)
+    assert row.id == unsigned
+    assert row.nonce is None
+    assert [(row.id, row.state) for row in restarted.with_transaction()] == [
+        (broadcast, DripState.BROADCAST),
+        (signed, DripState.SIGNED),
+    ]
@@ -0,0 +1,77 @@
+"""
+Tests for the write-behind drip request journal.
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from packages.eightballer.skills.faucet.journal import DripRequestJournal
+from packages.eightballer.skills.faucet.models import DripRequest, apply_sqlite_profile, migrate
+
+
+def make_row(i: int) -> dict:
+    """Make a drip request row."""
+    return dict(
+        created_at=datetime.now(),
+        public_address=f"0x{i:040x}",
+        valid_request=True,
+        ledger_id="gnosis",
+    )
+
+
+def test_rows_are_written_in_groups_and_drained_on_stop(tmp_path):
+    """Test that every recorded row ends up in the database once the journal stops."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    apply_sqlite_profile(engine, "wal")
+    migrate(engine)
+    journal = DripRequestJournal(engine, logging.getLogger(__name__), max_batch=7, flush_interval=60)
+    journal.start()
+    for i in range(50):
+        journal.record(make_row(i))
+    journal.stop()
+    session = sessionmaker(bind=engine)()
+    assert session.query(DripRequest).count() == 50
+    assert engine.execute("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_full_journal_writes_synchronously(tmp_path):
+    """Test that rows are not lost when the queue is full."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    migrate(engine)
+    journal = DripRequestJournal(engine, logging.getLogger(__name__), max_queued=1)
+    journal.record(make_row(0))
+    journal.record(make_row(1))
+    session = sessionmaker(bind=engine)()
+    assert session.query(DripRequest).count() == 1
+    journal.start()
+    journal.stop()
+    assert session.query(DripRequest).count() == 2
+
+
+def test_failed_groups_are_retried_then_written_row_by_row(tmp_path, monkeypatch):
+    """Test that a group failing for a while is written on retry, and that a bad row loses no other."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    migrate(engine)
+    journal = DripRequestJournal(engine, logging.getLogger(__name__), max_attempts=3, retry_backoff=0.01)
+    insert = journal._insert
+    failures = [2]
+
+    def flaky_insert(batch):
+        if failures[0] > 0:
+            failures[0] -= 1
+            raise RuntimeError("database is locked")
+        if any(row["public_address"] == "bad" for row in batch):
+            raise ValueError("bad row")
+        insert(batch)
+
+    monkeypatch.setattr(journal, "_insert", flaky_insert)
+    journal._write([make_row(0), make_row(1)])
+    session = sessionmaker(bind=engine)()
+    assert session.query(DripRequest).count() == 2
+
+    bad_row = dict(make_row(2), public_address="bad")
+    journal._write([make_row(3), bad_row, make_row(4)])
+    assert session.query(DripRequest).count() == 4
@@ -0,0 +1,67 @@
+"""
+Tests for the per-ledger drip lanes.
+"""
+
+from packages.eightballer.skills.faucet.lanes import DripLane
+from packages.eightballer.skills.faucet.tests.test_rate_limiter import FakeClock
+
+
+def test_lane_limits_drips_in_flight():
+    """Test that a lane starts at most `max_in_flight` drips."""
+    lane = DripLane("gnosis", max_in_flight=2, clock=FakeClock())
+    for drip in range(3):
+        lane.enqueue(drip)
+    assert lane.available() == 2
+    assert lane.start() == [0]
+    lane.start()
+    assert lane.available() == 0
+    lane.record_success()
+    assert lane.available() == 1
+    assert lane.stats()["throughput_per_minute"] == 1
+
+
+def test_lane_batches_drips():
+    """Test that a lane hands out batches of the oldest drips."""
+    clock = FakeClock()
+    lane = DripLane("gnosis", max_in_flight=1, clock=clock)
+    for drip in range(5):
+        lane.enqueue(drip)
+        clock.now += 1
+    assert lane.oldest_wait() == 5
+    assert lane.start(3) == [0, 1, 2]
+    assert lane.oldest_wait() == 2
+    lane.enqueue(2, first=True)
+    assert lane.oldest_wait() == 2
+    lane.record_success(drips=3)
+    assert lane.stats()["completed"] == 3
+
+
+def test_lane_pauses_after_repeated_failures():
+    """Test that failures in a row pause the lane with a growing backoff."""
+    clock = FakeClock()
+    lane = DripLane("scroll", max_in_flight=1, failure_threshold=2, backoff=5.0, clock=clock)
+    lane.enqueue(0)
+    assert lane.record_error() is None
+    assert lane.record_error() == 5.0
+    assert lane.available() == 0
+    assert lane.record_error() == 10.0
+    clock.now += 10
+    assert lane.available() == 1
+    assert lane.record_failure(ledger_error=False) is None
+    lane.record_success()
+    assert lane.consecutive_failures == 0
+
+
+def test_lane_waits_out_a_refusal_without_counting_a_failure():
+    """Test that a refused transaction pauses the lane until its ledger is available, without failing its drips."""
+    clock = FakeClock()
+    lane = DripLane("gnosis", max_in_flight=1, clock=clock)
+    lane.enqueue(0)
+    lane.start()
+    lane.record_refusal(30)
+    lane.enqueue(0, first=True)
+    assert lane.in_flight == 0
+    assert lane.available() == 0
+    assert lane.stats()["failed"] == 0
+    clock.now += 30
+    assert lane.available() == 1
@@ -0,0 +1,56 @@
+"""
+Tests for the database queries of the faucet.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from packages.eightballer.skills.faucet.models import (
+    DripRequest,
+    SchemaMigration,
+    count_claims,
+    migrate,
+)
+
+ADDRESS = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+
+
+def test_claims_are_counted_whatever_the_address_casing(tmp_path):
+    """Test that claims stored with a checksummed address count against any casing of it."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'faucet.db'}")
+    # a database from before addresses were normalised
+    DripRequest.__table__.create(engine)
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(
+            DripRequest.__table__.insert(),
+            [
+                dict(created_at=now, public_address=ADDRESS, valid_request=True, ledger_id="gnosis"),
+                dict(created_at=now, public_address=ADDRESS.upper(), valid_request=True, ledger_id="gnosis"),
+            ],
+        )
+    # rows stored before addresses were normalised are normalised on the next start
+    migrate(engine)
+    session = sessionmaker(bind=engine)()
+    assert {row.public_address for row in session.query(DripRequest)} == {ADDRESS.lower()}
+    start, end = now - timedelta(hours=1), now + timedelta(hours=1)
+    for address in (ADDRESS, ADDRESS.lower(), ADDRESS.upper()):
+        assert count_claims(session, address, "gnosis", start, end, limit=5) == 2
+    assert count_claims(session, ADDRESS, "ethereum", start, end, limit=5) == 0
+
+
+def test_addresses_are_normalised_once(tmp_path):
+    """Test that the address normalisation is recorded and not run again on later starts."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'faucet.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            DripRequest.__table__.insert(),
+            [dict(created_at=datetime.now(), public_address=ADDRESS, valid_request=True, ledger_id="gnosis")],
+        )
+    migrate(engine)
+    session = sessionmaker(bind=engine)()
+    assert [row.public_address for row in session.query(DripRequest)] == [ADDRESS]
+    assert [row.name for row in session.query(SchemaMigration)] == ["normalised_addresses"]
@@ -0,0 +1,50 @@
+"""
+Tests for the local nonce allocator.
+"""
+
+from packages.eightballer.skills.faucet.nonce_manager import (
+    NonceManager,
+    is_already_known,
+    is_nonce_too_low,
+)
+
+SENDER = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+
+
+def test_nonces_are_allocated_per_ledger_and_sender():
+    """Test that each seeded pair allocates its own sequence."""
+    nonces = NonceManager()
+    assert nonces.allocate("gnosis", SENDER) is None
+    nonces.seed("gnosis", SENDER, 7)
+    nonces.seed("matic", SENDER, 0)
+    assert [nonces.allocate("gnosis", SENDER.lower()) for _ in range(3)] == [7, 8, 9]
+    assert nonces.allocate("matic", SENDER) == 0
+
+
+def test_released_nonces_are_reused_first():
+    """Test that nonces of transactions that were never broadcast leave no gap."""
+    nonces = NonceManager()
+    nonces.seed("gnosis", SENDER, 0)
+    for _ in range(4):
+        nonces.allocate("gnosis", SENDER)
+    nonces.release("gnosis", SENDER, 2)
+    nonces.release("gnosis", SENDER, 1)
+    assert nonces.allocate("gnosis", SENDER) == 1
+    assert nonces.allocate("gnosis", SENDER) == 2
+    assert nonces.allocate("gnosis", SENDER) == 4
+    nonces.release("gnosis", SENDER, 4)
+    assert nonces.allocate("gnosis", SENDER) == 4
+
+
+def test_resync_after_nonce_too_low():
+    """Test that a used nonce makes the pair seed again."""
+    nonces = NonceManager()
+    nonces.seed("gnosis", SENDER, 3)
+    assert is_nonce_too_low("{'code': -32000, 'message': 'nonce too low'}")
+    assert not is_nonce_too_low("insufficient funds for gas * price + value")
+    assert is_already_known("{'code': -32000, 'message': 'already known'}")
+    assert not is_already_known("nonce too low")
+    nonces.resync("gnosis", SENDER)
+    assert not nonces.is_seeded("gnosis", SENDER)
+    nonces.seed("gnosis", SENDER, 10)
+    assert nonces.allocate("gnosis", SENDER) == 10
@@ -0,0 +1,32 @@
+"""
+Tests for the pending outflow accounting.
+"""
+
+from packages.eightballer.skills.faucet.outflow import OutflowLedger
+
+
+def test_reservations_are_released_or_settled():
+    """Test that accepted drips hold funds until they fail or are paid."""
+    now = [100.0]
+    outflow = OutflowLedger(clock=lambda: now[0])
+    outflow.reserve("gnosis", 30)
+    outflow.reserve("gnosis", 30)
+    assert outflow.available("gnosis", balance=100, polled_at=99.0) == 40
+    outflow.release("gnosis", 30)
+    # the drip cost less than reserved
+    outflow.settle("gnosis", 30, spent=25)
+    assert outflow.reserved("gnosis") == 0
+    assert outflow.available("gnosis", balance=100, polled_at=99.0) == 75
+    assert outflow.available("matic", balance=100, polled_at=None) == 100
+
+
+def test_settlements_are_reconciled_with_later_polls():
+    """Test that a settlement counts until a poll requested after it reflects it."""
+    now = [100.0]
+    outflow = OutflowLedger(clock=lambda: now[0])
+    assert outflow.available("gnosis", balance=100, polled_at=99.0) == 100
+    outflow.settle("gnosis", 10)
+    # this poll may have been requested before the drip was paid
+    assert outflow.available("gnosis", balance=100, polled_at=101.0) == 90
+    # this one was requested after the previous poll returned
+    assert outflow.available("gnosis", balance=90, polled_at=106.0) == 90
@@ -0,0 +1,70 @@
+"""
+Tests for the claim rate limiter.
+"""
+
+from packages.eightballer.skills.faucet.rate_limiter import ClaimRateLimiter
+
+ADDRESS = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        """Initialize the clock."""
+        self.now = now
+
+    def __call__(self) -> float:
+        """Get the current time."""
+        return self.now
+
+
+def test_claims_expire_after_the_window():
+    """Test that claims only count within the sliding window."""
+    clock = FakeClock()
+    limiter = ClaimRateLimiter(max_claims=2, window=100, clock=clock)
+    limiter.record(ADDRESS, "gnosis")
+    clock.now += 50
+    limiter.record(ADDRESS, "gnosis")
+    assert limiter.is_limited(ADDRESS, "gnosis") is True
+    assert limiter.is_limited(ADDRESS, "matic") is False
+    clock.now += 51
+    assert limiter.is_limited(ADDRESS, "gnosis") is False
+
+
+def test_addresses_are_checksum_independent():
+    """Test that the same address in a different case shares its claims."""
+    limiter = ClaimRateLimiter(max_claims=1, clock=FakeClock())
+    limiter.record(ADDRESS, "gnosis")
+    assert limiter.is_limited(ADDRESS.lower(), "gnosis") is True
+
+
+def test_expired_pairs_are_evicted():
+    """Test that pairs without live claims are dropped."""
+    clock = FakeClock()
+    limiter = ClaimRateLimiter(max_claims=1, window=10, clock=clock)
+    limiter.record(ADDRESS, "gnosis")
+    clock.now += 11
+    limiter.record("0x0", "gnosis")
+    assert len(limiter) == 1
+
+
+def test_memory_cap_makes_unknown_pairs_undecided():
+    """Test that evicting live claims makes the limiter defer on unknown pairs."""
+    clock = FakeClock()
+    limiter = ClaimRateLimiter(max_claims=1, window=10, max_entries=1, clock=clock)
+    limiter.record(ADDRESS, "gnosis")
+    limiter.record("0x0", "gnosis")
+    assert len(limiter) == 1
+    assert limiter.is_limited(ADDRESS, "gnosis") is None
+    clock.now += 11
+    assert limiter.is_limited(ADDRESS, "gnosis") is False
+
+
+def test_warm_start():
+    """Test rebuilding the limiter from past claims."""
+    clock = FakeClock()
+    limiter = ClaimRateLimiter(max_claims=1, window=100, clock=clock)
+    limiter.warm_start([(ADDRESS, "gnosis", clock.now - 150), ("0x0", "gnosis", clock.now - 50)])
+    assert limiter.is_limited(ADDRESS, "gnosis") is False
+    assert limiter.is_limited("0x0", "gnosis") is True
@@ -0,0 +1,39 @@
+"""
+Tests for the cache of pre-encoded http responses.
+"""
+
+from packages.eightballer.skills.faucet.response_cache import (
+    ResponseCache,
+    etag_matches,
+    parse_headers,
+)
+
+
+def test_responses_are_built_once_per_version():
+    """Test that a response is only rebuilt when its version changes."""
+    cache = ResponseCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"agent_address": f"0x{len(builds)}"}
+
+    first = cache.get("config", "0xa", build)
+    assert cache.get("config", "0xa", build) is first
+    assert len(builds) == 1
+    second = cache.get("config", "0xb", build)
+    assert second.body == b'{"agent_address": "0x2"}'
+    assert second.etag != first.etag
+    cache.invalidate("config")
+    cache.get("config", "0xb", build)
+    assert len(builds) == 3
+
+
+def test_if_none_match():
+    """Test matching the If-None-Match header against an ETag."""
+    headers = parse_headers('Content-Type: application/json\nIf-None-Match: W/"abc", "def"\n')
+    assert etag_matches(headers.get("if-none-match"), '"abc"')
+    assert etag_matches(headers.get("if-none-match"), '"def"')
+    assert not etag_matches(headers.get("if-none-match"), '"ghi"')
+    assert not etag_matches(None, '"abc"')
+    assert etag_matches("*", '"abc"')
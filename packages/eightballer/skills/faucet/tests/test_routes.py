@@ -0,0 +1,51 @@
+"""
+Tests for the http route table.
+"""
+
+import pytest
+
+from packages.eightballer.skills.faucet.routes import (
+    MethodNotAllowed,
+    Route,
+    RouteNotFound,
+    RouteTable,
+)
+
+ADDRESS = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+
+
+def test_routes_from_spec():
+    """Test that every operation of the skill spec is routed by exact path."""
+    routes = RouteTable.from_spec_file()
+    assert routes.match("post", "http://0.0.0.0:5555/claim").route.operation_id == "handle_claim"
+    assert routes.match("options", "/claim").route.operation_id == "handle_pre_flight"
+    assert routes.match("GET", "/txs?limit=10").route.operation_id == "return_txs"
+    assert routes.match("get", "/whitelisted/").route.operation_id == "return_whitelist"
+
+
+def test_unknown_paths_and_methods():
+    """Test that paths only match exactly and unsupported methods list the allowed ones."""
+    routes = RouteTable.from_spec_file()
+    with pytest.raises(RouteNotFound):
+        routes.match("get", "/configtxs")
+    with pytest.raises(MethodNotAllowed) as e:
+        routes.match("get", "/claim")
+    assert e.value.allowed == ["options", "post"]
+
+
+def test_claim_body_is_validated():
+    """Test the precompiled schema of the claim body."""
+    validator = RouteTable.from_spec_file().match("post", "/claim").route.body_validator
+    assert validator.is_valid({"public_address": ADDRESS, "ledger_id": "gnosis"})
+    assert not validator.is_valid({"public_address": ADDRESS})
+
+
+def test_path_params():
+    """Test that templated paths are matched after exact ones and parse their parameters."""
+    routes = RouteTable()
+    routes.add(Route("get", "/txs/{ledger_id}", "return_ledger_txs"))
+    routes.add(Route("get", "/txs/latest", "return_latest_txs"))
+    assert routes.match("get", "/txs/latest").route.operation_id == "return_latest_txs"
+    match = routes.match("get", "/txs/gnosis")
+    assert match.route.operation_id == "return_ledger_txs"
+    assert match.path_params == {"ledger_id": "gnosis"}
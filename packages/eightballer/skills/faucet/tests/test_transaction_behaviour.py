@@ -0,0 +1,204 @@
+"""
+Tests for the scheduling and the timeouts of the drips of the transaction behaviour.
+"""
+
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, select
+
+from packages.eightballer.skills.faucet.behaviours import (
+    DripStatus,
+    TransactionBehaviour,
+)
+from packages.eightballer.skills.faucet.drip_queue import DripQueue, DripState
+from packages.eightballer.skills.faucet.models import migrate
+from packages.eightballer.skills.faucet.outflow import OutflowLedger
+
+SENDER = "0x" + "f" * 40
+FIRST = "0x" + "1" * 40
+SECOND = "0x" + "2" * 40
+
+
+def make_terms(
+    address: str, ledger_id: str, drip_id: Optional[int] = None, amount: Optional[int] = None
+) -> Any:
+    """Make the terms of a drip, with the fields the behaviour reads."""
+    return SimpleNamespace(
+        ledger_id=ledger_id,
+        sender_address=SENDER,
+        counterparty_address=address,
+        sender_payable_amount=1 if amount is None else amount,
+        kwargs={"drip_id": drip_id},
+    )
+
+
+def make_dialogues() -> MagicMock:
+    """Make dialogues that create a dialogue with its own label per request."""
+    labels = itertools.count()
+    dialogues = MagicMock()
+    dialogues.create.side_effect = lambda **_: (
+        MagicMock(),
+        SimpleNamespace(dialogue_label=f"dialogue-{next(labels)}"),
+    )
+    return dialogues
+
+
+def make_behaviour(tmp_path, **kwargs: Any) -> TransactionBehaviour:
+    """Make a transaction behaviour on a fresh database, with seeded nonces."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'faucet.db'}")
+    migrate(engine)
+    context = MagicMock()
+    context.agent_address = SENDER
+    context.shared_state = {}
+    context.strategy = SimpleNamespace(
+        engine=engine,
+        gwei_per_request=1,
+        drip_fee_reserve=0,
+        outflow=OutflowLedger(),
+        drip_reservation=lambda amount: amount,
+        get_drip_terms=make_terms,
+    )
+    context.ledger_api_dialogues = make_dialogues()
+    context.contract_api_dialogues = make_dialogues()
+    behaviour = TransactionBehaviour(name="transaction", skill_context=context, **kwargs)
+    behaviour.setup()
+    for ledger_id in ("gnosis", "ethereum"):
+        behaviour.nonces.seed(ledger_id, SENDER, 0)
+    return behaviour
+
+
+def drip_states(behaviour: TransactionBehaviour) -> List[str]:
+    """Get the states of the drips in the durable queue, in id order."""
+    table = DripQueue.table
+    with behaviour.drip_queue.engine.connect() as connection:
+        rows = connection.execute(select(table.c.state).order_by(table.c.id))
+        return [state for (state,) in rows]
+
+
+def labels_in_flight(behaviour: TransactionBehaviour) -> List[str]:
+    """Get the dialogue labels of the drips in flight."""
+    return sorted(behaviour.in_flight)
+
+
+def test_enqueued_drips_start_without_a_tick(tmp_path):
+    """Test that a queued drip is sent for processing right away, not on the next tick."""
+    behaviour = make_behaviour(tmp_path)
+    behaviour.enqueue(FIRST, "gnosis")
+    assert labels_in_flight(behaviour) == ["dialogue-0"]
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.PROCESSING
+    assert drip_states(behaviour) == [DripState.RAW_TX]
+    behaviour.context.outbox.put_message.assert_called_once()
+
+
+def test_expired_deadlines_time_out_only_their_own_drips(tmp_path, monkeypatch):
+    """Test that a drip past its deadline times out while a later one stays in flight."""
+    behaviour = make_behaviour(tmp_path, max_in_flight=2, max_processing=10)
+    behaviour.enqueue(FIRST, "gnosis")
+    behaviour.max_processing = 1000
+    behaviour.enqueue(SECOND, "gnosis")
+    assert labels_in_flight(behaviour) == ["dialogue-0", "dialogue-1"]
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 100)
+    behaviour.act()
+    assert labels_in_flight(behaviour) == ["dialogue-1"]
+    assert behaviour.timedout == {"dialogue-0"}
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.FAILED
+    assert behaviour.get_drip_status(SECOND, "gnosis") == DripStatus.PROCESSING
+    assert drip_states(behaviour) == [DripState.FAILED, DripState.RAW_TX]
+    assert len(behaviour._deadlines) == 1
+
+
+def test_finished_drips_are_dropped_from_the_deadlines_lazily(tmp_path, monkeypatch):
+    """Test that a finished drip leaves its deadline behind, dropped once due without a timeout."""
+    behaviour = make_behaviour(tmp_path, max_processing=10)
+    behaviour.enqueue(FIRST, "gnosis")
+    behaviour.finish_processing(SimpleNamespace(dialogue_label="dialogue-0"))
+    assert behaviour.in_flight == {}
+    assert len(behaviour._deadlines) == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 100)
+    behaviour.act()
+    assert behaviour._deadlines == []
+    assert behaviour.timedout == set()
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.SETTLED
+    assert drip_states(behaviour) == [DripState.CONFIRMED]
+
+
+def test_wakes_made_while_scheduling_are_not_dropped(tmp_path):
+    """Test that a lane woken while another one is being scheduled is scheduled right after."""
+    behaviour = make_behaviour(tmp_path)
+    drip_id = behaviour.drip_queue.push("ethereum", SENDER, SECOND, 1)
+    behaviour.get_lane("ethereum").enqueue(make_terms(SECOND, "ethereum", drip_id=drip_id))
+    outbox = behaviour.context.outbox
+    outbox.put_message.side_effect = lambda **_: behaviour.wake("ethereum")
+
+    behaviour.enqueue(FIRST, "gnosis")
+    assert labels_in_flight(behaviour) == ["dialogue-0", "dialogue-1"]
+    assert behaviour.get_drip_status(SECOND, "ethereum") == DripStatus.PROCESSING
+    assert len(behaviour.get_lane("ethereum")) == 0
+
+
+def test_drips_refused_by_an_open_circuit_are_sent_once_it_closes(tmp_path, monkeypatch):
+    """Test that a broadcast refused while the ledger is unavailable is queued again and sent after the outage."""
+    behaviour = make_behaviour(tmp_path)
+    behaviour.enqueue(FIRST, "gnosis")
+    reserved = behaviour._outflow.reserved("gnosis")
+    behaviour.record_signed(behaviour.in_flight["dialogue-0"], {"hash": "0xabc"})
+    behaviour.failed_processing(
+        SimpleNamespace(dialogue_label="dialogue-0"), error="unavailable", broadcast=True, retry_after=30
+    )
+    lane = behaviour.get_lane("gnosis")
+    assert behaviour.in_flight == {}
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.QUEUED
+    assert drip_states(behaviour) == [DripState.QUEUED]
+    assert behaviour._outflow.reserved("gnosis") == reserved
+    assert lane.failed == 0
+    assert lane.is_paused()
+    # the transaction was signed, so its nonce may be spent and is read again
+    assert not behaviour.nonces.is_seeded("gnosis", SENDER)
+
+    now = time.monotonic()
+    monkeypatch.setattr(lane, "_clock", lambda: now + 31)
+    behaviour.nonces.seed("gnosis", SENDER, 0)
+    behaviour.act()
+    assert labels_in_flight(behaviour) == ["dialogue-1"]
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.PROCESSING
+    assert drip_states(behaviour) == [DripState.RAW_TX]
+
+
+def test_unsigned_drips_refused_by_an_open_circuit_give_back_their_nonce(tmp_path):
+    """Test that a transaction refused before it was signed releases its nonce for the next one."""
+    behaviour = make_behaviour(tmp_path)
+    behaviour.enqueue(FIRST, "gnosis")
+    behaviour.failed_processing(SimpleNamespace(dialogue_label="dialogue-0"), retry_after=30)
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.QUEUED
+    assert behaviour.nonces.allocate("gnosis", SENDER) == 0
+
+
+def test_unreadable_receipts_are_looked_up_again(tmp_path):
+    """Test that a receipt lookup error keeps the drip pending and looks the receipt up again on the next tick."""
+    behaviour = make_behaviour(tmp_path)
+    behaviour.enqueue(FIRST, "gnosis")
+    reserved = behaviour._outflow.reserved("gnosis")
+    drip = behaviour.in_flight["dialogue-0"]
+    behaviour.record_signed(drip, {"hash": "0xabc"})
+    receipt_dialogue = SimpleNamespace(
+        dialogue_label="dialogue-1", initial_ledger_api_dialogue=SimpleNamespace(dialogue_label="dialogue-0")
+    )
+    behaviour.failed_processing(receipt_dialogue, error="timed out", broadcast=True, receipt=True)
+    assert labels_in_flight(behaviour) == ["dialogue-0"]
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.PROCESSING
+    assert behaviour._outflow.reserved("gnosis") == reserved
+    assert behaviour.nonces.is_seeded("gnosis", SENDER)
+
+    behaviour.act()
+    assert behaviour.in_flight == {"dialogue-1": drip}
+    assert drip_states(behaviour) == [DripState.SIGNED]
+    behaviour.finish_processing(SimpleNamespace(dialogue_label="dialogue-1"))
+    assert behaviour.get_drip_status(FIRST, "gnosis") == DripStatus.SETTLED
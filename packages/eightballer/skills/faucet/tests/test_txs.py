@@ -0,0 +1,131 @@
+"""
+Tests for the paginated /txs endpoint.
+"""
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from packages.eightballer.skills.faucet.handlers import (
+    MAX_TXS_LIMIT,
+    HttpHandler,
+    parse_txs_query,
+)
+from packages.eightballer.skills.faucet.models import (
+    DripRequest,
+    iter_drip_requests_json,
+    migrate,
+    query_drip_requests,
+)
+
+ADDRESS = "0xBa95718a52b5a3DBa749a7641712Dc05a3550d4f"
+OTHER = "0x" + "1" * 40
+START = datetime(2023, 10, 1)
+
+
+@pytest.fixture
+def session(tmp_path) -> Any:
+    """Make a session on a database with drip requests on two ledgers and from two addresses."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'faucet.db'}")
+    migrate(engine)
+    rows = [
+        dict(
+            created_at=START + timedelta(hours=i),
+            public_address=(ADDRESS if i % 2 else OTHER).lower(),
+            valid_request=True,
+            ledger_id="gnosis" if i < 7 else "ethereum",
+        )
+        for i in range(10)
+    ]
+    with engine.begin() as connection:
+        connection.execute(DripRequest.__table__.insert(), rows)
+    return sessionmaker(bind=engine)()
+
+
+def get_page(session: Any, url: str) -> Dict[str, Any]:
+    """Get the page of drip requests a /txs url asks for."""
+    query = parse_txs_query(url)
+    txs = query_drip_requests(session, **query)
+    return json.loads(b"".join(iter_drip_requests_json(txs, query["limit"])))
+
+
+def test_query_parameters_are_parsed():
+    """Test the defaults and the parsing of every parameter of a /txs request."""
+    assert parse_txs_query("/txs") == {"limit": 100}
+    assert parse_txs_query(
+        f"http://0.0.0.0:5555/txs?limit=5&after_id=7&ledger_id=gnosis&address={ADDRESS}"
+        "&start=2023-10-01&end=2023-10-02T12:00:00"
+    ) == {
+        "limit": 5,
+        "after_id": 7,
+        "ledger_id": "gnosis",
+        "address": ADDRESS,
+        "start": datetime(2023, 10, 1),
+        "end": datetime(2023, 10, 2, 12),
+    }
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "limit=0",
+        f"limit={MAX_TXS_LIMIT + 1}",
+        "limit=ten",
+        "after_id=last",
+        "start=yesterday",
+        "end=2023-13-01",
+    ],
+)
+def test_bad_query_parameters_are_rejected(query):
+    """Test that out of range or malformed parameters are rejected."""
+    with pytest.raises(ValueError):
+        parse_txs_query(f"/txs?{query}")
+
+
+def test_pages_follow_the_cursor_until_the_last_one(session):
+    """Test that following the cursor walks every drip request once, in id order."""
+    seen, url, pages = [], "/txs?limit=4", 0
+    while True:
+        page = get_page(session, url)
+        pages += 1
+        seen += [tx["id"] for tx in page["transactions"]]
+        if page["next_cursor"] is None:
+            break
+        assert page["next_cursor"] == seen[-1]
+        url = f"/txs?limit=4&after_id={page['next_cursor']}"
+    assert seen == list(range(1, 11))
+    assert pages == 3
+    # the last page is not full, so it has no cursor
+    assert len(page["transactions"]) == 2
+
+
+def test_pages_are_filtered_by_address_and_ledger(session):
+    """Test the address filter, in any casing, and the ledger and time filters."""
+    page = get_page(session, f"/txs?address={ADDRESS.upper().replace('0X', '0x')}")
+    assert [tx["id"] for tx in page["transactions"]] == [2, 4, 6, 8, 10]
+    assert {tx["public_address"] for tx in page["transactions"]} == {ADDRESS.lower()}
+    page = get_page(session, f"/txs?ledger_id=ethereum&address={ADDRESS}")
+    assert [tx["id"] for tx in page["transactions"]] == [8, 10]
+    page = get_page(session, "/txs?ledger_id=gnosis&start=2023-10-01T02:00:00&end=2023-10-01T04:00:00")
+    assert [tx["id"] for tx in page["transactions"]] == [3, 4, 5]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "start=not-a-date"])
+def test_bad_requests_are_answered_with_400(query):
+    """Test that the handler replies 400 with the reason to a malformed /txs request."""
+    context = MagicMock()
+    handler = HttpHandler(name="http_handler", skill_context=context)
+    http_msg = SimpleNamespace(url=f"http://0.0.0.0:5555/txs?{query}", version="", headers="")
+    http_dialogue = MagicMock()
+    handler._return_txs(http_msg, http_dialogue)
+    reply = http_dialogue.reply.call_args.kwargs
+    assert reply["status_code"] == 400
+    assert "error" in json.loads(reply["body"])
+    context.strategy.get_txs.assert_not_called()
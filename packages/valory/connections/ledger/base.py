@@ -20,11 +20,14 @@
 """This module contains base classes for the ledger API connection."""
 import asyncio
 import inspect
+import json
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from asyncio import Task
 from concurrent.futures._base import Executor
+from contextvars import ContextVar, copy_context
 from logging import Logger
-from typing import Any, Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
 
 from aea.crypto.base import LedgerApi
 from aea.crypto.registries import Registry, ledger_apis_registry
@@ -33,6 +36,26 @@ from aea.helpers.async_utils import AsyncState
 from aea.mail.base import Envelope
 from aea.protocols.base import Message
 from aea.protocols.dialogue.base import Dialogue, Dialogues
+from packages.valory.connections.ledger.batching import JsonRpcBatchers
+from packages.valory.connections.ledger.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakers,
+    LedgerUnavailable,
+    RequestOutcome,
+    record_error,
+    request_outcome,
+)
+from packages.valory.connections.ledger.endpoint_pool import EndpointPools
+from packages.valory.connections.ledger.executors import (
+    LedgerExecutors,
+    LedgerOverloaded,
+)
+from packages.valory.connections.ledger.rate_limits import (
+    Priority,
+    RateLimitExceeded,
+    RateLimits,
+    request_priority,
+)
 from packages.valory.protocols.ledger_api.message import LedgerApiMessage
 
 ETHEREUM_LEDGER_ID = "ethereum"
@@ -98,6 +121,22 @@ DEFAULT_LEDGER_CONFIGS: Dict[str, Dict[str, Union[str, int]]] = {
 for identifier, data in EVM_LEDGERS.items():
     DEFAULT_LEDGER_CONFIGS[identifier] = DEFAULT_LEDGER_CONFIGS[_ETHEREUM_IDENTIFIER].copy()
 
+# the fields of a message that belong to its dialogue rather than to its content
+DIALOGUE_FIELDS = frozenset(("dialogue_reference", "message_id", "target", "performative"))
+
+
+# the ledger of the request being served by the current task
+_request_ledger_id: ContextVar[Optional[str]] = ContextVar(
+    "request_ledger_id", default=None
+)
+
+
+def _run_request(func: Callable, *args: Any) -> Any:
+    """Run a callable of a request, recording when the request started running."""
+    outcome = request_outcome.get()
+    if outcome is not None:
+        outcome.start()
+    return func(*args)
 
 
 class RequestDispatcher(ABC):
@@ -112,6 +151,12 @@ class RequestDispatcher(ABC):
         loop: Optional[asyncio.AbstractEventLoop] = None,
         executor: Optional[Executor] = None,
         api_configs: Optional[Dict[str, Dict[str, str]]] = None,
+        executors: Optional[LedgerExecutors] = None,
+        rpc_batchers: Optional[JsonRpcBatchers] = None,
+        endpoint_pools: Optional[EndpointPools] = None,
+        collapse_reads: bool = True,
+        rate_limits: Optional[RateLimits] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
     ):
         """
         Initialize the request dispatcher.
@@ -123,14 +168,32 @@ class RequestDispatcher(ABC):
         :param loop: the asyncio loop.
         :param executor: an executor.
         :param api_configs: api configs.
+        :param executors: the executor pools per ledger, used instead of `executor` if set.
+        :param rpc_batchers: the batchers coalescing the reads of EVM ledgers, if set.
+        :param endpoint_pools: the pools of RPC endpoints of EVM ledgers, if set.
+        :param collapse_reads: whether identical reads in flight at the same time share one upstream call.
+        :param rate_limits: the rate limits of the RPC endpoints of EVM ledgers, if set.
+        :param circuit_breakers: the circuit breakers of the ledgers, if set.
         """
         self.connection_state = connection_state
         self.loop = loop if loop is not None else asyncio.get_event_loop()
         self.executor = executor
+        self.executors = executors
+        self.rpc_batchers = rpc_batchers
+        self.endpoint_pools = endpoint_pools
+        self.rate_limits = rate_limits
+        self.circuit_breakers = circuit_breakers
         self._api_configs = api_configs
         self.logger = logger
         self.retry_attempts = retry_attempts
         self.retry_timeout = retry_timeout
+        # ledger id -> (serialised config, api)
+        self._apis: Dict[str, Tuple[str, LedgerApi]] = {}
+        self.collapse_reads = collapse_reads
+        # request key -> the task serving the first of the identical requests
+        self._in_flight: Dict[Hashable, Task] = {}
+        # performative -> number of requests served by the task of an identical one
+        self.collapsed: Dict[str, int] = defaultdict(int)
 
     def api_config(self, ledger_id: str) -> Dict[str, str]:
         """Get api config."""
@@ -139,12 +202,52 @@ class RequestDispatcher(ABC):
             config = self._api_configs[ledger_id]
         return config
 
+    def get_api(self, ledger_id: str) -> LedgerApi:
+        """
+        Get the api of a ledger, making it on first use.
+
+        Apis are kept per ledger together with the config they were made from, and are
+        only made again once that config changes. Keeping the api keeps its provider, and
+        with it the open HTTP connections to the node.
+
+        :param ledger_id: the ledger id.
+        :return: the ledger api.
+        """
+        config = self.api_config(ledger_id)
+        key = json.dumps(config, sort_keys=True, default=str)
+        cached = self._apis.get(ledger_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        registry_id = EVM_LEDGERS.get(ledger_id, ledger_id)
+        api = self.ledger_api_registry.make(registry_id, **config)
+        if registry_id == ETHEREUM_LEDGER_ID and (
+            self.rpc_batchers is not None
+            or self.endpoint_pools is not None
+            or self.rate_limits is not None
+        ):
+            # web3 is only installed along with the ethereum ledger plugin
+            from packages.valory.connections.ledger.providers import (  # pylint: disable=import-outside-toplevel
+                install_provider,
+            )
+
+            install_provider(
+                api,
+                ledger_id,
+                config.get("chain_id"),  # type: ignore
+                self.rpc_batchers,
+                self.endpoint_pools,
+                self.rate_limits,
+            )
+        self._apis[ledger_id] = (key, api)
+        return api
+
     async def run_async(
         self,
         func: Callable[[Any], Task],
         api: LedgerApi,
         message: Message,
         dialogue: Dialogue,
+        ledger_id: Optional[str] = None,
     ) -> Union[Message, Task]:
         """
         Run a function in executor.
@@ -153,21 +256,73 @@ class RequestDispatcher(ABC):
         :param api: the ledger api.
         :param message: a Ledger API message.
         :param dialogue: a Ledger API dialogue.
+        :param ledger_id: the ledger of the request, whose executor runs the function.
         :return: the return value of the function.
         """
+        _request_ledger_id.set(ledger_id)
+        request_priority.set(self.get_priority(message))
+        outcome = RequestOutcome()
+        request_outcome.set(outcome)
+        breaker = self.get_breaker(ledger_id)
+        # requests whose outcome is not recorded, such as receipt waits, are never refused
+        trial = self.records_outcome(message)
+        try:
+            if breaker is not None and trial:
+                breaker.allow()
+        except LedgerUnavailable as exception:
+            return self.get_error_message(exception, api, message, dialogue)
+
+        # whether the ledger served the request, None if it never reached the ledger
+        ok: Optional[bool] = None
         try:
             if inspect.iscoroutinefunction(func):
                 # If it is a coroutine, no need to run it in an executor
                 # This can happen if the handler is async.
+                outcome.start()
                 task = func(api, message, dialogue)  # type: ignore
             else:
-                task = self.loop.run_in_executor(  # type: ignore
-                    self.executor, func, api, message, dialogue
+                task = self.run_in_executor(  # type: ignore
+                    ledger_id, func, api, message, dialogue
                 )
             response = await task
+            # error replies only count as failures if the handler met a transport failure
+            ok = not outcome.failed
             return response
+        except (LedgerOverloaded, RateLimitExceeded) as exception:
+            return self.get_error_message(exception, api, message, dialogue)
         except Exception as exception:  # pylint: disable=broad-except
+            record_error(exception)
+            ok = not outcome.failed
             return self.get_error_message(exception, api, message, dialogue)
+        finally:
+            if breaker is not None and trial:
+                # only the time spent on the ledger counts, not the waits for an executor slot or a rate limit
+                duration = outcome.upstream_time()
+                if ok is None or duration is None:
+                    breaker.release()
+                else:
+                    breaker.record(duration, ok)
+
+    async def run_in_executor(
+        self, ledger_id: Optional[str], func: Callable, *args: Any
+    ) -> Any:
+        """
+        Run a blocking callable on the executor of a ledger.
+
+        :param ledger_id: the ledger id, the shared executor is used if None.
+        :param func: the callable.
+        :param args: the callable params.
+        :return: the return value of the callable.
+        """
+        # the callable runs in the context of the request, which holds its priority and outcome
+        context = copy_context()
+        if self.executors is None or ledger_id is None:
+            return await self.loop.run_in_executor(
+                self.executor, context.run, _run_request, func, *args
+            )
+        return await self.executors.get(ledger_id).run(
+            context.run, _run_request, func, *args
+        )
 
     async def wait_for(
         self, func: Callable, *args: Any, timeout: Optional[float] = None
@@ -190,8 +345,8 @@ class RequestDispatcher(ABC):
             'Hint: Look at "asyncio.wait_for()". ',
         )
 
-        # we run the passed function using the default executor
-        running_func = self.loop.run_in_executor(self.executor, func, *args)
+        # we run the passed function on the executor of the ledger being served
+        running_func = self.run_in_executor(_request_ledger_id.get(), func, *args)
 
         # func_result will carry the value the function returns
         func_result = await asyncio.wait_for(running_func, timeout=timeout)
@@ -208,12 +363,7 @@ class RequestDispatcher(ABC):
             raise ValueError("Ledger connection expects non-serialized messages.")
         message = envelope.message
         ledger_id = self.get_ledger_id(message)
-        if ledger_id in EVM_LEDGERS:
-            api = self.ledger_api_registry.make(ETHEREUM_LEDGER_ID, **self.api_config(ledger_id))
-        else:
-            api = self.ledger_api_registry.make(
-                ledger_id, **self.api_config(ledger_id)
-            )
+        api = self.get_api(ledger_id)
 
         dialogue = self.dialogues.update(message)
         if dialogue is None:
@@ -222,7 +372,89 @@ class RequestDispatcher(ABC):
             )
         performative = message.performative
         handler = self.get_handler(performative)
-        return self.loop.create_task(self.run_async(handler, api, message, dialogue))
+        key = self.get_request_key(message) if self.collapse_reads else None
+        if key is None:
+            return self.loop.create_task(
+                self.run_async(handler, api, message, dialogue, ledger_id)
+            )
+
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            self.collapsed[performative.value] += 1
+            return self.loop.create_task(
+                self._reply_with(shared, api, message, dialogue)
+            )
+        task = self.loop.create_task(
+            self.run_async(handler, api, message, dialogue, ledger_id)
+        )
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    def get_request_key(  # pylint: disable=unused-argument,no-self-use
+        self, message: Message
+    ) -> Optional[Hashable]:
+        """
+        Get the key of a read request, under which identical requests in flight share one upstream call.
+
+        :param message: the request message.
+        :return: the key, or None if the request must be served on its own.
+        """
+        return None
+
+    def get_breaker(self, ledger_id: Optional[str]) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker of a ledger, None if requests are never refused."""
+        if self.circuit_breakers is None or ledger_id is None:
+            return None
+        return self.circuit_breakers.get(ledger_id)
+
+    def records_outcome(  # pylint: disable=unused-argument,no-self-use
+        self, message: Message
+    ) -> bool:
+        """
+        Check whether the outcome of a request tells the health of its ledger.
+
+        :param message: the request message.
+        :return: whether the outcome is recorded by the circuit breaker of the ledger, which otherwise never
+            refuses the request.
+        """
+        return True
+
+    def get_priority(  # pylint: disable=unused-argument,no-self-use
+        self, message: Message
+    ) -> int:
+        """
+        Get the priority of a request's calls to the rate limited endpoints.
+
+        :param message: the request message.
+        :return: the priority, the lowest being the most urgent.
+        """
+        return Priority.READ
+
+    async def _reply_with(
+        self, shared: Task, api: LedgerApi, message: Message, dialogue: Dialogue
+    ) -> Message:
+        """
+        Reply to a request with the content of the response to an identical one.
+
+        :param shared: the task serving the identical request.
+        :param api: the ledger api.
+        :param message: the request message.
+        :param dialogue: the dialogue of the request.
+        :return: the response message.
+        """
+        try:
+            response = await asyncio.shield(shared)
+            content = {
+                name: value
+                for name, value in response.body.items()
+                if name not in DIALOGUE_FIELDS
+            }
+            return dialogue.reply(
+                performative=response.performative, target_message=message, **content
+            )
+        except Exception as exception:  # pylint: disable=broad-except
+            return self.get_error_message(exception, api, message, dialogue)
 
     def get_handler(self, performative: Any) -> Callable[[Any], Task]:
         """
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the coalescing of JSON-RPC reads into batches."""
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_BATCH_WINDOW = 0.005
+DEFAULT_MAX_BATCH_SIZE = 100
+
+# reads that are safe to send in any order alongside each other
+BATCHED_METHODS = frozenset(
+    {
+        "eth_blockNumber",
+        "eth_call",
+        "eth_chainId",
+        "eth_feeHistory",
+        "eth_gasPrice",
+        "eth_getBalance",
+        "eth_getBlockByNumber",
+        "eth_getCode",
+        "eth_getTransactionByHash",
+        "eth_getTransactionCount",
+        "eth_getTransactionReceipt",
+        "eth_maxPriorityFeePerGas",
+    }
+)
+
+
+@dataclass(frozen=True)
+class BatchStats:
+    """The batches sent to an endpoint so far."""
+
+    requests: int
+    # posts to the endpoint, each holding one request or a batch of them
+    batches: int
+    max_batch_size: int
+
+    @property
+    def mean_batch_size(self) -> float:
+        """Get the mean number of requests per post."""
+        return self.requests / self.batches if self.batches else 0.0
+
+
+@dataclass
+class _Call:
+    """A request waiting for its batch to be answered."""
+
+    payload: Dict[str, Any]
+    done: threading.Event = field(default_factory=threading.Event)
+    response: Optional[Dict[str, Any]] = None
+    error: Optional[Exception] = None
+
+
+class JsonRpcBatcher:
+    """
+    Coalesce the JSON-RPC requests sent to one endpoint from several threads.
+
+    The first request to arrive waits `window` seconds, or until `max_batch_size`
+    requests have joined it, and then sends every request collected so far as one
+    batch; each caller gets its own response back. An endpoint that does not answer
+    batches is sent the requests one at a time from then on.
+    """
+
+    def __init__(
+        self,
+        post: Callable[[bytes], bytes],
+        window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ) -> None:
+        """
+        Initialize the batcher.
+
+        :param post: send a JSON-RPC body to the endpoint and return the body of the response.
+        :param window: how long the first request of a batch waits for others, in seconds.
+        :param max_batch_size: the maximum number of requests per batch.
+        """
+        self._post = post
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batch_supported = True
+        self._ready = threading.Condition()
+        self._pending: List[_Call] = []
+        self._collecting = False
+        self._requests = 0
+        self._batches = 0
+        self._max_size = 0
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a request as part of the next batch.
+
+        :param payload: the JSON-RPC request.
+        :return: the JSON-RPC response.
+        """
+        call = _Call(payload)
+        with self._ready:
+            self._pending.append(call)
+            leader = not self._collecting
+            self._collecting = True
+            if len(self._pending) >= self.max_batch_size:
+                self._ready.notify()
+        if leader:
+            with self._ready:
+                self._ready.wait_for(
+                    lambda: len(self._pending) >= self.max_batch_size, self.window
+                )
+                calls, self._pending = self._pending, []
+                self._collecting = False
+            for start in range(0, len(calls), self.max_batch_size):
+                self._send(calls[start : start + self.max_batch_size])
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.response  # type: ignore
+
+    def _send(self, calls: List[_Call]) -> None:
+        """Send a batch and hand every response to its caller."""
+        try:
+            if len(calls) == 1 or not self.batch_supported:
+                for call in calls:
+                    call.response = self._exchange(call.payload)
+            else:
+                self._send_batch(calls)
+        except Exception as exception:  # pylint: disable=broad-except
+            for call in calls:
+                if call.response is None:
+                    call.error = exception
+        for call in calls:
+            call.done.set()
+
+    def _send_batch(self, calls: List[_Call]) -> None:
+        """Send the calls as one batch, numbered by their position in it."""
+        batch = [dict(call.payload, id=index) for index, call in enumerate(calls)]
+        responses = self._exchange(batch)
+        if not isinstance(responses, list):
+            # the endpoint does not answer batches
+            self.batch_supported = False
+            for call in calls:
+                call.response = self._exchange(call.payload)
+            return
+        by_index = {response.get("id"): response for response in responses}
+        for index, call in enumerate(calls):
+            response = by_index.get(index)
+            if response is None:
+                call.error = ValueError(f"No response to {call.payload['method']} in the batch.")
+                continue
+            call.response = dict(response, id=call.payload.get("id"))
+
+    def _exchange(self, body: Any) -> Any:
+        """Post a request or a batch of requests, and count it."""
+        size = len(body) if isinstance(body, list) else 1
+        with self._ready:
+            self._requests += size
+            self._batches += 1
+            self._max_size = max(self._max_size, size)
+        return json.loads(self._post(json.dumps(body).encode()))
+
+    def stats(self) -> BatchStats:
+        """Get the batches sent so far."""
+        with self._ready:
+            return BatchStats(self._requests, self._batches, self._max_size)
+
+
+class JsonRpcBatchers:
+    """The batchers of the connection, one per endpoint or endpoint pool, shared by every api using it."""
+
+    def __init__(
+        self,
+        window: float = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    ) -> None:
+        """
+        Initialize the batchers.
+
+        :param window: how long the first request of a batch waits for others, in seconds.
+        :param max_batch_size: the maximum number of requests per batch.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._batchers: Dict[str, JsonRpcBatcher] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, post: Callable[[bytes], bytes]) -> JsonRpcBatcher:
+        """
+        Get the batcher of an endpoint, making it on first use.
+
+        :param name: the endpoint, or the ledger of an endpoint pool.
+        :param post: send a JSON-RPC body to the endpoint and return the body of the response.
+        :return: the batcher.
+        """
+        with self._lock:
+            batcher = self._batchers.get(name)
+            if batcher is None:
+                batcher = self._batchers[name] = JsonRpcBatcher(
+                    post, self.window, self.max_batch_size
+                )
+            return batcher
+
+    def stats(self) -> Dict[str, BatchStats]:
+        """Get the batches sent to every endpoint or endpoint pool so far."""
+        with self._lock:
+            batchers = dict(self._batchers)
+        return {name: batcher.stats() for name, batcher in batchers.items()}
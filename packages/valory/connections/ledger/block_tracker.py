@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tracker of the latest block of every ledger."""
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple
+
+from aea.crypto.base import LedgerApi
+
+DEFAULT_BLOCK_MAX_AGE = 1.0
+
+
+class BlockTracker:
+    """
+    Track the latest block of every ledger, shared by all the requests to it.
+
+    The block height of a ledger is read again only once the last reading is older than
+    `max_age` seconds. Requests that find it stale while another one reads it wait for
+    that reading rather than each calling `eth_blockNumber`.
+    """
+
+    def __init__(
+        self,
+        max_age: float = DEFAULT_BLOCK_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the tracker.
+
+        :param max_age: the time a reading of the block height is used for, in seconds.
+        :param clock: the clock of the readings, in seconds.
+        """
+        self.max_age = max_age
+        self._clock = clock
+        # ledger id -> (block, monotonic time it was read at)
+        self._blocks: Dict[str, Tuple[int, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.reads: Counter = Counter()
+
+    def latest(self, ledger_id: str, api: LedgerApi) -> Optional[int]:
+        """
+        Get the latest block of a ledger, reading it if the last reading is stale.
+
+        :param ledger_id: the ledger id.
+        :param api: the api of the ledger.
+        :return: the block height, or None if the ledger does not tell it.
+        """
+        eth = getattr(api.api, "eth", None)
+        if eth is None:
+            return None
+        with self._lock:
+            lock = self._locks.setdefault(ledger_id, threading.Lock())
+        with lock:
+            reading = self._blocks.get(ledger_id)
+            if reading is not None and self._clock() - reading[1] < self.max_age:
+                return reading[0]
+            block = int(eth.block_number)
+            self._blocks[ledger_id] = (block, self._clock())
+            self.reads[ledger_id] += 1
+            return block
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of block height readings of every ledger."""
+        with self._lock:
+            return dict(self.reads)
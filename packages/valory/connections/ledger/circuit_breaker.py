@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the circuit breakers of the ledgers of the connection."""
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_FAILURE_THRESHOLD = 0.5
+DEFAULT_SLOW_CALL_DURATION = 10.0
+DEFAULT_OPEN_DURATION = 30.0
+DEFAULT_HALF_OPEN_CALLS = 1
+# the code of the error replies to the requests of a ledger whose circuit is open
+LEDGER_UNAVAILABLE_CODE = 503
+TOO_MANY_REQUESTS = 429
+# the most causes of an exception looked at for a transport failure
+MAX_CAUSES = 5
+
+
+class CircuitState:  # pylint: disable=too-few-public-methods
+    """The states of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class LedgerUnavailable(Exception):
+    """A request was refused because the circuit of its ledger is open."""
+
+    code = LEDGER_UNAVAILABLE_CODE
+
+    def __init__(self, ledger_id: str, state: str, retry_after: int) -> None:
+        """
+        Initialize the exception.
+
+        :param ledger_id: the ledger id.
+        :param state: the state of the circuit of the ledger.
+        :param retry_after: the time until the ledger is tried again, in seconds.
+        """
+        super().__init__(
+            f"Ledger {ledger_id} is temporarily unavailable, retry in {retry_after} seconds."
+        )
+        self.ledger_id = ledger_id
+        self.state = state
+        self.retry_after = retry_after
+
+    @property
+    def data(self) -> bytes:
+        """Get the state of the circuit, as carried by the error reply."""
+        return json.dumps(
+            {
+                "ledger_id": self.ledger_id,
+                "state": self.state,
+                "retry_after": self.retry_after,
+            }
+        ).encode("utf-8")
+
+
+@dataclass
+class RequestOutcome:
+    """What serving a request cost its ledger, filled in while the request is served."""
+
+    # when the request started running, None while it waits for an executor slot
+    started: Optional[float] = None
+    # the time spent waiting for the rate limits of the endpoints, in seconds
+    waited: float = 0.0
+    # whether the ledger failed to serve the request, rather than refused it
+    failed: bool = False
+
+    def start(self) -> None:
+        """Record that the request started running."""
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def wait(self, duration: float) -> None:
+        """
+        Record a wait for a rate limit.
+
+        :param duration: the duration of the wait, in seconds.
+        """
+        self.waited += duration
+
+    def upstream_time(self) -> Optional[float]:
+        """Get the time the request spent on its ledger so far, None if it never started."""
+        if self.started is None:
+            return None
+        return max(0.0, time.monotonic() - self.started - self.waited)
+
+
+# the outcome of the request being served by the current task or thread
+request_outcome: ContextVar[Optional[RequestOutcome]] = ContextVar(
+    "request_outcome", default=None
+)
+
+
+def is_ledger_failure(exception: BaseException) -> bool:
+    """
+    Check whether an exception shows the ledger failing to serve a request.
+
+    Transport errors, timeouts and answers with an HTTP status of 5xx or 429 are
+    failures. JSON-RPC errors, such as insufficient funds, a nonce too low or a
+    reverted call, are answers of a working ledger.
+
+    :param exception: the exception, or one of its causes.
+    :return: whether the exception is a failure of the ledger.
+    """
+    error: Optional[BaseException] = exception
+    for _ in range(MAX_CAUSES):
+        if error is None:
+            break
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status >= 500 or status == TOO_MANY_REQUESTS
+        if isinstance(
+            error,
+            (
+                TimeoutError,
+                asyncio.TimeoutError,
+                ConnectionError,
+                RequestsConnectionError,
+                Timeout,
+            ),
+        ):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def record_error(exception: BaseException) -> None:
+    """
+    Mark the request being served as failed, if an exception met while serving it shows its ledger failing.
+
+    :param exception: the exception.
+    """
+    outcome = request_outcome.get()
+    if outcome is not None and is_ledger_failure(exception):
+        outcome.failed = True
+
+
+@dataclass
+class CircuitStats:
+    """The state of a circuit breaker."""
+
+    state: str
+    failure_rate: float
+    calls: int
+    opened: int
+    refused: int
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Stop sending the requests of a ledger to its RPC while it is failing.
+
+    The outcome of the last `window` requests is kept; a request fails if it errors or
+    takes longer than `slow_call_duration`. Once at least `min_calls` are kept and the
+    share of failures reaches `failure_threshold`, the circuit opens and every request is
+    refused for `open_duration` seconds. The circuit then half-opens, letting
+    `half_open_calls` requests through: it closes if they all succeed, and opens
+    again as soon as one fails.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        ledger_id: str,
+        window: int = DEFAULT_WINDOW,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        failure_threshold: float = DEFAULT_FAILURE_THRESHOLD,
+        slow_call_duration: float = DEFAULT_SLOW_CALL_DURATION,
+        open_duration: float = DEFAULT_OPEN_DURATION,
+        half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the circuit breaker.
+
+        :param ledger_id: the ledger id.
+        :param window: the number of recent outcomes kept.
+        :param min_calls: the outcomes needed before the circuit may open.
+        :param failure_threshold: the share of failures opening the circuit.
+        :param slow_call_duration: the duration over which a request counts as failed, in seconds.
+        :param open_duration: how long the circuit stays open, in seconds.
+        :param half_open_calls: the trial requests let through once half-open.
+        :param clock: the clock of the breaker, in seconds.
+        """
+        self.ledger_id = ledger_id
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_duration = slow_call_duration
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self.opened = 0
+        self.refused = 0
+
+    @property
+    def state(self) -> str:
+        """Get the state of the circuit, half-opening it if it was open long enough."""
+        with self._lock:
+            return self._update_state()
+
+    def _update_state(self) -> str:
+        """Half-open the circuit if it was open long enough."""
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.open_duration
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._trials = 0
+            self._trial_successes = 0
+        return self._state
+
+    def _open(self) -> None:
+        """Open the circuit."""
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def allow(self) -> None:
+        """
+        Let a request through, counting it as a trial if the circuit is half-open.
+
+        :raises LedgerUnavailable: if the circuit is open, or half-open with all trials taken.
+        """
+        with self._lock:
+            state = self._update_state()
+            if state == CircuitState.CLOSED:
+                return
+            if state == CircuitState.HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return
+            self.refused += 1
+            remaining = self.open_duration - (self._clock() - self._opened_at)
+            raise LedgerUnavailable(
+                self.ledger_id, state, max(1, math.ceil(remaining))
+            )
+
+    def release(self) -> None:
+        """Give back the trial of a request let through that ended without an outcome."""
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record(self, duration: float, ok: bool) -> None:
+        """
+        Record the outcome of a request let through.
+
+        :param duration: the duration of the request, in seconds.
+        :param ok: whether the request succeeded.
+        """
+        failed = not ok or duration > self.slow_call_duration
+        with self._lock:
+            state = self._update_state()
+            if state == CircuitState.OPEN:
+                return
+            if state == CircuitState.HALF_OPEN:
+                if failed:
+                    self._open()
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._state = CircuitState.CLOSED
+                return
+            self._outcomes.append(failed)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_threshold
+            ):
+                self._open()
+
+    def stats(self) -> CircuitStats:
+        """Get the state of the breaker."""
+        with self._lock:
+            state = self._update_state()
+            calls = len(self._outcomes)
+            return CircuitStats(
+                state=state,
+                failure_rate=sum(self._outcomes) / calls if calls else 0.0,
+                calls=calls,
+                opened=self.opened,
+                refused=self.refused,
+            )
+
+
+class CircuitBreakers:
+    """The circuit breakers of the ledgers of the connection."""
+
+    def __init__(self, **breaker_kwargs: Any) -> None:
+        """
+        Initialize the circuit breakers.
+
+        :param breaker_kwargs: the keyword arguments of every breaker.
+        """
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, ledger_id: str) -> CircuitBreaker:
+        """
+        Get the breaker of a ledger, making it on first use.
+
+        :param ledger_id: the ledger id.
+        :return: the breaker.
+        """
+        breaker = self._breakers.get(ledger_id)
+        if breaker is None:
+            breaker = self._breakers[ledger_id] = CircuitBreaker(
+                ledger_id, **self.breaker_kwargs
+            )
+        return breaker
+
+    def stats(self) -> Dict[str, CircuitStats]:
+        """Get the state of the breaker of every ledger used so far."""
+        return {
+            ledger_id: breaker.stats() for ledger_id, breaker in self._breakers.items()
+        }
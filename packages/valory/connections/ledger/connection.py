@@ -21,23 +21,80 @@
 """Scaffold connection and channel."""
 
 import asyncio
-from typing import Any, Dict, Optional
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional, cast
 
 from aea.configurations.base import PublicId
 from aea.connections.base import Connection, ConnectionStates
 from aea.mail.base import Envelope
 from aea.protocols.base import Message
-from packages.valory.connections.ledger.base import RequestDispatcher
+from packages.valory.connections.ledger.base import (
+    ETHEREUM_LEDGER_ID,
+    EVM_LEDGERS,
+    RequestDispatcher,
+)
+from packages.valory.connections.ledger.batching import (
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_MAX_BATCH_SIZE,
+    BatchStats,
+    JsonRpcBatchers,
+)
+from packages.valory.connections.ledger.block_tracker import (
+    DEFAULT_BLOCK_MAX_AGE,
+    BlockTracker,
+)
+from packages.valory.connections.ledger.circuit_breaker import (
+    CircuitBreakers,
+    CircuitStats,
+)
 from packages.valory.connections.ledger.contract_dispatcher import (
     ContractApiRequestDispatcher,
 )
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    DialogueStoreStats,
+)
+from packages.valory.connections.ledger.endpoint_pool import (
+    DEFAULT_MAX_ENDPOINTS,
+    EndpointPools,
+    EndpointStats,
+    load_chain_endpoints,
+)
+from packages.valory.connections.ledger.executors import (
+    LedgerExecutors,
+    LedgerPoolStats,
+)
 from packages.valory.connections.ledger.ledger_dispatcher import (
     LedgerApiRequestDispatcher,
 )
+from packages.valory.connections.ledger.rate_limits import BucketStats, RateLimits
+from packages.valory.connections.ledger.receipt_watcher import DEFAULT_POLL_INTERVAL
+from packages.valory.connections.ledger.state_cache import (
+    DEFAULT_MAX_ENTRIES,
+    StateCache,
+)
 from packages.valory.protocols.contract_api import ContractApiMessage
 from packages.valory.protocols.ledger_api import LedgerApiMessage
 
 PUBLIC_ID = PublicId.from_str("valory/ledger:0.19.0")
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+STATE_CACHE_FILE = "state_cache.json"
+
+# the connected ledger connections of the process, whose statistics the skills export
+_CONNECTED: "weakref.WeakSet[LedgerConnection]" = weakref.WeakSet()
+
+
+def connected_ledger_connections() -> List["LedgerConnection"]:
+    """
+    Get the ledger connections connected in this process.
+
+    Skills cannot reach the connections of their agent, so they read the statistics of the
+    ledger connection through here, for instance to export them to Prometheus.
+
+    :return: the connected ledger connections.
+    """
+    return list(_CONNECTED)
 
 
 class LedgerConnection(Connection):
@@ -54,6 +111,12 @@ class LedgerConnection(Connection):
         self._ledger_dispatcher: Optional[LedgerApiRequestDispatcher] = None
         self._contract_dispatcher: Optional[ContractApiRequestDispatcher] = None
         self._response_envelopes: Optional[asyncio.Queue] = None
+        self._executors: Optional[LedgerExecutors] = None
+        self._rpc_batchers: Optional[JsonRpcBatchers] = None
+        self._endpoint_pools: Optional[EndpointPools] = None
+        self._rate_limits: Optional[RateLimits] = None
+        self._circuit_breakers: Optional[CircuitBreakers] = None
+        self._health_check_task: Optional[asyncio.Task] = None
 
         self.task_to_request: Dict[asyncio.Future, Envelope] = {}
         self.api_configs = self.configuration.config.get(
@@ -65,6 +128,60 @@ class LedgerConnection(Connection):
         self.request_retry_timeout = self.configuration.config.get(
             "retry_timeout", self.TIMEOUT
         )
+        self.executor_configs = self.configuration.config.get(
+            "ledger_executors", {}
+        )  # type: Dict[str, Dict[str, Any]]
+        self.collapse_reads = self.configuration.config.get("collapse_reads", True)
+        receipt_watcher = self.configuration.config.get("receipt_watcher", {})
+        self.receipt_poll_interval = receipt_watcher.get(
+            "poll_interval", DEFAULT_POLL_INTERVAL
+        )
+        self.fetch_transaction = receipt_watcher.get("fetch_transaction", True)
+        rpc_batching = self.configuration.config.get("rpc_batching", {})
+        self.rpc_batch_window = rpc_batching.get("window", DEFAULT_BATCH_WINDOW)
+        self.rpc_max_batch_size = rpc_batching.get(
+            "max_batch_size", DEFAULT_MAX_BATCH_SIZE
+        )
+        endpoint_pool = dict(self.configuration.config.get("endpoint_pool", {}))
+        self.health_check_interval = endpoint_pool.pop(
+            "health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL
+        )
+        self.seed_endpoints = endpoint_pool.pop("seed_from_chains_json", False)
+        self.max_endpoints = endpoint_pool.pop("max_endpoints", DEFAULT_MAX_ENDPOINTS)
+        self.endpoints = endpoint_pool.pop(
+            "endpoints", {}
+        )  # type: Dict[str, List[str]]
+        self.endpoint_pool_kwargs = endpoint_pool
+        rate_limits = dict(self.configuration.config.get("rate_limits", {}))
+        self.rate_limit_buckets = rate_limits.pop(
+            "buckets", {}
+        )  # type: Dict[str, Dict[str, Any]]
+        self.rate_limit_kwargs = rate_limits
+        circuit_breaker = dict(self.configuration.config.get("circuit_breaker", {}))
+        self.circuit_breaker_enabled = circuit_breaker.pop("enabled", True)
+        self.circuit_breaker_kwargs = circuit_breaker
+        block_tracker = self.configuration.config.get("block_tracker", {})
+        self.block_tracker = BlockTracker(
+            max_age=block_tracker.get("max_age", DEFAULT_BLOCK_MAX_AGE)
+        )
+        state_cache = self.configuration.config.get("state_cache", {})
+        self.state_cache = StateCache(
+            immutable=state_cache.get("immutable", ()),
+            per_block=state_cache.get("per_block", ()),
+            ttls=state_cache.get("ttl", {}),
+            path=Path(self.data_dir) / STATE_CACHE_FILE
+            if state_cache.get("persist", False)
+            else None,
+            max_entries=state_cache.get("max_entries", DEFAULT_MAX_ENTRIES),
+        )
+        # sizes of the contract, call plan and instance caches of the contract dispatcher
+        self.contract_cache = self.configuration.config.get(
+            "contract_cache", {}
+        )  # type: Dict[str, int]
+        # eviction of the dialogues of both dispatchers
+        self.dialogue_gc = self.configuration.config.get(
+            "dialogue_gc", {}
+        )  # type: Dict[str, Any]
 
     @property
     def response_envelopes(self) -> asyncio.Queue:
@@ -75,6 +192,101 @@ class LedgerConnection(Connection):
             )
         return self._response_envelopes
 
+    def executor_stats(self) -> Dict[str, LedgerPoolStats]:
+        """Get the load of the executor pool of every ledger used so far."""
+        if self._executors is None:
+            return {}
+        return self._executors.stats()
+
+    def rpc_batch_stats(self) -> Dict[str, BatchStats]:
+        """Get the JSON-RPC batches sent to every endpoint so far."""
+        if self._rpc_batchers is None:
+            return {}
+        return self._rpc_batchers.stats()
+
+    def endpoint_stats(self) -> Dict[str, List[EndpointStats]]:
+        """Get the ranked RPC endpoints of every ledger used so far."""
+        if self._endpoint_pools is None:
+            return {}
+        return self._endpoint_pools.stats()
+
+    def rate_limit_stats(self) -> Dict[str, Dict[str, BucketStats]]:
+        """Get the rate limits of the RPC endpoints used so far, per ledger and endpoint."""
+        if self._rate_limits is None:
+            return {}
+        return self._rate_limits.stats()
+
+    def circuit_stats(self) -> Dict[str, CircuitStats]:
+        """Get the state of the circuit breaker of every ledger used so far."""
+        if self._circuit_breakers is None:
+            return {}
+        return self._circuit_breakers.stats()
+
+    def block_stats(self) -> Dict[str, int]:
+        """Get the number of block height readings of every ledger, shared by its requests."""
+        return self.block_tracker.stats()
+
+    def state_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the hits and misses of the contract state cache, per callable."""
+        return self.state_cache.stats()
+
+    def contract_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the size, hits and misses of the caches of the contract dispatcher."""
+        if self._contract_dispatcher is None:
+            return {}
+        return self._contract_dispatcher.cache_stats()
+
+    def collapsed_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the number of requests served by the upstream call of an identical one, per protocol and performative."""
+        return {
+            name: dict(dispatcher.collapsed)
+            for name, dispatcher in (
+                ("ledger_api", self._ledger_dispatcher),
+                ("contract_api", self._contract_dispatcher),
+            )
+            if dispatcher is not None
+        }
+
+    def dialogue_stats(self) -> Dict[str, DialogueStoreStats]:
+        """Get the size of the dialogue store of both dispatchers, and the dialogues evicted from it."""
+        return {
+            name: cast(CollectedDialogues, dispatcher.dialogues).collector.stats()
+            for name, dispatcher in (
+                ("ledger_api", self._ledger_dispatcher),
+                ("contract_api", self._contract_dispatcher),
+            )
+            if dispatcher is not None
+        }
+
+    def _make_endpoint_pools(self) -> EndpointPools:
+        """Make the endpoint pools from the configured endpoints and, if enabled, those of `chains.json`."""
+        endpoints = {
+            ledger_id: list(uris) for ledger_id, uris in self.endpoints.items()
+        }
+        if self.seed_endpoints:
+            chain_ids = {
+                ledger_id: config.get("chain_id")
+                for ledger_id, config in self.api_configs.items()
+                if ledger_id in EVM_LEDGERS or ledger_id == ETHEREUM_LEDGER_ID
+            }
+            seeded = load_chain_endpoints(chain_ids, self.max_endpoints)
+            for ledger_id, uris in seeded.items():
+                endpoints.setdefault(ledger_id, []).extend(uris)
+        return EndpointPools(endpoints, **self.endpoint_pool_kwargs)
+
+    async def _check_endpoints(self) -> None:
+        """Probe the RPC endpoints of every ledger periodically."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            if self._endpoint_pools is None:  # pragma: nocover
+                return
+            try:
+                await self.loop.run_in_executor(
+                    None, self._endpoint_pools.check_health
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.warning(f"Endpoint health check failed: {e}")
+
     async def connect(self) -> None:
         """Set up the connection."""
 
@@ -83,6 +295,19 @@ class LedgerConnection(Connection):
 
         self.state = ConnectionStates.connecting
 
+        self._executors = LedgerExecutors(self.loop, self.executor_configs)
+        self._endpoint_pools = self._make_endpoint_pools()
+        if self.circuit_breaker_enabled:
+            self._circuit_breakers = CircuitBreakers(**self.circuit_breaker_kwargs)
+        if self.rate_limit_buckets:
+            self._rate_limits = RateLimits(
+                self.rate_limit_buckets, **self.rate_limit_kwargs
+            )
+        self._health_check_task = self.loop.create_task(self._check_endpoints())
+        if self.rpc_batch_window > 0:
+            self._rpc_batchers = JsonRpcBatchers(
+                self.rpc_batch_window, self.rpc_max_batch_size
+            )
         self._ledger_dispatcher = LedgerApiRequestDispatcher(
             self._state,
             loop=self.loop,
@@ -91,6 +316,16 @@ class LedgerConnection(Connection):
             retry_attempts=self.request_retry_attempts,
             retry_timeout=self.request_retry_timeout,
             connection_id=self.connection_id,
+            executors=self._executors,
+            rpc_batchers=self._rpc_batchers,
+            endpoint_pools=self._endpoint_pools,
+            collapse_reads=self.collapse_reads,
+            rate_limits=self._rate_limits,
+            circuit_breakers=self._circuit_breakers,
+            receipt_poll_interval=self.receipt_poll_interval,
+            fetch_transaction=self.fetch_transaction,
+            block_tracker=self.block_tracker,
+            dialogue_gc=self.dialogue_gc,
         )
         self._contract_dispatcher = ContractApiRequestDispatcher(
             self._state,
@@ -100,10 +335,21 @@ class LedgerConnection(Connection):
             retry_attempts=self.request_retry_attempts,
             retry_timeout=self.request_retry_timeout,
             connection_id=self.connection_id,
+            executors=self._executors,
+            rpc_batchers=self._rpc_batchers,
+            endpoint_pools=self._endpoint_pools,
+            collapse_reads=self.collapse_reads,
+            rate_limits=self._rate_limits,
+            circuit_breakers=self._circuit_breakers,
+            state_cache=self.state_cache,
+            block_tracker=self.block_tracker,
+            dialogue_gc=self.dialogue_gc,
+            **self.contract_cache,
         )
 
         self._response_envelopes = asyncio.Queue()
         self.state = ConnectionStates.connected
+        _CONNECTED.add(self)
 
     async def disconnect(self) -> None:
         """Tear down the connection."""
@@ -111,6 +357,7 @@ class LedgerConnection(Connection):
             return
 
         self.state = ConnectionStates.disconnecting
+        _CONNECTED.discard(self)
 
         for task in self.task_to_request.keys():
             if not task.cancelled():  # pragma: nocover
@@ -118,6 +365,18 @@ class LedgerConnection(Connection):
         self._ledger_dispatcher = None
         self._contract_dispatcher = None
         self._response_envelopes = None
+        if self._executors is not None:
+            self._executors.shutdown()
+            self._executors = None
+        self._rpc_batchers = None
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            self._health_check_task = None
+        if self._endpoint_pools is not None:
+            self._endpoint_pools.shutdown()
+            self._endpoint_pools = None
+        self._rate_limits = None
+        self._circuit_breakers = None
 
         self.state = ConnectionStates.disconnected
 
@@ -20,9 +20,11 @@
 
 """This module contains the implementation of the contract API request dispatcher."""
 import inspect
+import json
 import logging
 from collections.abc import Mapping
-from typing import Any, Callable, Optional, Union, cast
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union, cast
 
 from aea.common import JSONLike
 from aea.contracts import Contract, contract_registry
@@ -35,6 +37,15 @@ from aea.protocols.base import Address, Message
 from aea.protocols.dialogue.base import Dialogue as BaseDialogue
 from aea.protocols.dialogue.base import Dialogues as BaseDialogues
 from packages.valory.connections.ledger.base import RequestDispatcher
+from packages.valory.connections.ledger.block_tracker import BlockTracker
+from packages.valory.connections.ledger.circuit_breaker import record_error
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    pop_collection_args,
+)
+from packages.valory.connections.ledger.lru_cache import LRUCache
+from packages.valory.connections.ledger.rate_limits import Priority
+from packages.valory.connections.ledger.state_cache import StateCache
 from packages.valory.protocols.contract_api import ContractApiMessage
 from packages.valory.protocols.contract_api.dialogues import ContractApiDialogue
 from packages.valory.protocols.contract_api.dialogues import (
@@ -45,8 +56,30 @@ _default_logger = logging.getLogger(
     "aea.packages.valory.connections.ledger.contract_dispatcher"
 )
 
+DEFAULT_MAX_CONTRACTS = 64
+DEFAULT_MAX_CALL_PLANS = 1024
+DEFAULT_MAX_INSTANCES = 1024
+
+
+@dataclass(frozen=True)
+class CallPlan:
+    """A validated way to call a contract callable."""
+
+    # the contract package method, or None if the callable is only in the ABI
+    method: Optional[Callable]
+    # whether the method takes the contract address after the ledger api
+    with_address: bool = False
+    # the name of the callable in the ABI
+    abi_name: str = ""
+
 
-class ContractApiDialogues(BaseContractApiDialogues):
+def _uses_default_method_call(contract: Contract) -> bool:
+    """Check whether a contract calls its ABI methods the default way."""
+    method = getattr(contract, "default_method_call", None)
+    return getattr(method, "__func__", None) is Contract.default_method_call.__func__
+
+
+class ContractApiDialogues(CollectedDialogues, BaseContractApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -68,12 +101,14 @@ class ContractApiDialogues(BaseContractApiDialogues):
             # The ledger connection maintains the dialogue on behalf of the ledger
             return ContractApiDialogue.Role.LEDGER
 
+        collection = pop_collection_args(kwargs)
         BaseContractApiDialogues.__init__(
             self,
             self_address=str(kwargs.pop("connection_id")),
             role_from_first_message=role_from_first_message,
             **kwargs,
         )
+        self.init_collection(**collection)
 
 
 class ContractApiRequestDispatcher(RequestDispatcher):
@@ -83,9 +118,25 @@ class ContractApiRequestDispatcher(RequestDispatcher):
         """Initialize the dispatcher."""
         logger = kwargs.pop("logger", None)
         connection_id = kwargs.pop("connection_id")
+        dialogue_gc = kwargs.pop("dialogue_gc", None) or {}
+        self.state_cache: Optional[StateCache] = kwargs.pop("state_cache", None)
+        self.block_tracker: BlockTracker = (
+            kwargs.pop("block_tracker", None) or BlockTracker()
+        )
+        self._contracts: LRUCache[Contract] = LRUCache(
+            kwargs.pop("max_contracts", DEFAULT_MAX_CONTRACTS)
+        )
+        self._call_plans: LRUCache[CallPlan] = LRUCache(
+            kwargs.pop("max_call_plans", DEFAULT_MAX_CALL_PLANS)
+        )
+        self._instances: LRUCache[Tuple[LedgerApi, Any]] = LRUCache(
+            kwargs.pop("max_instances", DEFAULT_MAX_INSTANCES)
+        )
         logger = logger if logger is not None else _default_logger
         super().__init__(logger, *args, **kwargs)
-        self._contract_api_dialogues = ContractApiDialogues(connection_id=connection_id)
+        self._contract_api_dialogues = ContractApiDialogues(
+            connection_id=connection_id, **dialogue_gc
+        )
 
     @property
     def dialogues(self) -> BaseDialogues:
@@ -104,6 +155,29 @@ class ContractApiRequestDispatcher(RequestDispatcher):
         message = cast(ContractApiMessage, message)
         return message.ledger_id
 
+    def get_request_key(self, message: Message) -> Optional[Hashable]:
+        """Get the key of a state read, None for other requests."""
+        message = cast(ContractApiMessage, message)
+        if message.performative is not ContractApiMessage.Performative.GET_STATE:
+            return None
+        return (
+            message.performative,
+            message.ledger_id,
+            message.contract_id,
+            message.contract_address,
+            message.callable,
+            json.dumps(message.kwargs.body, sort_keys=True, default=str),
+        )
+
+    def get_priority(self, message: Message) -> int:
+        """Get the priority of a request, transaction builds before state reads."""
+        if (
+            cast(ContractApiMessage, message).performative
+            is ContractApiMessage.Performative.GET_STATE
+        ):
+            return Priority.READ
+        return Priority.BUILD
+
     def get_error_message(
         self,
         exception: Exception,
@@ -120,14 +194,15 @@ class ContractApiRequestDispatcher(RequestDispatcher):
         :param dialogue: the Contract API dialogue.
         :return: an error message response.
         """
+        record_error(exception)
         response = cast(
             ContractApiMessage,
             dialogue.reply(
                 performative=ContractApiMessage.Performative.ERROR,
                 target_message=message,
-                code=500,
+                code=getattr(exception, "code", 500),
                 message=parse_exception(exception),
-                data=b"",
+                data=getattr(exception, "data", b""),
             ),
         )
         return response
@@ -150,20 +225,25 @@ class ContractApiRequestDispatcher(RequestDispatcher):
         :param response_builder: callable that from bytes builds a contract API message.
         :return: the response message.
         """
-        contract = self.contract_registry.make(message.contract_id)
+        contract = self._contracts.get_or_make(
+            message.contract_id,
+            lambda: self.contract_registry.make(message.contract_id),
+        )
         try:
             data = self._get_data(ledger_api, message, contract)
             response = response_builder(data, dialogue)
         except AEAException as exception:
             self.logger.debug(
-                f"Whilst processing the contract api request:\n{message}\nthe following exception occured:\n{str(exception)}"
+                f"Whilst processing the contract api request:\n{message}\n"
+                f"the following exception occured:\n{str(exception)}"
             )
             response = self.get_error_message(exception, ledger_api, message, dialogue)
         except (
             Exception
         ) as exception:  # pylint: disable=broad-except  # pragma: nocover
             self.logger.debug(
-                f"Whilst processing the contract api request:\n{message}\nthe following error occured:\n{parse_exception(exception)}"
+                f"Whilst processing the contract api request:\n{message}\n"
+                f"the following error occured:\n{parse_exception(exception)}"
             )
             response = self.get_error_message(exception, ledger_api, message, dialogue)
         return response
@@ -198,7 +278,37 @@ class ContractApiRequestDispatcher(RequestDispatcher):
                 ),
             )
 
-        return self.dispatch_request(ledger_api, message, dialogue, build_response)
+        cache = self.state_cache
+        if cache is None or not cache.caches(message.callable):
+            return self.dispatch_request(ledger_api, message, dialogue, build_response)
+
+        key = cache.key(
+            message.ledger_id,
+            message.contract_id,
+            message.contract_address,
+            message.callable,
+            message.kwargs.body,
+        )
+        block = (
+            self._get_block_number(message.ledger_id, ledger_api)
+            if message.callable in cache.per_block
+            else None
+        )
+        data = cache.get(key, message.callable, block)
+        if data is not None:
+            return build_response(data, dialogue)
+        response = self.dispatch_request(ledger_api, message, dialogue, build_response)
+        if response.performative == ContractApiMessage.Performative.STATE:
+            cache.put(key, message.callable, response.state.body, block)
+        return response
+
+    def _get_block_number(self, ledger_id: str, ledger_api: LedgerApi) -> Optional[int]:
+        """Get the latest block of a ledger, or None if it cannot be told."""
+        try:
+            return self.block_tracker.latest(ledger_id, ledger_api)
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.debug(f"Could not get the block number: {e}")
+            return None
 
     def get_deploy_transaction(
         self,
@@ -309,8 +419,44 @@ class ContractApiRequestDispatcher(RequestDispatcher):
             return data
 
         # then, check if there is the handler for the provided callable.
-        data = self._validate_and_call_callable(api, message, contract)
-        return data
+        plan_key = (
+            message.ledger_id,
+            message.contract_id,
+            message.callable,
+            message.performative,
+        )
+        plan = self._call_plans.get(plan_key)
+        # the method is looked up again, so that a plan never outlives the method it calls
+        if plan is None or plan.method != getattr(contract, message.callable, None):
+            plan = self._plan_call(api, message, contract)
+            self._call_plans.put(plan_key, plan)
+        contract_instance = None
+        if plan.method is None and _uses_default_method_call(contract):
+            contract_instance = self._get_instance(api, message, contract)
+        return self._call_plan(api, message, contract, plan, contract_instance)
+
+    def _get_instance(
+        self, api: LedgerApi, message: ContractApiMessage, contract: Contract
+    ) -> Any:
+        """Get the ledger instance of a contract, built once per ledger api and address."""
+        key = (message.ledger_id, message.contract_id, message.contract_address)
+        cached = self._instances.get(key)
+        if cached is not None and cached[0] is api:
+            return cached[1]
+        contract_instance = contract.get_instance(api, message.contract_address)
+        self._instances.put(key, (api, contract_instance))
+        return contract_instance
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the size, hits and misses of the contract, call plan and instance caches."""
+        return {
+            name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for name, cache in (
+                ("contracts", self._contracts),
+                ("call_plans", self._call_plans),
+                ("instances", self._instances),
+            )
+        }
 
     @staticmethod
     def _call_stub(
@@ -343,6 +489,21 @@ class ContractApiRequestDispatcher(RequestDispatcher):
     def _validate_and_call_callable(
         api: LedgerApi, message: ContractApiMessage, contract: Contract
     ) -> Union[bytes, JSONLike]:
+        """
+        Validate a Contract callable, given the performative, and call it.
+
+        :param api: the ledger api object.
+        :param message: the contract api request.
+        :param contract: the contract instance.
+        :return: the data generated by the method.
+        """
+        plan = ContractApiRequestDispatcher._plan_call(api, message, contract)
+        return ContractApiRequestDispatcher._call_plan(api, message, contract, plan)
+
+    @staticmethod
+    def _plan_call(
+        api: LedgerApi, message: ContractApiMessage, contract: Contract
+    ) -> CallPlan:
         """
         Validate a Contract callable, given the performative.
 
@@ -356,14 +517,15 @@ class ContractApiRequestDispatcher(RequestDispatcher):
         :param api: the ledger api object.
         :param message: the contract api request.
         :param contract: the contract instance.
-        :return: the data generated by the method.
+        :return: the plan to call the method.
         """
         method_to_call: Optional[Callable] = None
         try:
             method_to_call = getattr(contract, message.callable)
         except AttributeError:
             _default_logger.info(
-                f"Contract method {message.callable} not found in the contract package {contract.contract_id}. Checking in the ABI..."
+                f"Contract method {message.callable} not found in the contract package {contract.contract_id}. "
+                "Checking in the ABI..."
             )
 
         # Check for the method in the ABI
@@ -375,13 +537,8 @@ class ContractApiRequestDispatcher(RequestDispatcher):
                 raise AEAException(
                     f"Contract method {message.callable} not found in ABI of contract {type(contract)}"
                 )
-
-            default_method_call = contract.default_method_call
-            return default_method_call(  # type: ignore
-                api,
-                message.contract_address,
-                snake_to_camel(message.callable),
-                **message.kwargs.body,
+            return CallPlan(
+                method=None, abi_name=snake_to_camel(message.callable)
             )
 
         full_args_spec = inspect.getfullargspec(method_to_call)
@@ -399,7 +556,7 @@ class ContractApiRequestDispatcher(RequestDispatcher):
                     raise AEAException(
                         f"Missing required argument `{arg}` in {method_to_call}"
                     )
-            return method_to_call(api, message.contract_address, **message.kwargs.body)
+            return CallPlan(method=method_to_call, with_address=True)
         if message.performative in [
             ContractApiMessage.Performative.GET_DEPLOY_TRANSACTION,
         ]:
@@ -411,7 +568,41 @@ class ContractApiRequestDispatcher(RequestDispatcher):
                 raise AEAException(
                     f"Missing required argument `ledger_api` in {method_to_call}"
                 )
-            return method_to_call(api, **message.kwargs.body)
+            return CallPlan(method=method_to_call)
         raise AEAException(  # pragma: nocover
             f"Unexpected performative: {message.performative}"
         )
+
+    @staticmethod
+    def _call_plan(
+        api: LedgerApi,
+        message: ContractApiMessage,
+        contract: Contract,
+        plan: CallPlan,
+        contract_instance: Optional[Any] = None,
+    ) -> Union[bytes, JSONLike]:
+        """
+        Call a validated Contract callable.
+
+        :param api: the ledger api object.
+        :param message: the contract api request.
+        :param contract: the contract instance.
+        :param plan: the plan to call the method.
+        :param contract_instance: the ledger instance of the contract, to call ABI methods on directly.
+        :return: the data generated by the method.
+        """
+        if plan.method is None:
+            if contract_instance is not None:
+                return api.contract_method_call(
+                    contract_instance, plan.abi_name, **message.kwargs.body
+                )
+            default_method_call = contract.default_method_call
+            return default_method_call(  # type: ignore
+                api,
+                message.contract_address,
+                plan.abi_name,
+                **message.kwargs.body,
+            )
+        if plan.with_address:
+            return plan.method(api, message.contract_address, **message.kwargs.body)
+        return plan.method(api, **message.kwargs.body)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""This module contains the garbage collection of the dialogues no longer needed."""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple, cast
+
+from aea.protocols.base import Address, Message
+from aea.protocols.dialogue.base import Dialogue, DialogueLabel, Dialogues
+
+DEFAULT_MAX_AGE = 3600.0
+DEFAULT_TERMINAL_MAX_AGE = 60.0
+DEFAULT_MAX_DIALOGUES = 10_000
+DEFAULT_COLLECT_INTERVAL = 10.0
+COLLECTION_ARGS = (
+    "max_age",
+    "terminal_max_age",
+    "max_dialogues",
+    "collect_interval",
+    "clock",
+)
+
+
+class EvictionReason:  # pylint: disable=too-few-public-methods
+    """The reasons for evicting a dialogue."""
+
+    TERMINAL = "terminal"
+    IDLE = "idle"
+    CAPACITY = "capacity"
+
+
+@dataclass
+class DialogueStoreStats:
+    """The size of a dialogue store, and the dialogues evicted from it."""
+
+    size: int
+    active: int
+    terminal: int
+    evicted: Dict[str, int] = field(default_factory=dict)
+
+
+def _has_ended(dialogue: Dialogue) -> bool:
+    """Check whether the last message of a dialogue put it in a terminal state."""
+    last_message = dialogue.last_message
+    return (
+        last_message is not None
+        and last_message.performative in dialogue.rules.terminal_performatives
+    )
+
+
+def pop_collection_args(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Take the arguments of the dialogue collection out of the keyword arguments of a dialogues class.
+
+    :param kwargs: the keyword arguments, changed in place
+    :return: the arguments of the collection
+    """
+    return {name: kwargs.pop(name) for name in COLLECTION_ARGS if name in kwargs}
+
+
+class DialogueCollector:  # pylint: disable=too-many-instance-attributes
+    """
+    Evict the dialogues that a dialogues class no longer needs.
+
+    A dialogue is forgotten by its dialogues class once it reaches a terminal state,
+    unless terminal dialogues are kept; in that case it is evicted `terminal_max_age`
+    seconds later. A dialogue that never ends, e.g. because its counterparty never
+    replied, is evicted once it has been idle for `max_age` seconds. On top of that,
+    the store is capped at `max_dialogues`: the oldest terminal dialogues go first,
+    then the ones idle for longest. Messages of an evicted dialogue no longer match it.
+    """
+
+    def __init__(
+        self,
+        dialogues: Dialogues,
+        max_age: Optional[float] = DEFAULT_MAX_AGE,
+        terminal_max_age: float = DEFAULT_TERMINAL_MAX_AGE,
+        max_dialogues: Optional[int] = DEFAULT_MAX_DIALOGUES,
+        collect_interval: float = DEFAULT_COLLECT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the collector.
+
+        :param dialogues: the dialogues to collect.
+        :param max_age: the time a dialogue that has not ended is kept after its last message, in seconds,
+            forever if None.
+        :param terminal_max_age: the time a kept terminal dialogue is kept after it ended, in seconds.
+        :param max_dialogues: the maximum number of dialogues kept, unbounded if None.
+        :param collect_interval: the minimum time between two collections, in seconds.
+        :param clock: the clock of the dialogues, in seconds.
+        """
+        self.dialogues = dialogues
+        self.max_age = max_age
+        self.terminal_max_age = terminal_max_age
+        self.max_dialogues = max_dialogues
+        self.collect_interval = collect_interval
+        self._clock = clock
+        # incomplete label -> (time of the last message, dialogue), least recently seen first
+        self._active: "OrderedDict[DialogueLabel, Tuple[float, Dialogue]]" = OrderedDict()
+        # incomplete label -> (time the dialogue ended, dialogue), for kept terminal dialogues
+        self._terminal: "OrderedDict[DialogueLabel, Tuple[float, Dialogue]]" = OrderedDict()
+        self._collected_at = clock()
+        self.evicted: Dict[str, int] = {
+            EvictionReason.TERMINAL: 0,
+            EvictionReason.IDLE: 0,
+            EvictionReason.CAPACITY: 0,
+        }
+
+    @property
+    def size(self) -> int:
+        """Get the number of dialogues in the store."""
+        return len(self._active) + len(self._terminal)
+
+    def seen(self, dialogue: Dialogue) -> None:
+        """
+        Record that a message of a dialogue was sent or received.
+
+        :param dialogue: the dialogue.
+        """
+        label = dialogue.incomplete_dialogue_label
+        if label in self._terminal:
+            return
+        now = self._clock()
+        if _has_ended(dialogue):
+            # ended with its first message, before the terminal state callback was added
+            self._active.pop(label, None)
+            if self._keeps_terminal:
+                self._terminal[label] = (now, dialogue)
+        elif label in self._active:
+            self._active.move_to_end(label)
+            self._active[label] = (now, dialogue)
+        else:
+            dialogue.add_terminal_state_callback(self._ended)
+            self._active[label] = (now, dialogue)
+        if (
+            now - self._collected_at >= self.collect_interval
+            or self.max_dialogues is not None
+            and self.size > self.max_dialogues
+        ):
+            self.collect(now)
+
+    def _ended(self, dialogue: Dialogue) -> None:
+        """Stop tracking a dialogue that reached a terminal state, unless its dialogues class keeps it."""
+        label = dialogue.incomplete_dialogue_label
+        if self._active.pop(label, None) is None:
+            return
+        if self._keeps_terminal:
+            self._terminal[label] = (self._clock(), dialogue)
+
+    @property
+    def _keeps_terminal(self) -> bool:
+        """Check whether the dialogues class keeps the dialogues that reached a terminal state."""
+        return self.dialogues.is_keep_dialogues_in_terminal_state
+
+    def collect(self, now: Optional[float] = None) -> int:
+        """
+        Evict the expired dialogues, then the oldest ones over capacity.
+
+        :param now: the current time, that of the clock if None.
+        :return: the number of dialogues evicted.
+        """
+        now = self._clock() if now is None else now
+        self._collected_at = now
+        evicted = self._evict_expired(
+            self._terminal, now - self.terminal_max_age, EvictionReason.TERMINAL
+        )
+        if self.max_age is not None:
+            evicted += self._evict_expired(
+                self._active, now - self.max_age, EvictionReason.IDLE
+            )
+        if self.max_dialogues is not None:
+            while self.size > self.max_dialogues:
+                store = self._terminal or self._active
+                _, (_, dialogue) = store.popitem(last=False)
+                self._evict(dialogue, EvictionReason.CAPACITY)
+                evicted += 1
+        return evicted
+
+    def _evict_expired(
+        self,
+        store: "OrderedDict[DialogueLabel, Tuple[float, Dialogue]]",
+        cutoff: float,
+        reason: str,
+    ) -> int:
+        """Evict the dialogues of a store last seen before a cutoff time."""
+        evicted = 0
+        while store:
+            label, (seen_at, dialogue) = next(iter(store.items()))
+            if seen_at > cutoff:
+                break
+            del store[label]
+            self._evict(dialogue, reason)
+            evicted += 1
+        return evicted
+
+    def _evict(self, dialogue: Dialogue, reason: str) -> None:
+        """Remove a dialogue from the storage of its dialogues class."""
+        storage = self.dialogues._dialogues_storage  # pylint: disable=protected-access
+        try:
+            storage.remove(dialogue.dialogue_label)
+        except (KeyError, ValueError):  # pragma: nocover
+            # already removed by its dialogues class
+            return
+        self.evicted[reason] += 1
+
+    def clear(self) -> None:
+        """Stop tracking every dialogue, once the dialogues class has forgotten them."""
+        self._active.clear()
+        self._terminal.clear()
+
+    def stats(self) -> DialogueStoreStats:
+        """Get the size of the store and the number of dialogues evicted, per reason."""
+        return DialogueStoreStats(
+            size=self.size,
+            active=len(self._active),
+            terminal=len(self._terminal),
+            evicted=dict(self.evicted),
+        )
+
+
+class CollectedDialogues:
+    """
+    Mix garbage collection into a dialogues class.
+
+    The mixin goes before the dialogues class in the bases, and `init_collection`
+    is called once the dialogues class is initialized. Every dialogue created or
+    updated is then tracked by a `DialogueCollector`.
+    """
+
+    _collector: DialogueCollector
+
+    def init_collection(self, **kwargs: Any) -> None:
+        """
+        Start collecting the dialogues.
+
+        :param kwargs: the arguments of the `DialogueCollector`.
+        """
+        self._collector = DialogueCollector(cast(Dialogues, self), **kwargs)
+
+    @property
+    def collector(self) -> DialogueCollector:
+        """Get the collector of the dialogues."""
+        return self._collector
+
+    def create(
+        self, counterparty: Address, performative: Message.Performative, **kwargs: Any
+    ) -> Tuple[Message, Dialogue]:
+        """
+        Create a dialogue with a first message, and track it.
+
+        :param counterparty: the other agent.
+        :param performative: the performative of the first message.
+        :param kwargs: the content of the first message.
+        :return: the first message and the dialogue.
+        """
+        message, dialogue = super().create(  # type: ignore  # pylint: disable=no-member
+            counterparty, performative, **kwargs
+        )
+        self._collector.seen(dialogue)
+        return message, dialogue
+
+    def cleanup(self) -> None:
+        """Clean up the dialogues, and stop tracking them."""
+        super().cleanup()  # type: ignore  # pylint: disable=no-member
+        self._collector.clear()
+
+    def update(self, message: Message) -> Optional[Dialogue]:
+        """
+        Update a dialogue with a message, and track it.
+
+        :param message: the message.
+        :return: the dialogue, or None if the message matches none.
+        """
+        dialogue = super().update(message)  # type: ignore  # pylint: disable=no-member
+        if dialogue is not None:
+            self._collector.seen(dialogue)
+        return dialogue
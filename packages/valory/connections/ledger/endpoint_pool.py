@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the pools of RPC endpoints of the ledgers."""
+import json
+import threading
+from contextvars import copy_context
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+CHAINS_JSON = Path(__file__).parent / "chains.json"
+
+DEFAULT_EWMA_ALPHA = 0.3
+DEFAULT_HEDGE_AFTER = 0.5
+DEFAULT_MAX_FAILURES = 3
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_MAX_ENDPOINTS = 3
+HEDGE_WORKERS = 8
+# the expected time of an endpoint failing every call, in seconds
+MAX_SCORE = 1e6
+
+Post = Callable[[str, bytes], bytes]
+# wait until an endpoint may be called
+Acquire = Callable[[str], Any]
+
+HEALTH_CHECK = json.dumps(
+    {"jsonrpc": "2.0", "id": 0, "method": "eth_chainId", "params": []}
+).encode()
+
+
+@dataclass
+class EndpointStats:
+    """The observed behaviour of an endpoint."""
+
+    uri: str
+    # moving average of the latency of successful calls, in seconds
+    latency: Optional[float] = None
+    # moving average of the share of failed calls
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    down_until: float = 0.0
+    # the endpoint serves another chain, and is never used
+    wrong_chain: bool = False
+
+    @property
+    def score(self) -> float:
+        """Get the expected time to a successful call, in seconds; unknown endpoints come first."""
+        if self.error_rate >= 1.0:
+            return MAX_SCORE
+        return (self.latency or 0.0) / (1.0 - self.error_rate)
+
+
+class EndpointPool:  # pylint: disable=too-many-instance-attributes
+    """
+    Route the calls of a ledger to the best of several RPC endpoints.
+
+    Endpoints are ranked by their moving-average latency, inflated by their error
+    rate. A call goes to the best endpoint and fails over to the next ones in turn. A
+    read that the best endpoint has not answered within `hedge_after` seconds, or
+    twice its usual latency if longer, is also sent to the next endpoint, and the
+    first answer wins. An endpoint failing `max_failures` calls in a row is left out
+    for `cooldown` seconds, and an extra endpoint answering for another chain for good.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        uris: Iterable[str],
+        post: Post,
+        chain_id: Optional[int] = None,
+        ewma_alpha: float = DEFAULT_EWMA_ALPHA,
+        hedge_after: float = DEFAULT_HEDGE_AFTER,
+        max_failures: int = DEFAULT_MAX_FAILURES,
+        cooldown: float = DEFAULT_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+        acquire: Optional[Acquire] = None,
+    ) -> None:
+        """
+        Initialize the pool.
+
+        :param name: the ledger id.
+        :param uris: the endpoints, the preferred one first.
+        :param post: post a body to an endpoint and return the body of the response; raise if the call failed.
+        :param chain_id: the chain id the endpoints must serve, not checked if None.
+        :param ewma_alpha: the weight of the latest call in the moving averages.
+        :param hedge_after: the minimum time before a read is sent to a second endpoint, in seconds.
+        :param max_failures: the failures in a row after which an endpoint is left out.
+        :param cooldown: how long a failing endpoint is left out, in seconds.
+        :param clock: the clock measuring latencies, in seconds.
+        :param acquire: wait for the rate limit of an endpoint, outside of its measured latency; raise to skip it.
+        """
+        self.name = name
+        self.endpoints = [EndpointStats(uri) for uri in dict.fromkeys(uris)]
+        self._post = post
+        self.chain_id = chain_id
+        self.ewma_alpha = ewma_alpha
+        self.hedge_after = hedge_after
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._acquire = acquire
+        self._lock = threading.Lock()
+        self._hedges: Optional[ThreadPoolExecutor] = None
+        self.hedged = 0
+
+    def ranked(self) -> List[EndpointStats]:
+        """Get the usable endpoints, best first; those left out come last, soonest back first."""
+        now = self._clock()
+        with self._lock:
+            usable = [e for e in self.endpoints if not e.wrong_chain]
+            up = sorted((e for e in usable if e.down_until <= now), key=lambda e: e.score)
+            down = sorted((e for e in usable if e.down_until > now), key=lambda e: e.down_until)
+        return up + down
+
+    def record(self, endpoint: EndpointStats, latency: float, ok: bool) -> None:
+        """
+        Record the outcome of a call.
+
+        :param endpoint: the endpoint called.
+        :param latency: the duration of the call, in seconds.
+        :param ok: whether the call succeeded.
+        """
+        alpha = self.ewma_alpha
+        with self._lock:
+            endpoint.error_rate = (1 - alpha) * endpoint.error_rate + alpha * (0.0 if ok else 1.0)
+            if not ok:
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.max_failures:
+                    endpoint.down_until = self._clock() + self.cooldown
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.down_until = 0.0
+            endpoint.latency = (
+                latency
+                if endpoint.latency is None
+                else (1 - alpha) * endpoint.latency + alpha * latency
+            )
+
+    def post(self, data: bytes, hedge: bool = False) -> bytes:
+        """
+        Post a body to the best endpoint.
+
+        :param data: the JSON-RPC body.
+        :param hedge: whether the call is a read, which may be sent to a second endpoint if slow.
+        :return: the body of the response.
+        """
+        candidates = self.ranked()
+        if not candidates:
+            raise ValueError(f"No usable endpoint for {self.name}.")
+        if hedge and len(candidates) > 1:
+            return self._post_hedged(data, candidates)
+        return self._post_in_turn(data, candidates)
+
+    def _call(self, endpoint: EndpointStats, data: bytes) -> bytes:
+        """Post to an endpoint and record the outcome."""
+        if self._acquire is not None:
+            # waiting for a call slot is local queueing, neither latency nor failure of the endpoint
+            self._acquire(endpoint.uri)
+        began = self._clock()
+        try:
+            response = self._post(endpoint.uri, data)
+        except Exception:
+            self.record(endpoint, self._clock() - began, ok=False)
+            raise
+        self.record(endpoint, self._clock() - began, ok=True)
+        return response
+
+    def _post_in_turn(self, data: bytes, candidates: List[EndpointStats]) -> bytes:
+        """Post to the endpoints in turn until one answers."""
+        error: Optional[Exception] = None
+        for endpoint in candidates:
+            try:
+                return self._call(endpoint, data)
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+        raise error  # type: ignore
+
+    def _post_hedged(self, data: bytes, candidates: List[EndpointStats]) -> bytes:
+        """Post to the best endpoint, and to the next one too if the best is slow."""
+        primary, secondary = candidates[0], candidates[1]
+        hedge_after = max(self.hedge_after, 2 * (primary.latency or 0.0))
+        # the calls run in the context of the caller, which holds the priority of its request
+        first = self._hedge_executor().submit(
+            copy_context().run, self._call, primary, data
+        )
+        done, _ = wait([first], timeout=hedge_after)
+        if done and first.exception() is None:
+            return first.result()
+        if done:
+            return self._post_in_turn(data, candidates[1:])
+        with self._lock:
+            self.hedged += 1
+        pending = {
+            first,
+            self._hedge_executor().submit(
+                copy_context().run, self._call, secondary, data
+            ),
+        }
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+        if len(candidates) > 2:
+            return self._post_in_turn(data, candidates[2:])
+        raise error  # type: ignore
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        """Get the threads running the calls of hedged reads."""
+        with self._lock:
+            if self._hedges is None:
+                self._hedges = ThreadPoolExecutor(
+                    HEDGE_WORKERS, thread_name_prefix=f"rpc-{self.name}"
+                )
+            return self._hedges
+
+    def check_health(self) -> None:
+        """Probe every endpoint for its chain id, recording the outcome."""
+        for index, endpoint in enumerate(list(self.endpoints)):
+            if endpoint.wrong_chain:
+                continue
+            try:
+                response = json.loads(self._call(endpoint, HEALTH_CHECK))
+                chain_id = int(response["result"], 16)
+            except Exception:  # pylint: disable=broad-except
+                continue
+            # the configured address is trusted to serve the configured chain
+            if index > 0 and self.chain_id is not None and chain_id != self.chain_id:
+                with self._lock:
+                    endpoint.wrong_chain = True
+
+    def shutdown(self) -> None:
+        """Stop the threads of the hedged reads."""
+        if self._hedges is not None:
+            self._hedges.shutdown(wait=False)
+
+
+class EndpointPools:
+    """The endpoint pools of the ledgers of the connection."""
+
+    def __init__(self, endpoints: Dict[str, List[str]], **pool_kwargs: Any) -> None:
+        """
+        Initialize the pools.
+
+        :param endpoints: the endpoints of each ledger, besides its configured address.
+        :param pool_kwargs: the keyword arguments of every pool.
+        """
+        self.endpoints = endpoints
+        self.pool_kwargs = pool_kwargs
+        self._pools: Dict[str, EndpointPool] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        ledger_id: str,
+        address: str,
+        post: Post,
+        chain_id: Optional[int] = None,
+        acquire: Optional[Acquire] = None,
+    ) -> EndpointPool:
+        """
+        Get the pool of a ledger, making it on first use or when its address changes.
+
+        :param ledger_id: the ledger id.
+        :param address: the configured address of the ledger, preferred over the others.
+        :param post: post a body to an endpoint and return the body of the response.
+        :param chain_id: the chain id the endpoints must serve.
+        :param acquire: wait for the rate limit of an endpoint before calling it.
+        :return: the pool.
+        """
+        with self._lock:
+            pool = self._pools.get(ledger_id)
+            if pool is None or pool.endpoints[0].uri != address:
+                if pool is not None:
+                    pool.shutdown()
+                pool = self._pools[ledger_id] = EndpointPool(
+                    ledger_id,
+                    [address, *self.endpoints.get(ledger_id, [])],
+                    post,
+                    chain_id=chain_id,
+                    acquire=acquire,
+                    **self.pool_kwargs,
+                )
+            return pool
+
+    def pools(self) -> List[EndpointPool]:
+        """Get the pools made so far."""
+        with self._lock:
+            return list(self._pools.values())
+
+    def check_health(self) -> None:
+        """Probe the endpoints of every pool."""
+        for pool in self.pools():
+            pool.check_health()
+
+    def stats(self) -> Dict[str, List[EndpointStats]]:
+        """Get the ranked endpoints of every pool."""
+        return {pool.name: pool.ranked() for pool in self.pools()}
+
+    def shutdown(self) -> None:
+        """Stop the threads of every pool."""
+        for pool in self.pools():
+            pool.shutdown()
+
+
+def load_chain_endpoints(
+    chain_ids: Dict[str, Any],
+    max_endpoints: int = DEFAULT_MAX_ENDPOINTS,
+    path: Path = CHAINS_JSON,
+) -> Dict[str, List[str]]:
+    """
+    Get public HTTP endpoints of the ledgers from `chains.json`.
+
+    Endpoints needing an API key, or served from the local host, are skipped.
+
+    :param chain_ids: the chain id of each ledger.
+    :param max_endpoints: the maximum number of endpoints per ledger.
+    :param path: the path of `chains.json`.
+    :return: the endpoints of each ledger found.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        chains = {chain["chainId"]: chain for chain in json.load(f)}
+    endpoints = {}
+    for ledger_id, chain_id in chain_ids.items():
+        chain = chains.get(chain_id)
+        if chain is None:
+            continue
+        uris = [
+            uri
+            for uri in chain.get("rpc", [])
+            if uri.startswith("https://")
+            and "${" not in uri
+            and "localhost" not in uri
+            and "127.0.0.1" not in uri
+        ]
+        if uris:
+            endpoints[ledger_id] = uris[:max_endpoints]
+    return endpoints
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the per-ledger executor pools of the ledger API connection."""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+DEFAULT_EXECUTOR_CONFIG: Dict[str, Any] = {
+    "max_workers": 8,
+    "max_in_flight": 8,
+    "max_queued": 64,
+    "max_queue_wait": 30.0,
+}
+
+
+class LedgerOverloaded(Exception):
+    """A request was shed because its ledger cannot take more work."""
+
+
+@dataclass(frozen=True)
+class LedgerPoolStats:
+    """A snapshot of the load of a ledger executor pool."""
+
+    workers: int
+    in_flight: int
+    queued: int
+    requests: int
+    shed: int
+    # time spent waiting for a slot, in seconds
+    queue_wait_total: float
+    queue_wait_max: float
+
+    @property
+    def queue_wait_mean(self) -> float:
+        """Get the mean time a request waited for a slot, in seconds."""
+        return self.queue_wait_total / self.requests if self.requests else 0.0
+
+
+class LedgerPool:  # pylint: disable=too-many-instance-attributes
+    """
+    Run the blocking calls of one ledger on its own threads.
+
+    At most `max_in_flight` calls of the ledger run at once; a call is counted until
+    its thread returns, even if the caller gave up on it. Further calls wait for a slot
+    in arrival order, and are shed with `LedgerOverloaded` once `max_queued` calls are
+    waiting or a call has waited `max_queue_wait` seconds. A slow ledger thus only
+    holds its own threads, and callers learn quickly that it is overloaded.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        ledger_id: str,
+        loop: asyncio.AbstractEventLoop,
+        max_workers: int,
+        max_in_flight: int,
+        max_queued: int,
+        max_queue_wait: Optional[float],
+    ) -> None:
+        """
+        Initialize the pool.
+
+        :param ledger_id: the ledger id.
+        :param loop: the event loop of the connection.
+        :param max_workers: the number of threads of the ledger.
+        :param max_in_flight: the maximum number of calls running at once.
+        :param max_queued: the maximum number of calls waiting for a slot.
+        :param max_queue_wait: the maximum time a call waits for a slot, in seconds, unbounded if None.
+        """
+        self.ledger_id = ledger_id
+        self.loop = loop
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_queue_wait = max_queue_wait
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=f"ledger-{ledger_id}"
+        )
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.requests = 0
+        self.shed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        """Get the number of calls waiting for a slot."""
+        return len(self._waiters)
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Run a blocking callable on a thread of the ledger.
+
+        :param func: the callable.
+        :param args: the arguments of the callable.
+        :return: the return value of the callable.
+        """
+        await self._acquire()
+        try:
+            future = self.executor.submit(func, *args)
+        except RuntimeError:
+            self._release()
+            raise
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future, loop=self.loop)
+
+    def _on_done(self, _: Any) -> None:
+        """Free the slot of a call once its thread returns."""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._release)
+
+    async def _acquire(self) -> None:
+        """Wait for a slot, or shed the call."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._record(0.0)
+            return
+        if self.queued >= self.max_queued:
+            self.shed += 1
+            raise LedgerOverloaded(
+                f"Ledger {self.ledger_id} overloaded: {self.queued} calls queued."
+            )
+        waiter = self.loop.create_future()
+        self._waiters.append(waiter)
+        began = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.shed += 1
+                raise LedgerOverloaded(  # pylint: disable=raise-missing-from
+                    f"Ledger {self.ledger_id} overloaded: no slot within {self.max_queue_wait}s."
+                )
+            # the slot was handed over as the wait timed out
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # the slot was handed over as the caller was cancelled
+                self._release()
+            raise
+        self._record(time.monotonic() - began)
+
+    def _release(self) -> None:
+        """Hand a slot over to the next waiting call, or free it."""
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+            return
+        self.in_flight -= 1
+
+    def _record(self, queue_wait: float) -> None:
+        """Record the time a call waited for its slot."""
+        self.requests += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+
+    def stats(self) -> LedgerPoolStats:
+        """Get a snapshot of the load of the pool."""
+        return LedgerPoolStats(
+            workers=self.max_workers,
+            in_flight=self.in_flight,
+            queued=self.queued,
+            requests=self.requests,
+            shed=self.shed,
+            queue_wait_total=self.queue_wait_total,
+            queue_wait_max=self.queue_wait_max,
+        )
+
+    def shutdown(self) -> None:
+        """Stop the threads of the pool, dropping the calls not yet started."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LedgerExecutors:
+    """The executor pools of the ledgers, made on first use."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        configs: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Initialize the executors.
+
+        :param loop: the event loop of the connection.
+        :param configs: the pool configs per ledger id; the `default` entry applies to every ledger not listed.
+        """
+        self.loop = loop
+        self._configs = configs or {}
+        self._pools: Dict[str, LedgerPool] = {}
+
+    def config(self, ledger_id: str) -> Dict[str, Any]:
+        """Get the pool config of a ledger."""
+        return {
+            **DEFAULT_EXECUTOR_CONFIG,
+            **self._configs.get("default", {}),
+            **self._configs.get(ledger_id, {}),
+        }
+
+    def get(self, ledger_id: str) -> LedgerPool:
+        """
+        Get the pool of a ledger.
+
+        :param ledger_id: the ledger id.
+        :return: the pool.
+        """
+        pool = self._pools.get(ledger_id)
+        if pool is None:
+            pool = self._pools[ledger_id] = LedgerPool(
+                ledger_id, self.loop, **self.config(ledger_id)
+            )
+        return pool
+
+    def stats(self) -> Dict[str, LedgerPoolStats]:
+        """Get a snapshot of the load of every ledger."""
+        return {ledger_id: pool.stats() for ledger_id, pool in self._pools.items()}
+
+    def shutdown(self) -> None:
+        """Stop the threads of every ledger."""
+        for pool in self._pools.values():
+            pool.shutdown()
+        self._pools.clear()
@@ -18,10 +18,11 @@
 #
 # ------------------------------------------------------------------------------
 """This module contains the implementation of the ledger API request dispatcher."""
-import asyncio
+import json
 import logging
-from typing import Any, cast
+from typing import Any, Dict, Hashable, Optional, cast
 
+from aea.common import JSONLike
 from aea.connections.base import ConnectionStates
 from aea.crypto.base import LedgerApi
 from aea.helpers.transaction.base import RawTransaction, State, TransactionDigest
@@ -29,6 +30,18 @@ from aea.protocols.base import Address, Message
 from aea.protocols.dialogue.base import Dialogue as BaseDialogue
 from aea.protocols.dialogue.base import Dialogues as BaseDialogues
 from packages.valory.connections.ledger.base import RequestDispatcher
+from packages.valory.connections.ledger.block_tracker import BlockTracker
+from packages.valory.connections.ledger.circuit_breaker import record_error
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    pop_collection_args,
+)
+from packages.valory.connections.ledger.rate_limits import Priority
+from packages.valory.connections.ledger.receipt_watcher import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_POLL_INTERVAL,
+    ReceiptWatcher,
+)
 from packages.valory.protocols.ledger_api.custom_types import (
     TransactionDigests,
     TransactionReceipt,
@@ -45,7 +58,7 @@ _default_logger = logging.getLogger(
 
 import traceback
 
-class LedgerApiDialogues(BaseLedgerApiDialogues):
+class LedgerApiDialogues(CollectedDialogues, BaseLedgerApiDialogues):
     """The dialogues class keeps track of all dialogues."""
 
     def __init__(self, **kwargs: Any) -> None:
@@ -67,12 +80,14 @@ class LedgerApiDialogues(BaseLedgerApiDialogues):
             # The ledger connection maintains the dialogue on behalf of the ledger
             return LedgerApiDialogue.Role.LEDGER
 
+        collection = pop_collection_args(kwargs)
         BaseLedgerApiDialogues.__init__(
             self,
             self_address=str(kwargs.pop("connection_id")),
             role_from_first_message=role_from_first_message,
             **kwargs,
         )
+        self.init_collection(**collection)
 
 
 class LedgerApiRequestDispatcher(RequestDispatcher):
@@ -82,9 +97,18 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
         """Initialize the dispatcher."""
         logger = kwargs.pop("logger", None)
         connection_id = kwargs.pop("connection_id")
+        dialogue_gc = kwargs.pop("dialogue_gc", None) or {}
+        self.receipt_poll_interval = kwargs.pop(
+            "receipt_poll_interval", DEFAULT_POLL_INTERVAL
+        )
+        self.fetch_transaction = kwargs.pop("fetch_transaction", True)
+        self.block_tracker: Optional[BlockTracker] = kwargs.pop("block_tracker", None)
         logger = logger if logger is not None else _default_logger
         super().__init__(logger, *args, **kwargs)
-        self._ledger_api_dialogues = LedgerApiDialogues(connection_id=connection_id)
+        self._ledger_api_dialogues = LedgerApiDialogues(
+            connection_id=connection_id, **dialogue_gc
+        )
+        self._receipt_watchers: Dict[str, ReceiptWatcher] = {}
 
     def get_ledger_id(self, message: Message) -> str:
         """Get the ledger id from message."""
@@ -112,11 +136,76 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
             ledger_id = message.ledger_id
         return ledger_id
 
+    def get_request_key(self, message: Message) -> Optional[Hashable]:
+        """Get the key of a balance or state read, None for other requests."""
+        message = cast(LedgerApiMessage, message)
+        if message.performative is LedgerApiMessage.Performative.GET_BALANCE:
+            return (message.performative, message.ledger_id, message.address)
+        if message.performative is LedgerApiMessage.Performative.GET_STATE:
+            return (
+                message.performative,
+                message.ledger_id,
+                message.callable,
+                json.dumps(
+                    [message.args, message.kwargs.body], sort_keys=True, default=str
+                ),
+            )
+        return None
+
+    def records_outcome(self, message: Message) -> bool:
+        """Check whether the outcome of a request tells the health of its ledger; receipt waits last until mined."""
+        return (
+            cast(LedgerApiMessage, message).performative
+            is not LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT
+        )
+
+    def get_priority(self, message: Message) -> int:
+        """Get the priority of a request, submissions first and reads last."""
+        performative = cast(LedgerApiMessage, message).performative
+        if performative in (
+            LedgerApiMessage.Performative.SEND_SIGNED_TRANSACTION,
+            LedgerApiMessage.Performative.SEND_SIGNED_TRANSACTIONS,
+        ):
+            return Priority.SUBMIT
+        if performative in (
+            LedgerApiMessage.Performative.GET_RAW_TRANSACTION,
+            LedgerApiMessage.Performative.GET_TRANSACTION_RECEIPT,
+        ):
+            return Priority.BUILD
+        return Priority.READ
+
     @property
     def dialogues(self) -> BaseDialogues:
         """Get the dialogues."""
         return self._ledger_api_dialogues
 
+    def get_receipt_watcher(self, ledger_id: str) -> ReceiptWatcher:
+        """
+        Get the receipt watcher of a ledger, making it on first use.
+
+        :param ledger_id: the ledger id.
+        :return: the receipt watcher.
+        """
+        watcher = self._receipt_watchers.get(ledger_id)
+        if watcher is None:
+            concurrency = (
+                DEFAULT_CONCURRENCY
+                if self.executors is None
+                else self.executors.get(ledger_id).max_in_flight
+            )
+            watcher = self._receipt_watchers[ledger_id] = ReceiptWatcher(
+                ledger_id,
+                self.loop,
+                run=lambda func, *args: self.run_in_executor(ledger_id, func, *args),
+                is_running=lambda: self.connection_state.get()
+                == ConnectionStates.connected,
+                logger=self.logger,
+                poll_interval=self.receipt_poll_interval,
+                concurrency=concurrency,
+                block_tracker=self.block_tracker,
+            )
+        return watcher
+
     def get_balance(
         self,
         api: LedgerApi,
@@ -264,57 +353,30 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
             if message.retry_timeout is None
             else message.retry_timeout
         )
+        ledger_id = message.transaction_digest.ledger_id
+        digest = message.transaction_digest.body
 
-        transaction_receipt = None
-        is_settled = False
-        attempts = 0
-        while (
-            not is_settled
-            and attempts < retry_attempts
-            and self.connection_state.get() == ConnectionStates.connected
-        ):
-            try:
-                transaction_receipt = await self.wait_for(
-                    lambda: api.get_transaction_receipt(
-                        message.transaction_digest.body,
-                        raise_on_try=True,
-                    ),
-                    timeout=retry_timeout,
-                )
-            except Exception as e:  # pylint: disable=broad-except
-                self.logger.warning(e)
-                transaction_receipt = None
-
-            if transaction_receipt is not None:
-                is_settled = api.is_transaction_settled(transaction_receipt)
-            attempts += 1
-            await asyncio.sleep(retry_timeout * attempts)
+        transaction_receipt = await self.get_receipt_watcher(ledger_id).wait(
+            api, digest, timeout=retry_attempts * retry_timeout
+        )
+        is_settled = transaction_receipt is not None and api.is_transaction_settled(
+            transaction_receipt
+        )
         self.logger.debug(
             f"Transaction receipt: {transaction_receipt}, settled: {is_settled}"
         )
 
-        attempts = 0
-        transaction = None
-        while (
-            transaction is None
-            and attempts < retry_attempts
-            and self.connection_state.get() == ConnectionStates.connected
-        ):
+        transaction: Optional[JSONLike] = {}
+        if is_settled and self.fetch_transaction:
             try:
                 transaction = await self.wait_for(
-                    lambda: api.get_transaction(
-                        message.transaction_digest.body,
-                        raise_on_try=True,
-                    ),
+                    lambda: api.get_transaction(digest, raise_on_try=True),
                     timeout=retry_timeout,
                 )
             except Exception as e:  # pylint: disable=broad-except
                 self.logger.warning(e)
                 transaction = None
-
-            attempts += 1
-            await asyncio.sleep(retry_timeout * attempts)
-        self.logger.debug(f"Transaction: {transaction}")
+            self.logger.debug(f"Transaction: {transaction}")
 
         if not is_settled:
             response = self.get_error_message(
@@ -338,7 +400,7 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
                     performative=LedgerApiMessage.Performative.TRANSACTION_RECEIPT,
                     target_message=message,
                     transaction_receipt=TransactionReceipt(
-                        message.transaction_digest.ledger_id,
+                        ledger_id,
                         transaction_receipt,
                         transaction,
                     ),
@@ -440,6 +502,7 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
         :param dialogue: the Ledger API dialogue.
         :return: an error message response.
         """
+        record_error(exception)
         message = cast(LedgerApiMessage, message)
         dialogue = cast(LedgerApiDialogue, dialogue)
         response = cast(
@@ -447,9 +510,9 @@ class LedgerApiRequestDispatcher(RequestDispatcher):
             dialogue.reply(
                 performative=LedgerApiMessage.Performative.ERROR,
                 target_message=message,
-                code=500,
+                code=getattr(exception, "code", 500),
                 message=str(exception),
-                data=b"",
+                data=getattr(exception, "data", b""),
             ),
         )
         return response
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains a bounded, thread-safe LRU cache."""
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LRUCache(Generic[T]):
+    """A mapping keeping at most `max_size` values, dropping the least recently used; nothing is kept if 0."""
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Initialize the cache.
+
+        :param max_size: the maximum number of values kept.
+        """
+        self.max_size = max_size
+        self._values: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Get a value, or None if not kept."""
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: T) -> None:
+        """Keep a value."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def get_or_make(self, key: Hashable, make: Callable[[], T]) -> T:
+        """
+        Get a value, making and keeping it if not kept.
+
+        :param key: the key of the value.
+        :param make: make the value; it is not kept if it raises.
+        :return: the value.
+        """
+        value = self.get(key)
+        if value is None:
+            value = make()
+            self.put(key, value)
+        return value
+
+    def __len__(self) -> int:
+        """Get the number of values kept."""
+        return len(self._values)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the web3 HTTP provider of the EVM ledgers of the connection."""
+import functools
+import json
+from typing import Any, Optional
+
+from aea.crypto.base import LedgerApi
+from web3 import HTTPProvider
+from web3._utils.request import make_post_request
+from web3.types import RPCEndpoint, RPCResponse
+
+from packages.valory.connections.ledger.batching import BATCHED_METHODS, JsonRpcBatchers
+from packages.valory.connections.ledger.endpoint_pool import (
+    EndpointPool,
+    EndpointPools,
+    Post,
+)
+from packages.valory.connections.ledger.rate_limits import RateLimits
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    An HTTP provider routing its calls through the endpoint pool of its ledger.
+
+    Reads are coalesced with the reads of other threads into JSON-RPC batches, and
+    may be hedged across endpoints; other calls fail over from one endpoint to the next.
+    Every post may wait for the rate limit of its endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        pool: Optional[EndpointPool] = None,
+        batchers: Optional[JsonRpcBatchers] = None,
+        request_kwargs: Optional[Any] = None,
+        post: Optional[Post] = None,
+    ) -> None:
+        """
+        Initialize the provider.
+
+        :param endpoint_uri: the configured endpoint.
+        :param pool: the endpoint pool of the ledger, if any.
+        :param batchers: the batchers of the connection, if reads are batched.
+        :param request_kwargs: the keyword arguments of the HTTP requests.
+        :param post: post a body to an endpoint when there is no pool, a plain HTTP post if None.
+        """
+        super().__init__(endpoint_uri, request_kwargs)
+        self.pool = pool
+        self._post_to = post if post is not None else self._http_post
+        self.batcher = (
+            None
+            if batchers is None
+            else batchers.get(
+                str(self.endpoint_uri) if pool is None else pool.name,
+                lambda data: self._post(data, hedge=True),
+            )
+        )
+
+    def _http_post(self, uri: str, data: bytes) -> bytes:
+        """Post a JSON-RPC body to an endpoint."""
+        return make_post_request(uri, data, **self.get_request_kwargs())
+
+    def _post(self, data: bytes, hedge: bool = False) -> bytes:
+        """Post a JSON-RPC body to the best endpoint."""
+        if self.pool is None:
+            return self._post_to(str(self.endpoint_uri), data)
+        return self.pool.post(data, hedge=hedge)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        """Send a request, as part of a batch if it is a read."""
+        is_read = method in BATCHED_METHODS
+        if is_read and self.batcher is not None:
+            payload = json.loads(self.encode_rpc_request(method, params))
+            return self.batcher.request(payload)  # type: ignore
+        request_data = self.encode_rpc_request(method, params)
+        return self.decode_rpc_response(self._post(request_data, hedge=is_read))
+
+
+def install_provider(
+    api: LedgerApi,
+    ledger_id: str,
+    chain_id: Optional[int] = None,
+    batchers: Optional[JsonRpcBatchers] = None,
+    pools: Optional[EndpointPools] = None,
+    rate_limits: Optional[RateLimits] = None,
+) -> None:
+    """
+    Route the calls of an api through the endpoint pools and batchers of the connection.
+
+    :param api: the ledger api, left as is unless it talks to an HTTP endpoint.
+    :param ledger_id: the ledger id.
+    :param chain_id: the configured chain id of the ledger.
+    :param batchers: the batchers of the connection, if reads are batched.
+    :param pools: the endpoint pools of the connection, if any.
+    :param rate_limits: the rate limits of the endpoints, if any.
+    """
+    web3 = api.api
+    provider = getattr(web3, "provider", None)
+    if type(provider) is not HTTPProvider:  # pylint: disable=unidiomatic-typecheck
+        return
+    post: Post = lambda uri, data: make_post_request(
+        uri, data, **provider.get_request_kwargs()
+    )
+    pool = None
+    if pools is not None:
+        # the pool waits for the rate limit before timing a call, so that the wait is not held against the endpoint
+        pool = pools.get(
+            ledger_id,
+            str(provider.endpoint_uri),
+            post if rate_limits is None else rate_limits.throttled(ledger_id, post),
+            chain_id,
+            acquire=None
+            if rate_limits is None
+            else functools.partial(rate_limits.acquire, ledger_id),
+        )
+    if rate_limits is not None:
+        post = rate_limits.limit(ledger_id, post)
+    web3.provider = PooledHTTPProvider(
+        provider.endpoint_uri,
+        pool,
+        batchers,
+        provider._request_kwargs,  # pylint: disable=protected-access
+        post,
+    )
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the rate limits of the RPC endpoints of the ledgers."""
+import heapq
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from packages.valory.connections.ledger.circuit_breaker import request_outcome
+from packages.valory.connections.ledger.endpoint_pool import Post
+
+DEFAULT_MAX_WAIT = 30.0
+DEFAULT_BACKOFF = 0.5
+DEFAULT_RECOVER_AFTER = 10.0
+# the share of the configured rate recovered every `recover_after` seconds without a 429
+RECOVERY_STEP = 0.1
+# the lowest share of the configured rate a bucket is throttled down to
+MIN_RATE_SHARE = 0.05
+TOO_MANY_REQUESTS = 429
+
+
+class Priority:  # pylint: disable=too-few-public-methods
+    """The priorities of the calls to an endpoint, most urgent first."""
+
+    SUBMIT = 0
+    BUILD = 1
+    READ = 2
+
+
+# the priority of the request being served by the current task or thread
+request_priority: ContextVar[int] = ContextVar("request_priority", default=Priority.READ)
+
+
+class RateLimitExceeded(Exception):
+    """A call waited longer than allowed for the rate limit of its endpoint."""
+
+
+@dataclass
+class BucketStats:
+    """The state of a token bucket."""
+
+    rate: float
+    configured_rate: float
+    waiting: int
+    throttled: int
+    timed_out: int
+
+
+class TokenBucket:  # pylint: disable=too-many-instance-attributes
+    """
+    Let calls through at a steady rate, the most urgent waiting calls first.
+
+    The bucket holds up to `burst` tokens and gains `rate` tokens per second; each call
+    takes one, or waits for one. When the endpoint answers 429 the rate is cut by
+    `backoff`, and it grows back by a tenth of the configured rate for every
+    `recover_after` seconds without another 429.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        backoff: float = DEFAULT_BACKOFF,
+        recover_after: float = DEFAULT_RECOVER_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the bucket.
+
+        :param rate: the calls let through per second.
+        :param burst: the calls let through at once after a quiet period, `rate` if None.
+        :param max_wait: how long a call may wait for a token, in seconds.
+        :param backoff: the factor the rate is cut by on a 429.
+        :param recover_after: how long without a 429 before the rate grows back, in seconds.
+        :param clock: the clock of the bucket, in seconds.
+        """
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self.recover_after = recover_after
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._recovered = self._updated
+        self._condition = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self.throttled = 0
+        self.timed_out = 0
+
+    def _refill(self) -> None:
+        """Add the tokens gained since the last update, and grow the rate back if due."""
+        now = self._clock()
+        if self.rate < self.configured_rate and now - self._recovered >= self.recover_after:
+            self.rate = min(
+                self.configured_rate, self.rate + RECOVERY_STEP * self.configured_rate
+            )
+            self._recovered = now
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = Priority.READ) -> None:
+        """
+        Take a token, waiting behind the more urgent and older calls.
+
+        :param priority: the priority of the call.
+        :raises RateLimitExceeded: if no token was given within `max_wait` seconds.
+        """
+        waiter = (priority, next(self._sequence))
+        deadline = self._clock() + self.max_wait
+        with self._condition:
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == waiter and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise RateLimitExceeded(
+                            f"No call slot within {self.max_wait} seconds."
+                        )
+                    next_token = (1 - self._tokens) / self.rate if self.rate > 0 else remaining
+                    self._condition.wait(min(remaining, max(next_token, 0.001)))
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def throttle(self) -> None:
+        """Cut the rate after the endpoint answered 429."""
+        with self._condition:
+            self._refill()
+            self.rate = max(
+                MIN_RATE_SHARE * self.configured_rate, self.rate * self.backoff
+            )
+            self._recovered = self._clock()
+            self._tokens = min(self._tokens, 0.0)
+            self.throttled += 1
+
+    def stats(self) -> BucketStats:
+        """Get the state of the bucket."""
+        with self._condition:
+            return BucketStats(
+                rate=self.rate,
+                configured_rate=self.configured_rate,
+                waiting=len(self._waiters),
+                throttled=self.throttled,
+                timed_out=self.timed_out,
+            )
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Check whether an error is an HTTP 429 answer."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == TOO_MANY_REQUESTS
+
+
+class RateLimits:
+    """The token buckets of the endpoints of the ledgers of the connection."""
+
+    def __init__(
+        self, buckets: Dict[str, Dict[str, Any]], **bucket_kwargs: Any
+    ) -> None:
+        """
+        Initialize the rate limits.
+
+        :param buckets: the `rate` and `burst` of the buckets, per endpoint, per ledger, or `default`;
+            a `rate` of 0 or null leaves the endpoints unlimited.
+        :param bucket_kwargs: the keyword arguments of every bucket.
+        """
+        self.buckets = buckets
+        self.bucket_kwargs = bucket_kwargs
+        self._buckets: Dict[Tuple[str, str], Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ledger_id: str, uri: str) -> Optional[TokenBucket]:
+        """
+        Get the bucket of an endpoint of a ledger, making it on first use.
+
+        :param ledger_id: the ledger id.
+        :param uri: the endpoint.
+        :return: the bucket, or None if the endpoint is unlimited.
+        """
+        key = (ledger_id, uri)
+        with self._lock:
+            if key not in self._buckets:
+                config = self.buckets.get(
+                    uri, self.buckets.get(ledger_id, self.buckets.get("default", {}))
+                )
+                rate = config.get("rate")
+                self._buckets[key] = (
+                    TokenBucket(rate, config.get("burst"), **self.bucket_kwargs)
+                    if rate
+                    else None
+                )
+            return self._buckets[key]
+
+    def acquire(self, ledger_id: str, uri: str) -> None:
+        """
+        Wait for a token of the bucket of an endpoint, if it has one.
+
+        :param ledger_id: the ledger id.
+        :param uri: the endpoint.
+        :raises RateLimitExceeded: if no token was given within the maximum wait.
+        """
+        bucket = self.get(ledger_id, uri)
+        if bucket is None:
+            return
+        began = time.monotonic()
+        try:
+            bucket.acquire(request_priority.get())
+        finally:
+            outcome = request_outcome.get()
+            if outcome is not None:
+                outcome.wait(time.monotonic() - began)
+
+    def throttled(self, ledger_id: str, post: Post) -> Post:
+        """
+        Make a post function cutting the rate of its endpoint when answered 429.
+
+        :param ledger_id: the ledger id.
+        :param post: post a body to an endpoint and return the body of the response.
+        :return: the post function.
+        """
+
+        def throttled_post(uri: str, data: bytes) -> bytes:
+            try:
+                return post(uri, data)
+            except Exception as e:
+                if is_rate_limited(e):
+                    bucket = self.get(ledger_id, uri)
+                    if bucket is not None:
+                        bucket.throttle()
+                raise
+
+        return throttled_post
+
+    def limit(self, ledger_id: str, post: Post) -> Post:
+        """
+        Make a post function waiting for the bucket of its endpoint.
+
+        :param ledger_id: the ledger id.
+        :param post: post a body to an endpoint and return the body of the response.
+        :return: the rate limited post function.
+        """
+        throttled_post = self.throttled(ledger_id, post)
+
+        def limited_post(uri: str, data: bytes) -> bytes:
+            self.acquire(ledger_id, uri)
+            return throttled_post(uri, data)
+
+        return limited_post
+
+    def stats(self) -> Dict[str, Dict[str, BucketStats]]:
+        """Get the state of the buckets made so far, per ledger and endpoint."""
+        with self._lock:
+            buckets = list(self._buckets.items())
+        stats: Dict[str, Dict[str, BucketStats]] = {}
+        for (ledger_id, uri), bucket in buckets:
+            if bucket is not None:
+                stats.setdefault(ledger_id, {})[uri] = bucket.stats()
+        return stats
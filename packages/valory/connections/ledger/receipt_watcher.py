@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the per-ledger watcher of pending transaction receipts."""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, cast
+
+from aea.common import JSONLike
+from aea.crypto.base import LedgerApi
+
+from packages.valory.connections.ledger.block_tracker import BlockTracker
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_CONCURRENCY = 8
+
+
+class ReceiptWatcher:  # pylint: disable=too-many-instance-attributes
+    """
+    Wait for the receipts of every pending transaction of a ledger from one task.
+
+    The task checks the block height every `poll_interval` seconds and, once per new
+    block, fetches the receipts of all pending transactions, `concurrency` at a time so
+    that the reads can share JSON-RPC batches. Every caller waiting on a transaction is
+    resolved as soon as its receipt is found, settled or not. The task stops once no
+    transaction is pending.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        ledger_id: str,
+        loop: asyncio.AbstractEventLoop,
+        run: Callable[..., Awaitable[Any]],
+        is_running: Callable[[], bool],
+        logger: logging.Logger,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        block_tracker: Optional[BlockTracker] = None,
+    ) -> None:
+        """
+        Initialize the watcher.
+
+        :param ledger_id: the ledger id.
+        :param loop: the event loop of the connection.
+        :param run: run a blocking callable of the ledger and await its result.
+        :param is_running: check whether the connection is still up.
+        :param logger: the logger.
+        :param poll_interval: the time between two checks of the block height, in seconds.
+        :param concurrency: the maximum number of receipts fetched at once.
+        :param block_tracker: the tracker of the block height, shared with other requests.
+        """
+        self.ledger_id = ledger_id
+        self.loop = loop
+        self._api: Optional[LedgerApi] = None
+        self._run = run
+        self._is_running = is_running
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.block_tracker = (
+            block_tracker if block_tracker is not None else BlockTracker(max_age=0.0)
+        )
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Get the number of transactions being watched."""
+        return len(self._waiters)
+
+    async def wait(
+        self, api: LedgerApi, digest: str, timeout: Optional[float]
+    ) -> Optional[JSONLike]:
+        """
+        Wait for the receipt of a transaction.
+
+        :param api: the api of the ledger, used for every pending transaction from now on.
+        :param digest: the transaction digest.
+        :param timeout: the maximum time to wait, in seconds, unbounded if None.
+        :return: the receipt, or None if it was not found in time.
+        """
+        self._api = api
+        future = self.loop.create_future()
+        self._waiters.setdefault(digest, []).append(future)
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._watch())
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(digest, [])
+            if future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[digest]
+
+    async def _watch(self) -> None:
+        """Fetch the pending receipts once per new block, until none is pending."""
+        last_block: Optional[int] = None
+        while self._waiters and self._is_running():
+            try:
+                api = cast(LedgerApi, self._api)
+                block = await self._block_number(api)
+                if block is None or block != last_block:
+                    await self._fetch_receipts(api)
+                    last_block = block
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.warning(f"Receipt watcher of {self.ledger_id} failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _block_number(self, api: LedgerApi) -> Optional[int]:
+        """Get the block height, or None if the ledger does not tell it."""
+        return await self._run(self.block_tracker.latest, self.ledger_id, api)
+
+    async def _fetch_receipts(self, api: LedgerApi) -> None:
+        """Fetch the receipts of the pending transactions and resolve their waiters."""
+        digests = list(self._waiters)
+        for start in range(0, len(digests), self.concurrency):
+            chunk = digests[start : start + self.concurrency]
+            receipts = await asyncio.gather(
+                *(
+                    self._run(api.get_transaction_receipt, digest, True)
+                    for digest in chunk
+                ),
+                return_exceptions=True,
+            )
+            for digest, receipt in zip(chunk, receipts):
+                if isinstance(receipt, Exception):
+                    # not mined yet, or the node failed to answer
+                    self.logger.debug(f"No receipt for {digest} yet: {receipt}")
+                    continue
+                if receipt is None:
+                    continue
+                for future in self._waiters.pop(digest, []):
+                    if not future.done():
+                        future.set_result(receipt)
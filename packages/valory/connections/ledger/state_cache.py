@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""This module contains the response cache of contract state calls."""
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from aea.common import JSONLike
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+@dataclass
+class _Entry:
+    """A cached contract state."""
+
+    value: JSONLike
+    # monotonic time after which the state is stale, if cached for a time
+    expires_at: Optional[float] = None
+    # block the state was read at, if cached for a block
+    block: Optional[int] = None
+
+
+class StateCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Cache the states returned by contract callables.
+
+    States are keyed by ledger, contract, address, callable and keyword arguments, and
+    are only cached for the callables configured: `immutable` ones are kept for good
+    and persisted to `path`, `per_block` ones until a new block is seen, and those with
+    a TTL for that many seconds. The least recently used states are dropped beyond
+    `max_entries`. Hits and misses are counted per callable.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        immutable: Iterable[str] = (),
+        per_block: Iterable[str] = (),
+        ttls: Optional[Dict[str, float]] = None,
+        path: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param immutable: the callables whose state never changes.
+        :param per_block: the callables whose state can only change with a new block.
+        :param ttls: the time the state of a callable is kept for, in seconds.
+        :param path: the file the immutable states are persisted to, not persisted if None.
+        :param max_entries: the maximum number of states kept.
+        :param clock: the clock of the TTLs, in seconds.
+        """
+        self.immutable = frozenset(immutable)
+        self.per_block = frozenset(per_block)
+        self.ttls = dict(ttls or {})
+        self.path = path
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._load()
+
+    @staticmethod
+    def key(  # pylint: disable=too-many-arguments
+        ledger_id: str,
+        contract_id: str,
+        contract_address: Optional[str],
+        callable_name: str,
+        kwargs: Dict[str, Any],
+    ) -> str:
+        """Get the cache key of a contract state call."""
+        return json.dumps(
+            [ledger_id, contract_id, contract_address, callable_name, kwargs],
+            sort_keys=True,
+            default=str,
+        )
+
+    def caches(self, callable_name: str) -> bool:
+        """Check whether the state of a callable is cached."""
+        return (
+            callable_name in self.immutable
+            or callable_name in self.per_block
+            or callable_name in self.ttls
+        )
+
+    def get(
+        self, key: str, callable_name: str, block: Optional[int] = None
+    ) -> Optional[JSONLike]:
+        """
+        Get a cached state.
+
+        :param key: the cache key.
+        :param callable_name: the callable of the state.
+        :param block: the latest block of the ledger, for the callables cached per block.
+        :return: the state, or None if not cached or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, callable_name, block):
+                self._entries.move_to_end(key)
+                self.hits[callable_name] += 1
+                return entry.value
+            self.misses[callable_name] += 1
+            return None
+
+    def _is_fresh(self, entry: _Entry, callable_name: str, block: Optional[int]) -> bool:
+        """Check whether a cached state still holds."""
+        if callable_name in self.immutable:
+            return True
+        if callable_name in self.per_block:
+            return block is not None and entry.block == block
+        return entry.expires_at is not None and self._clock() < entry.expires_at
+
+    def put(
+        self,
+        key: str,
+        callable_name: str,
+        value: JSONLike,
+        block: Optional[int] = None,
+    ) -> None:
+        """
+        Cache a state.
+
+        :param key: the cache key.
+        :param callable_name: the callable of the state.
+        :param value: the state.
+        :param block: the block the state was read at, for the callables cached per block.
+        """
+        if callable_name in self.immutable:
+            entry = _Entry(value)
+        elif callable_name in self.per_block:
+            if block is None:
+                return
+            entry = _Entry(value, block=block)
+        elif callable_name in self.ttls:
+            entry = _Entry(value, expires_at=self._clock() + self.ttls[callable_name])
+        else:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if callable_name in self.immutable:
+                self._save()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Get the hits and misses of every callable."""
+        with self._lock:
+            return {
+                callable_name: {
+                    "hits": self.hits[callable_name],
+                    "misses": self.misses[callable_name],
+                }
+                for callable_name in set(self.hits) | set(self.misses)
+            }
+
+    def _load(self) -> None:
+        """Load the persisted immutable states."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                states = json.load(f)
+        except ValueError:
+            # a corrupt cache is read from the chain again
+            return
+        for key, value in states.items():
+            self._entries[key] = _Entry(value)
+
+    def _save(self) -> None:
+        """Persist the immutable states, replacing the file at once."""
+        if self.path is None:
+            return
+        states = {
+            key: entry.value
+            for key, entry in self._entries.items()
+            if entry.expires_at is None and entry.block is None
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(states, f)
+        os.replace(tmp_path, self.path)
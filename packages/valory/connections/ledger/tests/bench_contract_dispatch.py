@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark the overhead of dispatching contract api requests, with and without the contract caches.
+
+An ERC20 contract package is written to a temporary directory, and its `balance_of`
+requests are served by a local fake JSON-RPC node.
+
+Run with:
+
+    python -m packages.valory.connections.ledger.tests.bench_contract_dispatch --requests 10000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, List, cast
+
+from aea.configurations.base import ComponentType, ContractConfig
+from aea.configurations.loader import load_component_configuration
+from aea.connections.base import ConnectionStates
+from aea.contracts.base import Contract, contract_registry
+from aea.helpers.async_utils import AsyncState
+from aea.mail.base import Envelope
+from aea.protocols.base import Address, Message
+from aea.protocols.dialogue.base import Dialogue as BaseDialogue
+
+from packages.valory.connections.ledger.contract_dispatcher import (
+    ContractApiRequestDispatcher,
+)
+from packages.valory.protocols.contract_api.dialogues import ContractApiDialogue
+from packages.valory.protocols.contract_api.dialogues import (
+    ContractApiDialogues as BaseContractApiDialogues,
+)
+from packages.valory.protocols.contract_api.message import ContractApiMessage
+
+LEDGER_ID = "gnosis"
+TOKEN = "0x" + "1" * 40
+ACCOUNT = "0x" + "2" * 40
+CONNECTION_ID = "valory/ledger:0.19.0"
+SKILL_ID = "eightballer/faucet:0.1.0"
+CONTRACT_ID = "bench/erc20:0.1.0"
+BATCH = 100
+
+CONTRACT_YAML = """name: erc20
+author: bench
+version: 0.1.0
+type: contract
+description: A minimal ERC20 contract package.
+license: Apache-2.0
+aea_version: '>=1.0.0, <2.0.0'
+fingerprint: {}
+fingerprint_ignore_patterns: []
+class_name: ERC20
+contract_interface_paths:
+  ethereum: build/ERC20.json
+dependencies: {}
+contracts: []
+"""
+
+CONTRACT_PY = '''"""A minimal ERC20 contract package."""
+
+from aea.common import JSONLike
+from aea.contracts.base import Contract
+from aea.crypto.base import LedgerApi
+
+
+class ERC20(Contract):
+    """The ERC20 contract."""
+
+    @classmethod
+    def balance_of(
+        cls, ledger_api: LedgerApi, contract_address: str, account: str
+    ) -> JSONLike:
+        """Get the balance of an account."""
+        instance = cls.get_instance(ledger_api, contract_address)
+        return {"balance": instance.functions.balanceOf(account).call()}
+'''
+
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "account", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+
+
+class FakeNodeHandler(BaseHTTPRequestHandler):
+    """Answer JSON-RPC requests as a node where every account holds one token."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Handle a JSON-RPC request."""
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        results = {
+            "eth_call": "0x" + hex(10**18)[2:].zfill(64),
+            "eth_chainId": hex(100),
+            "eth_blockNumber": hex(1),
+        }
+        body = json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "result": results.get(request["method"]),
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+class ContractApiDialogues(BaseContractApiDialogues):
+    """The dialogues of the agent sending the requests."""
+
+    def __init__(self, self_address: Address) -> None:
+        """Initialize dialogues."""
+
+        def role_from_first_message(  # pylint: disable=unused-argument
+            message: Message, receiver_address: Address
+        ) -> BaseDialogue.Role:
+            """Infer the role of the agent from an incoming/outgoing first message"""
+            return ContractApiDialogue.Role.AGENT
+
+        BaseContractApiDialogues.__init__(
+            self,
+            self_address=self_address,
+            role_from_first_message=role_from_first_message,
+        )
+
+
+def register_contract(directory: Path) -> None:
+    """Write the ERC20 contract package to a directory and register it."""
+    (directory / "build").mkdir(parents=True)
+    (directory / "__init__.py").write_text('"""A minimal ERC20 contract package."""\n')
+    (directory / "contract.yaml").write_text(CONTRACT_YAML)
+    (directory / "contract.py").write_text(CONTRACT_PY)
+    (directory / "build" / "ERC20.json").write_text(
+        json.dumps({"abi": ERC20_ABI, "bytecode": "0x"})
+    )
+    configuration = load_component_configuration(
+        ComponentType.CONTRACT, directory, skip_consistency_check=True
+    )
+    configuration._directory = directory  # pylint: disable=protected-access
+    if CONTRACT_ID not in contract_registry.specs:
+        Contract.from_config(cast(ContractConfig, configuration))
+
+
+async def run(dispatcher: ContractApiRequestDispatcher, requests: int) -> List[float]:
+    """Dispatch balance requests, and return the dispatch and the total time per request, in microseconds."""
+    dialogues = ContractApiDialogues(SKILL_ID)
+    dispatching = 0.0
+    began = time.perf_counter()
+    for start in range(0, requests, BATCH):
+        tasks = []
+        for _ in range(min(BATCH, requests - start)):
+            request, _ = dialogues.create(
+                counterparty=CONNECTION_ID,
+                performative=ContractApiMessage.Performative.GET_STATE,
+                ledger_id=LEDGER_ID,
+                contract_id=CONTRACT_ID,
+                contract_address=TOKEN,
+                callable="balance_of",
+                kwargs=ContractApiMessage.Kwargs({"account": ACCOUNT}),
+            )
+            envelope = Envelope(to=request.to, sender=request.sender, message=request)
+            dispatched = time.perf_counter()
+            tasks.append(dispatcher.dispatch(envelope))
+            dispatching += time.perf_counter() - dispatched
+        for response in await asyncio.gather(*tasks):
+            assert response.performative == ContractApiMessage.Performative.STATE, response
+    total = time.perf_counter() - began
+    return [dispatching / requests * 1e6, total / requests * 1e6]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10_000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNodeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_configs = {
+        LEDGER_ID: {"address": f"http://127.0.0.1:{server.server_port}", "chain_id": 100}
+    }
+    loop = asyncio.new_event_loop()
+    print(f"{'dispatcher':>10} {'us/dispatch':>12} {'us/request':>12}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            register_contract(Path(tmp_dir) / "bench" / "contracts" / "erc20")
+            for name, max_size in (("uncached", 0), ("cached", 1024)):
+                dispatcher = ContractApiRequestDispatcher(
+                    connection_state=AsyncState(ConnectionStates.connected),
+                    loop=loop,
+                    api_configs=api_configs,
+                    logger=logging.getLogger(__name__),
+                    connection_id=CONNECTION_ID,
+                    max_contracts=max_size,
+                    max_call_plans=max_size,
+                    max_instances=max_size,
+                )
+                dispatch_time, request_time = loop.run_until_complete(
+                    run(dispatcher, args.requests)
+                )
+                print(f"{name:>10} {dispatch_time:>12.1f} {request_time:>12.1f}")
+                print(f"{'':>10} {dispatcher.cache_stats()}")
+    finally:
+        server.shutdown()
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
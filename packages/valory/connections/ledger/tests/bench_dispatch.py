@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#   Copyright 2018-2021 Fetch.AI Limited
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""
+Benchmark the overhead of dispatching ledger api requests, with and without cached apis.
+
+The requests are served by a local fake JSON-RPC node.
+
+Run with:
+
+    python -m packages.valory.connections.ledger.tests.bench_dispatch --requests 10000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+from aea.connections.base import ConnectionStates
+from aea.crypto.base import LedgerApi
+from aea.helpers.async_utils import AsyncState
+from aea.mail.base import Envelope
+from aea.protocols.base import Address, Message
+from aea.protocols.dialogue.base import Dialogue as BaseDialogue
+
+from packages.valory.connections.ledger.base import EVM_LEDGERS
+from packages.valory.connections.ledger.ledger_dispatcher import (
+    LedgerApiRequestDispatcher,
+)
+from packages.valory.protocols.ledger_api.dialogues import LedgerApiDialogue
+from packages.valory.protocols.ledger_api.dialogues import (
+    LedgerApiDialogues as BaseLedgerApiDialogues,
+)
+from packages.valory.protocols.ledger_api.message import LedgerApiMessage
+
+LEDGER_ID = "gnosis"
+ADDRESS = "0x" + "1" * 40
+CONNECTION_ID = "valory/ledger:0.19.0"
+SKILL_ID = "eightballer/faucet:0.1.0"
+BATCH = 100
+
+
+class FakeNodeHandler(BaseHTTPRequestHandler):
+    """Answer JSON-RPC requests as a node with a single funded account."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Handle a JSON-RPC request."""
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        results = {"eth_getBalance": hex(10**18), "eth_chainId": hex(100)}
+        body = json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "result": results.get(request["method"]),
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+class LedgerApiDialogues(BaseLedgerApiDialogues):
+    """The dialogues of the agent sending the requests."""
+
+    def __init__(self, self_address: Address) -> None:
+        """Initialize dialogues."""
+
+        def role_from_first_message(  # pylint: disable=unused-argument
+            message: Message, receiver_address: Address
+        ) -> BaseDialogue.Role:
+            """Infer the role of the agent from an incoming/outgoing first message"""
+            return LedgerApiDialogue.Role.AGENT
+
+        BaseLedgerApiDialogues.__init__(
+            self,
+            self_address=self_address,
+            role_from_first_message=role_from_first_message,
+        )
+
+
+class UncachedLedgerApiRequestDispatcher(LedgerApiRequestDispatcher):
+    """Make a ledger api for every request, as the dispatcher did before apis were cached."""
+
+    def get_api(self, ledger_id: str) -> LedgerApi:
+        """Make the api of a ledger."""
+        return self.ledger_api_registry.make(
+            EVM_LEDGERS.get(ledger_id, ledger_id), **self.api_config(ledger_id)
+        )
+
+
+async def run(dispatcher: LedgerApiRequestDispatcher, requests: int) -> List[float]:
+    """Dispatch balance requests, and return the dispatch and the total time per request, in microseconds."""
+    dialogues = LedgerApiDialogues(SKILL_ID)
+    dispatching = 0.0
+    began = time.perf_counter()
+    for start in range(0, requests, BATCH):
+        tasks = []
+        for _ in range(min(BATCH, requests - start)):
+            request, _ = dialogues.create(
+                counterparty=CONNECTION_ID,
+                performative=LedgerApiMessage.Performative.GET_BALANCE,
+                ledger_id=LEDGER_ID,
+                address=ADDRESS,
+            )
+            envelope = Envelope(to=request.to, sender=request.sender, message=request)
+            dispatched = time.perf_counter()
+            tasks.append(dispatcher.dispatch(envelope))
+            dispatching += time.perf_counter() - dispatched
+        for response in await asyncio.gather(*tasks):
+            assert response.performative == LedgerApiMessage.Performative.BALANCE, response
+    total = time.perf_counter() - began
+    return [dispatching / requests * 1e6, total / requests * 1e6]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10_000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNodeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_configs = {
+        LEDGER_ID: {"address": f"http://127.0.0.1:{server.server_port}", "chain_id": 100}
+    }
+    loop = asyncio.new_event_loop()
+    print(f"{'dispatcher':>10} {'us/dispatch':>12} {'us/request':>12}")
+    try:
+        for name, dispatcher_class in (
+            ("uncached", UncachedLedgerApiRequestDispatcher),
+            ("cached", LedgerApiRequestDispatcher),
+        ):
+            dispatcher = dispatcher_class(
+                connection_state=AsyncState(ConnectionStates.connected),
+                loop=loop,
+                api_configs=api_configs,
+                logger=logging.getLogger(__name__),
+                connection_id=CONNECTION_ID,
+            )
+            dispatch_time, request_time = loop.run_until_complete(
+                run(dispatcher, args.requests)
+            )
+            print(f"{name:>10} {dispatch_time:>12.1f} {request_time:>12.1f}")
+    finally:
+        server.shutdown()
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
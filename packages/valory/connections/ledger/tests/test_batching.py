@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the JSON-RPC batching."""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+from packages.valory.connections.ledger.batching import JsonRpcBatcher
+
+
+class FakeEndpoint:
+    """A JSON-RPC endpoint answering every request with its params."""
+
+    def __init__(self, batch_supported: bool = True) -> None:
+        """Initialize the endpoint."""
+        self.batch_supported = batch_supported
+        self.bodies: List[Any] = []
+        self.lock = threading.Lock()
+
+    def post(self, data: bytes) -> bytes:
+        """Answer a request or a batch of requests."""
+        body = json.loads(data)
+        with self.lock:
+            self.bodies.append(body)
+        if isinstance(body, list):
+            if not self.batch_supported:
+                return json.dumps({"jsonrpc": "2.0", "error": {"code": -32600}}).encode()
+            return json.dumps([self.answer(request) for request in reversed(body)]).encode()
+        return json.dumps(self.answer(body)).encode()
+
+    @staticmethod
+    def answer(request: Any) -> Any:
+        """Answer a request."""
+        return {"jsonrpc": "2.0", "id": request["id"], "result": request["params"][0]}
+
+
+def request(batcher: JsonRpcBatcher, index: int) -> Any:
+    """Send a balance read with the given request id."""
+    return batcher.request(
+        {"jsonrpc": "2.0", "id": index, "method": "eth_getBalance", "params": [hex(index)]}
+    )
+
+
+def test_concurrent_reads_are_sent_as_one_batch() -> None:
+    """Test that concurrent reads share a post, and that every caller gets its own response."""
+    endpoint = FakeEndpoint()
+    batcher = JsonRpcBatcher(endpoint.post, window=0.5, max_batch_size=5)
+    with ThreadPoolExecutor(5) as executor:
+        responses = list(executor.map(lambda i: request(batcher, i), range(5)))
+
+    assert responses == [
+        {"jsonrpc": "2.0", "id": index, "result": hex(index)} for index in range(5)
+    ]
+    # the batch was sent as soon as it was full, well before the window
+    [batch] = endpoint.bodies
+    assert len(batch) == 5
+    stats = batcher.stats()
+    assert (stats.requests, stats.batches, stats.max_batch_size) == (5, 1, 5)
+    assert stats.mean_batch_size == 5
+
+
+def test_endpoint_without_batches_is_sent_single_requests() -> None:
+    """Test that an endpoint not answering batches gets the requests one at a time."""
+    endpoint = FakeEndpoint(batch_supported=False)
+    batcher = JsonRpcBatcher(endpoint.post, window=0.5, max_batch_size=2)
+    with ThreadPoolExecutor(2) as executor:
+        responses = list(executor.map(lambda i: request(batcher, i), range(2)))
+
+    assert [response["result"] for response in responses] == ["0x0", "0x1"]
+    assert not batcher.batch_supported
+    assert [type(body) for body in endpoint.bodies] == [list, dict, dict]
+    assert request(batcher, 7)["result"] == "0x7"
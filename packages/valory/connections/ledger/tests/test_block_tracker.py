@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the block tracker."""
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from packages.valory.connections.ledger.block_tracker import BlockTracker
+
+
+class SlowEth:
+    """An `eth` module counting its block height reads, which take some time."""
+
+    def __init__(self) -> None:
+        """Initialize the module."""
+        self.height = 100
+        self.reads = 0
+
+    @property
+    def block_number(self) -> int:
+        """Read the block height."""
+        self.reads += 1
+        time.sleep(0.05)
+        return self.height
+
+
+def make_api(eth: Any) -> Any:
+    """Make a ledger api with an `eth` module."""
+    return SimpleNamespace(api=SimpleNamespace(eth=eth))
+
+
+def test_requests_share_one_read_of_the_block_height() -> None:
+    """Test that concurrent requests share one read, and that the height is read again once stale."""
+    now = [0.0]
+    eth = SlowEth()
+    api = make_api(eth)
+    tracker = BlockTracker(max_age=1.0, clock=lambda: now[0])
+    blocks = []
+    threads = [
+        threading.Thread(target=lambda: blocks.append(tracker.latest("gnosis", api)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert blocks == [100] * 8
+    assert eth.reads == 1
+
+    eth.height = 101
+    now[0] = 0.5
+    assert tracker.latest("gnosis", api) == 100
+    now[0] = 1.0
+    assert tracker.latest("gnosis", api) == 101
+    assert tracker.stats() == {"gnosis": 2}
+
+
+def test_ledgers_without_block_height_are_not_tracked() -> None:
+    """Test that the block of a ledger without an `eth` module cannot be told."""
+    tracker = BlockTracker()
+    assert tracker.latest("solana", make_api(None)) is None
+    assert tracker.stats() == {}
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the circuit breakers of the ledgers."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import HTTPError, ReadTimeout
+
+from packages.valory.connections.ledger.circuit_breaker import (
+    LEDGER_UNAVAILABLE_CODE,
+    CircuitBreaker,
+    CircuitState,
+    LedgerUnavailable,
+    RequestOutcome,
+    is_ledger_failure,
+    record_error,
+    request_outcome,
+)
+from packages.valory.connections.ledger.rate_limits import RateLimits
+
+
+class FakeClock:
+    """A clock moved by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+def test_circuit_opens_on_failures_and_closes_after_a_trial() -> None:
+    """Test that failed and slow requests open the circuit, which half-opens once, then closes on success."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "gnosis", window=4, min_calls=4, slow_call_duration=1.0, open_duration=10.0, clock=clock
+    )
+    for duration, ok in ((0.1, True), (0.1, False), (0.1, True)):
+        breaker.allow()
+        breaker.record(duration, ok)
+    assert breaker.state == CircuitState.CLOSED
+    breaker.allow()
+    breaker.record(5.0, ok=True)
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 4.0
+    with pytest.raises(LedgerUnavailable) as error:
+        breaker.allow()
+    assert error.value.code == LEDGER_UNAVAILABLE_CODE
+    assert json.loads(error.value.data) == {
+        "ledger_id": "gnosis",
+        "state": CircuitState.OPEN,
+        "retry_after": 6,
+    }
+
+    clock.now += 6.0
+    breaker.allow()
+    # the single trial is taken, other requests wait for its outcome
+    with pytest.raises(LedgerUnavailable):
+        breaker.allow()
+    breaker.record(0.1, ok=True)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats().opened == 1
+    assert breaker.stats().refused == 2
+
+
+def test_failed_trial_opens_the_circuit_again() -> None:
+    """Test that a failed trial opens the circuit again, and that a trial without outcome is given back."""
+    clock = FakeClock()
+    breaker = CircuitBreaker("gnosis", window=2, min_calls=2, open_duration=10.0, clock=clock)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record(0.1, ok=False)
+    clock.now += 10.0
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+    breaker.record(0.1, ok=False)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.stats().opened == 2
+
+
+def test_rate_limit_waits_are_left_out_of_the_upstream_time() -> None:
+    """Test that the time a request waits for a rate limit does not count towards its duration."""
+    limits = RateLimits({"gnosis": {"rate": 20.0, "burst": 1}})
+    outcome = RequestOutcome()
+    assert outcome.upstream_time() is None
+    token = request_outcome.set(outcome)
+    try:
+        outcome.start()
+        limits.acquire("gnosis", "http://node")
+        # the second call waits for the next token, 50ms later
+        limits.acquire("gnosis", "http://node")
+    finally:
+        request_outcome.reset(token)
+    assert outcome.waited >= 0.04
+    assert outcome.upstream_time() == pytest.approx(0.0, abs=0.02)
+
+
+def http_error(status: int) -> HTTPError:
+    """Make the error raised for an HTTP answer with a status."""
+    return HTTPError(f"{status} error", response=SimpleNamespace(status_code=status))
+
+
+def test_only_transport_failures_count_against_the_ledger() -> None:
+    """Test that transport errors, timeouts, 5xx and 429 are failures, and errors answered by the ledger are not."""
+    for failure in (RequestsConnectionError(), ReadTimeout(), TimeoutError(), http_error(502), http_error(429)):
+        assert is_ledger_failure(failure)
+    for answer in (
+        ValueError({"code": -32000, "message": "insufficient funds for gas * price + value"}),
+        ValueError({"code": -32000, "message": "nonce too low"}),
+        Exception("execution reverted"),
+        http_error(400),
+    ):
+        assert not is_ledger_failure(answer)
+    try:
+        try:
+            raise ReadTimeout()
+        except ReadTimeout as error:
+            raise ValueError("Could not get the balance") from error
+    except ValueError as wrapped:
+        assert is_ledger_failure(wrapped)
+
+    outcome = RequestOutcome()
+    token = request_outcome.set(outcome)
+    try:
+        record_error(ValueError({"code": -32000, "message": "already known"}))
+        assert not outcome.failed
+        record_error(http_error(503))
+        assert outcome.failed
+    finally:
+        request_outcome.reset(token)
@@ -24,6 +24,7 @@ from unittest.mock import ANY, MagicMock, Mock, patch
 
 import pytest
 from aea.common import Address
+from aea.contracts.base import Contract
 from aea.crypto.ledger_apis import ETHEREUM_DEFAULT_ADDRESS
 from aea.crypto.registries import ledger_apis_registry
 from aea.exceptions import AEAException
@@ -201,6 +202,46 @@ def test_validate_and_call_callable() -> None:
         )
 
 
+def test_contracts_call_plans_and_instances_are_cached() -> None:
+    """Tests that repeated requests reuse the contract, the call plan and the contract instance."""
+    contract_dispatcher = ContractApiRequestDispatcher(
+        connection_id=Mock(), connection_state=AsyncState()
+    )
+    contract = Mock()
+    contract.get_state = Mock(side_effect=NotImplementedError())
+    contract.balance_of = None
+    contract.default_method_call = Contract.default_method_call
+    ledger_api = Mock()
+    ledger_api.contract_method_call.return_value = {"balance": 1}
+
+    message = MagicMock()
+    message.performative = ContractApiMessage.Performative.GET_STATE
+    message.callable = "balance_of"
+    message.kwargs.body = {"account": ETHEREUM_DEFAULT_ADDRESS}
+    with patch.object(
+        contract_dispatcher.contract_registry, "make", return_value=contract
+    ) as make:
+        for _ in range(3):
+            assert contract_dispatcher.dispatch_request(
+                dialogue=Mock(),
+                ledger_api=ledger_api,
+                message=message,
+                response_builder=lambda data, dialogue: data,  # type: ignore
+            ) == {"balance": 1}
+
+    make.assert_called_once()
+    # once to look the callable up in the ABI, once to call it
+    assert contract.get_instance.call_count == 2
+    ledger_api.contract_method_call.assert_called_with(
+        contract.get_instance.return_value,
+        "balanceOf",
+        account=ETHEREUM_DEFAULT_ADDRESS,
+    )
+    stats = contract_dispatcher.cache_stats()
+    assert stats["call_plans"] == {"size": 1, "hits": 2, "misses": 1}
+    assert stats["instances"] == {"size": 1, "hits": 2, "misses": 1}
+
+
 def test_build_response_fails_on_bad_data_type() -> None:
     """Test internal build_response functions for data type check."""
     dispatcher = ContractApiRequestDispatcher(MagicMock(), connection_id="test_id")
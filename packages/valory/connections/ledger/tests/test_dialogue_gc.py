@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the garbage collection of the dialogues."""
+# pylint: skip-file
+
+import gc
+import os
+import tracemalloc
+from typing import Any, Optional, Tuple
+
+from aea.common import Address
+from aea.mail.base import Message
+from aea.protocols.dialogue.base import Dialogue as BaseDialogue
+
+from packages.valory.connections.ledger.connection import LedgerConnection
+from packages.valory.connections.ledger.dialogue_gc import (
+    CollectedDialogues,
+    EvictionReason,
+    pop_collection_args,
+)
+from packages.valory.connections.ledger.ledger_dispatcher import LedgerApiDialogues
+from packages.valory.protocols.ledger_api.dialogues import LedgerApiDialogue
+from packages.valory.protocols.ledger_api.dialogues import (
+    LedgerApiDialogues as BaseLedgerApiDialogues,
+)
+from packages.valory.protocols.ledger_api.message import LedgerApiMessage
+
+SOME_SKILL_ID = "some/skill:0.1.0"
+CONNECTION_ADDRESS = str(LedgerConnection.connection_id)
+HOUR = 3600.0
+
+
+class FakeClock:
+    """A clock moved by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+class AgentLedgerApiDialogues(CollectedDialogues, BaseLedgerApiDialogues):
+    """The dialogues of a skill talking to the ledger connection."""
+
+    def __init__(self, self_address: Address, **kwargs: Any) -> None:
+        """Initialize dialogues."""
+
+        def role_from_first_message(  # pylint: disable=unused-argument
+            message: Message, receiver_address: Address
+        ) -> BaseDialogue.Role:
+            """Infer the role of the agent from an incoming/outgoing first message"""
+            return LedgerApiDialogue.Role.AGENT
+
+        collection = pop_collection_args(kwargs)
+        BaseLedgerApiDialogues.__init__(
+            self,
+            self_address=self_address,
+            role_from_first_message=role_from_first_message,
+        )
+        self.init_collection(**collection)
+
+
+def request_balance(
+    agent: AgentLedgerApiDialogues,
+    connection: LedgerApiDialogues,
+    answer: bool = True,
+) -> Tuple[BaseDialogue, BaseDialogue]:
+    """Send a balance request to the connection, and answer it unless told otherwise."""
+    request, agent_dialogue = agent.create(
+        counterparty=CONNECTION_ADDRESS,
+        performative=LedgerApiMessage.Performative.GET_BALANCE,  # type: ignore
+        ledger_id="ethereum",
+        address="a",
+    )
+    dialogue = connection.update(request)
+    assert dialogue is not None
+    if answer:
+        response = dialogue.reply(
+            performative=LedgerApiMessage.Performative.BALANCE,
+            target_message=request,
+            ledger_id="ethereum",
+            balance=1,
+        )
+        assert agent.update(response) is not None
+    return agent_dialogue, dialogue
+
+
+def current_rss() -> Optional[int]:
+    """Get the resident set size of the process, in bytes, where it can be read."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):  # pragma: nocover
+        return None
+
+
+def test_idle_terminal_and_excess_dialogues_are_evicted() -> None:
+    """Test that dialogues are evicted once idle, once their terminal state expires, and over capacity."""
+    clock = FakeClock()
+    agent = AgentLedgerApiDialogues(SOME_SKILL_ID, max_age=60.0, terminal_max_age=10.0, clock=clock)
+    agent._keep_terminal_state_dialogues = True
+    connection = LedgerApiDialogues(
+        connection_id=LedgerConnection.connection_id, max_age=60.0, max_dialogues=3, clock=clock
+    )
+    answered, _ = request_balance(agent, connection)
+    unanswered, connection_dialogue = request_balance(agent, connection, answer=False)
+    # the connection forgets the answered dialogue, the skill keeps it for a while
+    assert connection.collector.size == 1
+    assert agent.collector.stats().terminal == 1
+    assert agent.collector.stats().active == 1
+
+    clock.now = 10.0
+    assert agent.collector.collect() == 1
+    assert agent.collector.evicted[EvictionReason.TERMINAL] == 1
+    assert agent.get_dialogue_from_label(answered.dialogue_label) is None
+    assert agent.get_dialogue_from_label(unanswered.dialogue_label) is not None
+
+    clock.now = 60.0
+    assert agent.collector.collect() == 1
+    assert connection.collector.collect() == 1
+    assert agent.collector.size == connection.collector.size == 0
+    assert connection.collector.evicted[EvictionReason.IDLE] == 1
+    assert agent.get_dialogue_from_label(unanswered.dialogue_label) is None
+    assert connection.get_dialogue_from_label(connection_dialogue.dialogue_label) is None
+
+    # the dialogues idle for longest go first once the store is full
+    dialogues = [request_balance(agent, connection, answer=False)[1] for _ in range(4)]
+    assert connection.collector.size == 3
+    assert connection.collector.evicted[EvictionReason.CAPACITY] == 1
+    assert connection.get_dialogue_from_label(dialogues[0].dialogue_label) is None
+    assert connection.get_dialogue_from_label(dialogues[-1].dialogue_label) is not None
+
+
+def test_dialogue_stores_stay_flat_over_a_simulated_day() -> None:
+    """Test that a day of requests, a quarter of them never answered, grows neither the dialogue stores nor memory."""
+    clock = FakeClock()
+    agent = AgentLedgerApiDialogues(SOME_SKILL_ID, clock=clock)
+    connection = LedgerApiDialogues(connection_id=LedgerConnection.connection_id, clock=clock)
+    interval = 10.0
+    collector = connection.collector
+    # the unanswered dialogues of the last `max_age`, and any terminal ones kept, up to a collection late
+    max_size = int(
+        (collector.max_age + collector.collect_interval) / interval / 4
+        + (collector.terminal_max_age + collector.collect_interval) / interval
+    ) + 1
+
+    tracemalloc.start()
+    try:
+        baseline: Optional[int] = None
+        baseline_rss: Optional[int] = None
+        for step in range(int(24 * HOUR / interval)):
+            clock.now = step * interval
+            request_balance(agent, connection, answer=step % 4 != 0)
+            assert connection.collector.size <= max_size
+            assert agent.collector.size <= max_size
+            if clock.now == 2 * HOUR:
+                # the stores are full after an hour, measure from then on
+                gc.collect()
+                baseline = tracemalloc.get_traced_memory()[0]
+                baseline_rss = current_rss()
+        gc.collect()
+        final = tracemalloc.get_traced_memory()[0]
+        final_rss = current_rss()
+    finally:
+        tracemalloc.stop()
+
+    assert baseline is not None
+    # without the collection, over 2000 dialogues would be left on each side
+    assert final - baseline < 1024 * 1024
+    if baseline_rss is not None and final_rss is not None:
+        assert final_rss - baseline_rss < 16 * 1024 * 1024
+    assert connection.collector.evicted[EvictionReason.IDLE] > 2000
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the RPC endpoint pools."""
+
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Generator, List
+
+import pytest
+
+from packages.valory.connections.ledger.endpoint_pool import (
+    EndpointPool,
+    load_chain_endpoints,
+)
+from packages.valory.connections.ledger.rate_limits import RateLimitExceeded
+
+BLOCK_NUMBER = json.dumps(
+    {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+).encode()
+
+
+class FakeRpcServer(ThreadingHTTPServer):
+    """A local JSON-RPC node with a given delay, status and chain id."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200, chain_id: int = 100) -> None:
+        """Initialize the server."""
+        super().__init__(("127.0.0.1", 0), FakeRpcHandler)
+        self.delay = delay
+        self.status = status
+        self.chain_id = chain_id
+        self.calls = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def uri(self) -> str:
+        """Get the endpoint of the server."""
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FakeRpcHandler(BaseHTTPRequestHandler):
+    """Answer JSON-RPC requests."""
+
+    server: FakeRpcServer
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Answer a request after the delay of the server."""
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls += 1
+        time.sleep(self.server.delay)
+        result = hex(self.server.chain_id if request["method"] == "eth_chainId" else self.server.server_port)
+        body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+def post(uri: str, data: bytes) -> bytes:
+    """Post a JSON-RPC body, raising on HTTP errors."""
+    request = urllib.request.Request(uri, data, {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:  # nosec
+        return response.read()
+
+
+def answered_by(response: bytes) -> int:
+    """Get the port of the server that answered a block number request."""
+    return int(json.loads(response)["result"], 16)
+
+
+@pytest.fixture
+def servers() -> Generator[List[FakeRpcServer], None, None]:
+    """Start a failing, a slow and a fast server."""
+    started = [FakeRpcServer(status=500), FakeRpcServer(delay=0.3), FakeRpcServer()]
+    yield started
+    for server in started:
+        server.shutdown()
+
+
+def test_calls_fail_over_and_move_to_the_best_endpoint(servers: List[FakeRpcServer]) -> None:
+    """Test that a failing endpoint is left out and the fastest one preferred."""
+    failing, slow, fast = servers
+    pool = EndpointPool(
+        "gnosis", [failing.uri, slow.uri, fast.uri], post, max_failures=1, cooldown=60
+    )
+    assert answered_by(pool.post(BLOCK_NUMBER)) == slow.server_port
+    # the failing endpoint is left out, the fast one is tried as its latency is unknown
+    assert answered_by(pool.post(BLOCK_NUMBER)) == fast.server_port
+    assert answered_by(pool.post(BLOCK_NUMBER)) == fast.server_port
+    ranked = pool.ranked()
+    assert [endpoint.uri for endpoint in ranked] == [fast.uri, slow.uri, failing.uri]
+    assert ranked[0].latency < ranked[1].latency
+    assert ranked[2].error_rate > 0
+    assert failing.calls == 1
+
+
+def test_slow_reads_are_hedged(servers: List[FakeRpcServer]) -> None:
+    """Test that a read the best endpoint is slow to answer is answered by the next one."""
+    _, slow, fast = servers
+    pool = EndpointPool("gnosis", [slow.uri, fast.uri], post, hedge_after=0.05)
+    began = time.monotonic()
+    assert answered_by(pool.post(BLOCK_NUMBER, hedge=True)) == fast.server_port
+    assert time.monotonic() - began < slow.delay
+    assert pool.hedged == 1
+
+
+def test_rate_limit_waits_are_not_held_against_endpoints() -> None:
+    """Test that waiting for a call slot counts neither as latency nor as a failure of the endpoint."""
+    now = [0.0]
+
+    def acquire(uri: str) -> None:
+        if uri == "http://full":
+            raise RateLimitExceeded("No call slot.")
+        now[0] += 5.0
+
+    def answer(uri: str, data: bytes) -> bytes:
+        now[0] += 0.1
+        return BLOCK_NUMBER
+
+    pool = EndpointPool(
+        "gnosis", ["http://full", "http://free"], answer, max_failures=1, clock=lambda: now[0], acquire=acquire
+    )
+    assert pool.post(BLOCK_NUMBER) == BLOCK_NUMBER
+    full, free = pool.endpoints
+    assert full.consecutive_failures == 0
+    assert full.error_rate == 0.0
+    assert full.down_until == 0.0
+    assert free.latency == pytest.approx(0.1)
+
+
+def test_health_check_leaves_out_endpoints_of_other_chains() -> None:
+    """Test that extra endpoints serving another chain are never used, unlike the configured one."""
+    configured, other_chain, same_chain = (
+        FakeRpcServer(chain_id=1),
+        FakeRpcServer(chain_id=1),
+        FakeRpcServer(chain_id=100),
+    )
+    try:
+        pool = EndpointPool(
+            "gnosis", [configured.uri, other_chain.uri, same_chain.uri], post, chain_id=100
+        )
+        pool.check_health()
+        assert {endpoint.uri for endpoint in pool.ranked()} == {configured.uri, same_chain.uri}
+        assert all(endpoint.latency is not None for endpoint in pool.ranked())
+    finally:
+        for server in (configured, other_chain, same_chain):
+            server.shutdown()
+
+
+def test_endpoints_are_seeded_from_chains_json() -> None:
+    """Test that public HTTP endpoints without API keys are read from chains.json."""
+    endpoints = load_chain_endpoints({"gnosis": 100, "ethereum": 1337}, max_endpoints=2)
+    assert list(endpoints) == ["gnosis"]
+    assert len(endpoints["gnosis"]) == 2
+    assert all(uri.startswith("https://") and "${" not in uri for uri in endpoints["gnosis"])
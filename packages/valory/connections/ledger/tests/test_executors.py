@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the per-ledger executor pools."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from packages.valory.connections.ledger.executors import (
+    LedgerExecutors,
+    LedgerOverloaded,
+)
+
+CONFIGS = {
+    "default": {"max_workers": 2, "max_in_flight": 2},
+    "gnosis": {
+        "max_workers": 1,
+        "max_in_flight": 1,
+        "max_queued": 1,
+        "max_queue_wait": 0.2,
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_blocked_ledger_is_shed_without_starving_others() -> None:
+    """Test that a blocked ledger sheds its excess calls while other ledgers are served."""
+    executors = LedgerExecutors(asyncio.get_running_loop(), CONFIGS)
+    unblock = threading.Event()
+    try:
+        blocked = asyncio.ensure_future(executors.get("gnosis").run(unblock.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(executors.get("gnosis").run(lambda: 1))
+        await asyncio.sleep(0)
+        with pytest.raises(LedgerOverloaded):
+            await executors.get("gnosis").run(lambda: 1)
+
+        assert await executors.get("ethereum").run(lambda: 2) == 2
+        with pytest.raises(LedgerOverloaded):
+            await queued
+
+        unblock.set()
+        assert await blocked is True
+        await asyncio.sleep(0.05)
+        stats = executors.stats()
+        assert stats["gnosis"].in_flight == 0
+        assert stats["gnosis"].queued == 0
+        assert stats["gnosis"].shed == 2
+        assert stats["ethereum"].workers == 2
+        assert stats["ethereum"].requests == 1
+    finally:
+        unblock.set()
+        executors.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_slots_are_handed_over_in_order() -> None:
+    """Test that waiting calls run once a slot frees up, and that their wait is recorded."""
+    executors = LedgerExecutors(
+        asyncio.get_running_loop(),
+        {"default": {"max_workers": 1, "max_in_flight": 1, "max_queue_wait": None}},
+    )
+    try:
+        pool = executors.get("gnosis")
+        results = await asyncio.gather(
+            *(pool.run(lambda i=i: time.sleep(0.05) or i) for i in range(3))
+        )
+        assert results == [0, 1, 2]
+        await asyncio.sleep(0.01)
+        stats = pool.stats()
+        assert stats.requests == 3
+        assert stats.in_flight == 0
+        assert stats.queue_wait_max >= 0.05
+        assert 0 < stats.queue_wait_mean < stats.queue_wait_max
+    finally:
+        executors.shutdown()
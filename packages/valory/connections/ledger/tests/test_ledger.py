@@ -40,7 +40,11 @@ from aea.protocols.base import Message
 from aea.protocols.dialogue.base import Dialogue, DialogueLabel, Dialogues
 from aea_ledger_ethereum import EthereumCrypto
 from packages.valory.connections.ledger.base import RequestDispatcher
-from packages.valory.connections.ledger.connection import PUBLIC_ID, LedgerConnection
+from packages.valory.connections.ledger.connection import (
+    PUBLIC_ID,
+    LedgerConnection,
+    connected_ledger_connections,
+)
 from packages.valory.connections.ledger.ledger_dispatcher import (
     LedgerApiRequestDispatcher,
 )
@@ -173,6 +177,20 @@ class TestRequestDispatcher:
         await asyncio.sleep(sleep)
         return True
 
+    @pytest.mark.asyncio
+    async def test_connected_connections_are_listed(self) -> None:
+        """Test that a connection is listed for the skills exporting its statistics only while connected."""
+        ledger_connection = LedgerConnection(
+            configuration=ConnectionConfig("ledger", "valory", "0.19.0"),
+            data_dir="test_data_dir",
+        )
+        assert ledger_connection not in connected_ledger_connections()
+        await ledger_connection.connect()
+        assert ledger_connection in connected_ledger_connections()
+        assert set(ledger_connection.dialogue_stats()) == {"ledger_api", "contract_api"}
+        await ledger_connection.disconnect()
+        assert ledger_connection not in connected_ledger_connections()
+
     @pytest.mark.asyncio
     async def test_wait_for_happy_path(self) -> None:
         """Tests that wait_for works when timeout is bigger than execution time of callable."""
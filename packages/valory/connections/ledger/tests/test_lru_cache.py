@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the LRU cache."""
+
+from packages.valory.connections.ledger.lru_cache import LRUCache
+
+
+def test_least_recently_used_values_are_dropped() -> None:
+    """Test that the cache keeps the most recently used values, and nothing if its size is 0."""
+    cache: LRUCache[str] = LRUCache(max_size=2)
+    assert cache.get_or_make("a", lambda: "A") == "A"
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get_or_make("a", lambda: "other") == "A"
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    disabled: LRUCache[str] = LRUCache(max_size=0)
+    assert disabled.get_or_make("a", lambda: "A") == "A"
+    assert disabled.get("a") is None
+    assert len(disabled) == 0
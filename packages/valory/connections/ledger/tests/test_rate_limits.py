@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+"""This module contains the tests of the rate limits of the RPC endpoints."""
+
+import threading
+import time
+from typing import List
+
+import pytest
+
+from packages.valory.connections.ledger.rate_limits import (
+    Priority,
+    RateLimitExceeded,
+    RateLimits,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """A clock moved by hand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the time."""
+        return self.now
+
+
+class TooManyRequests(Exception):
+    """An HTTP error carrying a 429 response."""
+
+    class response:  # pylint: disable=invalid-name,too-few-public-methods
+        """The response of the error."""
+
+        status_code = 429
+
+
+def test_urgent_calls_are_let_through_first() -> None:
+    """Test that a waiting submission takes the next token ahead of reads waiting longer."""
+    bucket = TokenBucket(rate=10.0, burst=1)
+    bucket.acquire()
+    order: List[str] = []
+
+    def call(name: str, priority: int) -> None:
+        bucket.acquire(priority)
+        order.append(name)
+
+    threads = [
+        threading.Thread(target=call, args=("read", Priority.READ)),
+        threading.Thread(target=call, args=("submit", Priority.SUBMIT)),
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert order == ["submit", "read"]
+
+
+def test_rate_is_cut_on_429_and_grows_back() -> None:
+    """Test that a 429 halves the rate, which grows back once the endpoint stops answering 429."""
+    clock = FakeClock()
+    limits = RateLimits(
+        {"gnosis": {"rate": 10.0, "burst": 5}}, recover_after=5.0, clock=clock
+    )
+    assert limits.get("ethereum", "http://node") is None
+
+    def post(uri: str, data: bytes) -> bytes:
+        raise TooManyRequests()
+
+    with pytest.raises(TooManyRequests):
+        limits.limit("gnosis", post)("http://node", b"{}")
+    bucket = limits.get("gnosis", "http://node")
+    assert bucket is not None
+    assert bucket.rate == 5.0
+    assert limits.stats()["gnosis"]["http://node"].throttled == 1
+
+    clock.now += 5.0
+    bucket.acquire()
+    assert bucket.rate == 6.0
+
+
+def test_calls_give_up_after_max_wait() -> None:
+    """Test that a call waiting longer than allowed fails."""
+    bucket = TokenBucket(rate=0.001, burst=1, max_wait=0.05)
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire()
+    assert bucket.stats().timed_out == 1
+
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the receipt watcher."""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock
+
+import pytest
+
+from packages.valory.connections.ledger.receipt_watcher import ReceiptWatcher
+
+
+class FakeLedgerApi:
+    """A ledger api whose transactions are mined at a given block."""
+
+    def __init__(self, mined_at: Dict[str, int]) -> None:
+        """Initialize the api."""
+        self.mined_at = mined_at
+        self.block = 0
+        self.api = Mock()
+        self.receipt_reads: List[List[str]] = []
+
+    def next_block(self) -> None:
+        """Mine a block."""
+        self.block += 1
+        self.api.eth.block_number = self.block
+        self.receipt_reads.append([])
+
+    def get_transaction_receipt(self, digest: str, raise_on_try: bool = False) -> Optional[Dict]:
+        """Get the receipt of a transaction, if mined."""
+        self.receipt_reads[-1].append(digest)
+        if self.mined_at.get(digest, float("inf")) > self.block:
+            return None
+        return {"transactionHash": digest, "status": 1}
+
+
+async def run(func: Any, *args: Any) -> Any:
+    """Run a ledger call inline."""
+    return func(*args)
+
+
+@pytest.mark.asyncio
+async def test_receipts_are_fetched_once_per_block() -> None:
+    """Test that all pending receipts are fetched together once per block, and their waiters resolved."""
+    api = FakeLedgerApi({"0xa": 1, "0xb": 2, "0xc": 2})
+    api.next_block()
+    watcher = ReceiptWatcher(
+        "gnosis",
+        asyncio.get_running_loop(),
+        run=run,
+        is_running=lambda: True,
+        logger=logging.getLogger(__name__),
+        poll_interval=0.01,
+        concurrency=2,
+    )
+    waits = [
+        asyncio.ensure_future(watcher.wait(api, digest, timeout=1.0))  # type: ignore
+        for digest in ("0xa", "0xb", "0xc")
+    ]
+    lost = asyncio.ensure_future(watcher.wait(api, "0xd", timeout=0.1))  # type: ignore
+    await asyncio.sleep(0.05)
+    assert waits[0].done() and not waits[1].done()
+    assert watcher.pending == 3
+
+    api.next_block()
+    receipts = await asyncio.gather(*waits)
+    assert [receipt["transactionHash"] for receipt in receipts] == ["0xa", "0xb", "0xc"]
+    # one read per pending transaction and block, however long the block takes
+    assert sorted(api.receipt_reads[0]) == ["0xa", "0xb", "0xc", "0xd"]
+    assert sorted(api.receipt_reads[1]) == ["0xb", "0xc", "0xd"]
+
+    assert await lost is None
+    assert watcher.pending == 0
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2021-2023 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the tests of the contract state cache."""
+
+from pathlib import Path
+
+from packages.valory.connections.ledger.state_cache import StateCache
+
+ERC20 = "valory/erc20:0.1.0"
+TOKEN = "0x" + "1" * 40
+
+
+def key(callable_name: str, **kwargs: str) -> str:
+    """Get the cache key of a call to the token."""
+    return StateCache.key("gnosis", ERC20, TOKEN, callable_name, kwargs)
+
+
+def test_immutable_states_are_persisted(tmp_path: Path) -> None:
+    """Test that immutable states survive a restart, and that other callables are not cached."""
+    path = tmp_path / "state_cache.json"
+    cache = StateCache(immutable=["symbol"], path=path)
+    assert cache.get(key("symbol"), "symbol") is None
+    cache.put(key("symbol"), "symbol", {"symbol": "WXDAI"})
+    cache.put(key("total_supply"), "total_supply", {"total_supply": 1})
+    assert not cache.caches("total_supply")
+
+    restarted = StateCache(immutable=["symbol"], path=path)
+    assert restarted.get(key("symbol"), "symbol") == {"symbol": "WXDAI"}
+    assert restarted.get(key("total_supply"), "total_supply") is None
+    assert restarted.stats() == {
+        "symbol": {"hits": 1, "misses": 0},
+        "total_supply": {"hits": 0, "misses": 1},
+    }
+
+
+def test_states_expire_after_their_ttl_or_block() -> None:
+    """Test that states with a TTL expire in time, and those of a block on the next one."""
+    now = [0.0]
+    cache = StateCache(per_block=["balance_of"], ttls={"allowance": 10.0}, clock=lambda: now[0])
+    balance = key("balance_of", account=TOKEN)
+    cache.put(balance, "balance_of", {"balance": 1}, block=None)
+    assert cache.get(balance, "balance_of", block=5) is None
+    cache.put(balance, "balance_of", {"balance": 1}, block=5)
+    assert cache.get(balance, "balance_of", block=5) == {"balance": 1}
+    assert cache.get(balance, "balance_of", block=6) is None
+
+    cache.put(key("allowance"), "allowance", {"allowance": 2})
+    now[0] = 9.0
+    assert cache.get(key("allowance"), "allowance") == {"allowance": 2}
+    now[0] = 10.0
+    assert cache.get(key("allowance"), "allowance") is None
+
+
+def test_least_recently_used_states_are_dropped() -> None:
+    """Test that the cache keeps at most its maximum number of states."""
+    cache = StateCache(immutable=["symbol"], max_entries=2)
+    for address in ("0xa", "0xb"):
+        cache.put(StateCache.key("gnosis", ERC20, address, "symbol", {}), "symbol", {})
+    assert cache.get(StateCache.key("gnosis", ERC20, "0xa", "symbol", {}), "symbol") == {}
+    cache.put(StateCache.key("gnosis", ERC20, "0xc", "symbol", {}), "symbol", {})
+    assert cache.get(StateCache.key("gnosis", ERC20, "0xb", "symbol", {}), "symbol") is None
+    assert cache.get(StateCache.key("gnosis", ERC20, "0xa", "symbol", {}), "symbol") == {}